@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for streaming profile PDF generation.
+Reports pages/sec and peak Python memory by chunk size for a synthetic batch.
+
+Usage: python benchmark_pdf_batch.py [num_candidates] [chunk_size ...]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+# The renderer lives in server.py, which needs these set at import time
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'recruitment_benchmark')
+
+from server import ProfilePdfBatchWriter, render_candidate_profiles_pdf
+
+
+def make_candidates(count: int) -> list:
+    """Generate synthetic candidates with every rendered field populated"""
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f'Candidate {i}',
+            'qualification': 'B.Tech Computer Science',
+            'current_designation': 'Senior Software Engineer',
+            'department': 'Engineering',
+            'industry_sector': 'Information Technology',
+            'current_location': 'Bangalore',
+            'years_of_experience': 5 + i % 10,
+            'current_ctc': 18.5,
+            'expected_ctc': 24.0,
+            'notice_period': '60 days'
+        }
+        for i in range(count)
+    ]
+
+
+def bench_streaming(candidates: list, chunk_size: int) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        writer = ProfilePdfBatchWriter(Path(work_dir))
+        tracemalloc.start()
+        start = time.perf_counter()
+        for offset in range(0, len(candidates), chunk_size):
+            writer.add_chunk(candidates[offset:offset + chunk_size])
+        output = writer.finish()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = output.stat().st_size
+    return {"mode": f"stream/{chunk_size}", "pages": writer.pages, "seconds": elapsed,
+            "peak_mb": peak / 1024 / 1024, "size_mb": size / 1024 / 1024}
+
+
+def bench_in_memory(candidates: list) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    pdf_bytes = render_candidate_profiles_pdf(candidates)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mode": "in-memory", "pages": len(PdfReader(io.BytesIO(pdf_bytes)).pages), "seconds": elapsed,
+            "peak_mb": peak / 1024 / 1024, "size_mb": len(pdf_bytes) / 1024 / 1024}
+
+
+def main():
+    num_candidates = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chunk_sizes = [int(arg) for arg in sys.argv[2:]] or [10, 50, 100, 250]
+    candidates = make_candidates(num_candidates)
+
+    results = [bench_in_memory(candidates)]
+    results.extend(bench_streaming(candidates, chunk_size) for chunk_size in chunk_sizes)
+
+    print(f"Profile PDF benchmark: {num_candidates} candidates")
+    print(f"{'mode':<14}{'pages':>8}{'seconds':>10}{'pages/sec':>12}{'peak MB':>10}{'size MB':>10}")
+    for r in results:
+        pages_per_sec = r["pages"] / r["seconds"] if r["seconds"] else 0.0
+        print(f"{r['mode']:<14}{r['pages']:>8}{r['seconds']:>10.2f}{pages_per_sec:>12.1f}"
+              f"{r['peak_mb']:>10.1f}{r['size_mb']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for pod startup.
+Reports `import server` time, the slowest imports (python -X importtime) and time-to-first-response
+of a fresh uvicorn process, each measured in a new interpreter. Uses the in-memory storage backend
+unless STORAGE_BACKEND is set, so no MongoDB is needed.
+
+Usage: python benchmark_startup.py [runs] [--top N] [--port PORT]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+
+def server_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('STORAGE_BACKEND', 'memory')
+    env.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    env.setdefault('DB_NAME', 'recruitment_benchmark')
+    return env
+
+
+def time_import() -> float:
+    """Seconds to import server.py in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=server_env(),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> list:
+    """(cumulative microseconds, module) for the top-level packages pulled in by server.py"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=BACKEND_DIR,
+                            env=server_env(), capture_output=True, text=True, check=True)
+    totals = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is two spaces per level after the separator's own space; level 1 = imported by server.py
+        name = name[1:]
+        if (len(name) - len(name.lstrip())) // 2 == 1:
+            totals.append((int(cumulative), name.strip()))
+    return sorted(totals, reverse=True)[:top]
+
+
+def time_first_response(port: int, timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn until GET /api/ answers 200"""
+    url = f"http://127.0.0.1:{port}/api/"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                                "--log-level", "warning"], cwd=BACKEND_DIR, env=server_env())
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"no response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(label: str, samples: list):
+    print(f"{label:<24}{statistics.median(samples) * 1000:>10.0f} ms median"
+          f"{min(samples) * 1000:>10.0f} min{max(samples) * 1000:>10.0f} max")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("runs", type=int, nargs="?", default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"Startup benchmark: {args.runs} runs, STORAGE_BACKEND={server_env()['STORAGE_BACKEND']}")
+    summarize("import server", [time_import() for _ in range(args.runs)])
+    summarize("time to first response", [time_first_response(args.port) for _ in range(args.runs)])
+
+    print(f"\n{'cumulative ms':>14}  module")
+    for cumulative, name in slowest_imports(args.top):
+        print(f"{cumulative / 1000:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
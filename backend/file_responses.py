@@ -0,0 +1,132 @@
+"""
+HTTP responses for files in FileStorage: conditional requests, byte ranges and zero-copy sends.
+
+ETag / If-None-Match let a browser revalidate a resume it already has and get a bodiless 304;
+Range / If-Range let in-browser PDF viewers fetch only the parts they display. Files on local
+disk are handed to the server with the ASGI pathsend (whole file) or zerocopysend (range)
+extension when the server offers one, so the kernel copies the file to the socket (sendfile).
+Otherwise, and for GridFS/S3, the body is streamed from storage in chunks.
+"""
+import asyncio
+import re
+from datetime import timezone
+from email.utils import format_datetime
+from mimetypes import guess_type
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.responses import Response
+
+from file_storage import FileStorage, StoredFile
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single byte range, or None to send the whole file.
+
+    Multiple ranges and malformed headers are ignored, which RFC 9110 allows.
+    """
+    match = RANGE_PATTERN.match((header or "").strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        if int(last) == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison against a quoted ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+class StoredFileResponse(Response):
+    """Serves a stored file, answering If-None-Match with 304 and Range with 206"""
+
+    def __init__(self, storage: FileStorage, info: StoredFile, request_headers: Mapping[str, str],
+                 filename: str, media_type: Optional[str] = None, cache_control: str = "private, no-cache",
+                 disposition: str = "inline"):
+        self.storage = storage
+        self.info = info
+        self.range: Optional[Tuple[int, int]] = None
+        self.background = None
+        etag = f'"{info.etag}"'
+        headers = {"etag": etag, "cache-control": cache_control, "accept-ranges": "bytes"}
+        if info.modified is not None:
+            headers["last-modified"] = format_datetime(info.modified.astimezone(timezone.utc), usegmt=True)
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            self.status_code = 304
+        else:
+            self.status_code = 200
+            headers["content-type"] = media_type or info.content_type or guess_type(filename)[0] or "application/octet-stream"
+            headers["content-disposition"] = content_disposition(disposition, filename)
+            headers["content-length"] = str(info.size)
+            # If-Range: only honour the range when the client's copy is the current version
+            if_range = request_headers.get("if-range")
+            if if_range is None or if_range.strip() == etag:
+                try:
+                    self.range = parse_range(request_headers.get("range"), info.size)
+                except RangeNotSatisfiable:
+                    self.status_code = 416
+                    headers["content-range"] = f"bytes */{info.size}"
+                    headers["content-length"] = "0"
+            if self.range is not None:
+                start, end = self.range
+                self.status_code = 206
+                headers["content-range"] = f"bytes {start}-{end}/{info.size}"
+                headers["content-length"] = str(end - start + 1)
+        self.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.status_code in (304, 416) or self.info.size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await self._send_body(scope, send)
+        if self.background is not None:
+            await self.background()
+
+    async def _send_body(self, scope, send):
+        start, end = self.range or (0, self.info.size - 1)
+        extensions = scope.get("extensions") or {}
+        path = self.storage.local_path(self.info.key)
+        if path is not None and self.range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(path)})
+            return
+        if path is not None and "http.response.zerocopysend" in extensions:
+            file = await asyncio.to_thread(open, path, "rb")
+            try:
+                await send({"type": "http.response.zerocopysend", "file": file,
+                            "offset": start, "count": end - start + 1, "more_body": False})
+            finally:
+                file.close()
+            return
+        async for chunk in self.storage.open(self.info.key, start, end):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,365 @@
+"""
+Pluggable storage for uploaded files (resumes, JDs).
+
+Files are addressed by keys like "resumes/<name>" and "jds/<name>". Three backends share one
+async interface:
+
+- LocalFileStorage: a directory on this pod (the historical uploads/ layout). Fine for a
+  single replica; with several, each pod sees only its own uploads.
+- GridFSFileStorage: the application's MongoDB, so every replica sees the same files with no
+  extra infrastructure.
+- S3FileStorage: any S3-compatible object store (AWS S3, MinIO, ...), spoken directly over
+  httpx with SigV4 signing so uploads and downloads stream without a thread per request.
+
+Writes read the source file in chunks (off the event loop where the read is blocking) and reads
+yield chunks, optionally for a byte range, so a large file is never held in memory.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+CHUNK_SIZE = 256 * 1024
+
+
+class StoredFile:
+    __slots__ = ("key", "size", "etag", "content_type", "modified")
+
+    def __init__(self, key: str, size: int, etag: str, content_type: Optional[str] = None,
+                 modified: Optional[datetime] = None):
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.content_type = content_type
+        self.modified = modified
+
+    def __repr__(self):
+        return f"StoredFile({self.key!r}, size={self.size}, etag={self.etag!r})"
+
+
+def check_key(key: str) -> str:
+    """Keys are relative slash-separated paths; reject anything that could escape a prefix"""
+    parts = key.split("/")
+    if not key or key.startswith("/") or "\\" in key or any(part in ("", ".", "..") for part in parts):
+        raise ValueError(f"Invalid file key: {key!r}")
+    return key
+
+
+def source_size(source: BinaryIO) -> int:
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell() - position
+    source.seek(position)
+    return size
+
+
+class FileStorage:
+    """Interface shared by the storage backends"""
+    name = ""
+
+    async def save(self, key: str, source: BinaryIO, content_type: Optional[str] = None) -> StoredFile:
+        """Store the rest of a readable binary file under key, replacing any existing file"""
+        raise NotImplementedError
+
+    async def stat(self, key: str) -> Optional[StoredFile]:
+        raise NotImplementedError
+
+    def open(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Chunks of bytes start..end (inclusive); iterating raises FileNotFoundError for a missing key"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> AsyncIterator[StoredFile]:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path when the file lives on this pod, so it can be served with sendfile"""
+        return None
+
+    async def read(self, key: str) -> bytes:
+        return b"".join([chunk async for chunk in self.open(key)])
+
+    async def close(self):
+        pass
+
+
+class LocalFileStorage(FileStorage):
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        return self.root / check_key(key)
+
+    def _info(self, key: str, path: Path) -> StoredFile:
+        st = path.stat()
+        return StoredFile(key, st.st_size, f"{st.st_size:x}-{st.st_mtime_ns:x}",
+                          modified=datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+    async def save(self, key, source, content_type=None):
+        path = self._path(key)
+
+        def write() -> StoredFile:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write beside the target and rename, so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    shutil.copyfileobj(source, f, CHUNK_SIZE)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            return self._info(key, path)
+
+        return await asyncio.to_thread(write)
+
+    async def stat(self, key):
+        path = self._path(key)
+        try:
+            return await asyncio.to_thread(self._info, key, path)
+        except FileNotFoundError:
+            return None
+
+    async def open(self, key, start=0, end=None):
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await asyncio.to_thread(f.read, CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+
+    async def delete(self, key):
+        try:
+            await asyncio.to_thread(self._path(key).unlink)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def list(self, prefix=""):
+        def scan():
+            found = []
+            for path in sorted(self.root.rglob("*")):
+                key = path.relative_to(self.root).as_posix()
+                if path.is_file() and key.startswith(prefix) and not path.name.startswith(".upload-"):
+                    found.append(self._info(key, path))
+            return found
+
+        for info in await asyncio.to_thread(scan):
+            yield info
+
+    def local_path(self, key):
+        return self._path(key)
+
+
+class GridFSFileStorage(FileStorage):
+    """Files in a GridFS bucket of the application database; the newest revision of a key wins"""
+    name = "gridfs"
+
+    def __init__(self, database, bucket_name: str = "files"):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+        self.files = database[f"{bucket_name}.files"]
+
+    @staticmethod
+    def _info(doc: dict) -> StoredFile:
+        metadata = doc.get("metadata") or {}
+        return StoredFile(doc["filename"], doc["length"], str(doc["_id"]), metadata.get("contentType"),
+                          doc["uploadDate"])
+
+    async def save(self, key, source, content_type=None):
+        check_key(key)
+        # Motor runs upload_from_stream on its executor, so the blocking source reads stay off the loop
+        file_id = await self.bucket.upload_from_stream(key, source, metadata={"contentType": content_type})
+        async for old in self.files.find({"filename": key, "_id": {"$ne": file_id}}, {"_id": 1}):
+            await self.bucket.delete(old["_id"])
+        return self._info(await self.files.find_one({"_id": file_id}))
+
+    async def _latest(self, key: str) -> Optional[dict]:
+        docs = await self.files.find({"filename": check_key(key)}).sort("uploadDate", -1).limit(1).to_list(1)
+        return docs[0] if docs else None
+
+    async def stat(self, key):
+        doc = await self._latest(key)
+        return self._info(doc) if doc else None
+
+    async def open(self, key, start=0, end=None):
+        doc = await self._latest(key)
+        if doc is None:
+            raise FileNotFoundError(key)
+        grid_out = await self.bucket.open_download_stream(doc["_id"])
+        try:
+            grid_out.seek(start)
+            remaining = (doc["length"] if end is None else end + 1) - start
+            while remaining > 0:
+                chunk = await grid_out.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            grid_out.close()
+
+    async def delete(self, key):
+        deleted = False
+        async for doc in self.files.find({"filename": check_key(key)}, {"_id": 1}):
+            await self.bucket.delete(doc["_id"])
+            deleted = True
+        return deleted
+
+    async def list(self, prefix=""):
+        latest = {}
+        query = {"filename": {"$regex": "^" + re.escape(prefix)}} if prefix else {}
+        async for doc in self.files.find(query).sort("uploadDate", 1):
+            latest[doc["filename"]] = doc
+        for key in sorted(latest):
+            yield self._info(latest[key])
+
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def sigv4_headers(method: str, url: str, region: str, access_key: str, secret_key: str,
+                  headers: Optional[dict] = None, now: Optional[datetime] = None,
+                  payload_hash: str = UNSIGNED_PAYLOAD) -> dict:
+    """AWS Signature Version 4 headers for an S3 request; the payload is unsigned (streamed)
+    unless its hex SHA-256 is given. The URL's path and query must already be percent-encoded."""
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    parts = urlsplit(url)
+    signed = {k.lower(): str(v).strip() for k, v in (headers or {}).items()}
+    signed.update({"host": parts.netloc, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+    # A bare "key" parameter (e.g. ?lifecycle) is signed as "key="
+    query = sorted(pair.partition("=")[::2] for pair in parts.query.split("&") if pair)
+    canonical_query = "&".join(f"{k}={v}" for k, v in query)
+    names = sorted(signed)
+    canonical_request = "\n".join([
+        method, parts.path or "/", canonical_query,
+        "".join(f"{name}:{signed[name]}\n" for name in names), ";".join(names), payload_hash
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                                hashlib.sha256(canonical_request.encode()).hexdigest()])
+    key = f"AWS4{secret_key}".encode()
+    for part in (amz_date[:8], region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    signed["authorization"] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                               f"SignedHeaders={';'.join(names)}, Signature={signature}")
+    del signed["host"]
+    return signed
+
+
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class S3FileStorage(FileStorage):
+    """Objects in an S3-compatible bucket, addressed path-style ({endpoint}/{bucket}/{key})"""
+    name = "s3"
+
+    def __init__(self, endpoint: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = "us-east-1", prefix: str = "", timeout: float = 30.0):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    def _url(self, key: str = "", query: str = "") -> str:
+        path = quote(f"/{self.bucket}/{self.prefix}{check_key(key)}" if key else f"/{self.bucket}", safe="/-_.~")
+        return f"{self.endpoint}{path}" + (f"?{query}" if query else "")
+
+    async def _request(self, method: str, url: str, headers: Optional[dict] = None, **kwargs) -> httpx.Response:
+        signed = sigv4_headers(method, url, self.region, self.access_key, self.secret_key, headers)
+        return await self.client.request(method, url, headers=signed, **kwargs)
+
+    @staticmethod
+    def _info(key: str, headers) -> StoredFile:
+        modified = headers.get("last-modified")
+        return StoredFile(key, int(headers.get("content-length", 0)), headers.get("etag", "").strip('"'),
+                          headers.get("content-type"), parsedate_to_datetime(modified) if modified else None)
+
+    async def save(self, key, source, content_type=None):
+        url = self._url(key)
+        size = await asyncio.to_thread(source_size, source)
+
+        async def body():
+            while chunk := await asyncio.to_thread(source.read, CHUNK_SIZE):
+                yield chunk
+
+        # S3 does not accept chunked uploads, so the length is sent up front and the body streamed
+        headers = {"content-length": str(size), "content-type": content_type or "application/octet-stream"}
+        response = await self._request("PUT", url, headers, content=body())
+        response.raise_for_status()
+        return StoredFile(key, size, response.headers.get("etag", "").strip('"'), content_type,
+                          datetime.now(timezone.utc))
+
+    async def stat(self, key):
+        response = await self._request("HEAD", self._url(key))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return self._info(key, response.headers)
+
+    async def open(self, key, start=0, end=None):
+        url = self._url(key)
+        headers = {"range": f"bytes={start}-{'' if end is None else end}"} if start or end is not None else {}
+        signed = sigv4_headers("GET", url, self.region, self.access_key, self.secret_key, headers)
+        async with self.client.stream("GET", url, headers=signed) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, key):
+        if await self.stat(key) is None:
+            return False
+        response = await self._request("DELETE", self._url(key))
+        response.raise_for_status()
+        return True
+
+    async def list(self, prefix=""):
+        token = None
+        while True:
+            query = f"list-type=2&prefix={quote(self.prefix + prefix, safe='-_.~')}"
+            if token:
+                query += f"&continuation-token={quote(token, safe='-_.~')}"
+            response = await self._request("GET", self._url(query=query))
+            response.raise_for_status()
+            root = ET.fromstring(response.content)
+            for item in root.iter(f"{S3_NS}Contents"):
+                modified = item.findtext(f"{S3_NS}LastModified")
+                yield StoredFile(item.findtext(f"{S3_NS}Key")[len(self.prefix):], int(item.findtext(f"{S3_NS}Size")),
+                                 (item.findtext(f"{S3_NS}ETag") or "").strip('"'), None,
+                                 datetime.fromisoformat(modified.replace("Z", "+00:00")) if modified else None)
+            token = root.findtext(f"{S3_NS}NextContinuationToken")
+            if root.findtext(f"{S3_NS}IsTruncated") != "true" or not token:
+                break
+
+    async def close(self):
+        await self.client.aclose()
+
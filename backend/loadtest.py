@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Load test for the RecruitHub API.
+
+`seed` bulk-inserts synthetic users, clients, positions and candidates at a chosen scale.
+`run` drives weighted mixed traffic (login, listings, search, dashboard, export, bulk upload)
+from concurrent virtual users, either in-process through ASGI or against --url, and reports
+throughput and p50/p95/p99 per endpoint against loadtest_baselines.json.
+
+Usage:
+    python loadtest.py seed [--scale small|medium|full] [--drop]
+    python loadtest.py run [--url URL] [--seed] [--scale small] [--duration 60] [--concurrency 20]
+                           [--scenarios login,search,...] [--profile NAME] [--save-baseline]
+    STORAGE_BACKEND=memory python loadtest.py run --seed   # no MongoDB needed
+
+In-process runs share one event loop between the client and the app, so absolute numbers are
+lower than against uvicorn; compare them only with baselines recorded the same way.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# server.py needs these set at import time
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'recruitment_loadtest')
+
+BASELINES_PATH = Path(__file__).parent / 'loadtest_baselines.json'
+
+SCALES = {
+    "small": {"users": 40, "clients": 50, "positions": 1000, "candidates": 20000},
+    "medium": {"users": 100, "clients": 250, "positions": 5000, "candidates": 200000},
+    "full": {"users": 200, "clients": 1000, "positions": 20000, "candidates": 1000000},
+}
+SEED_BATCH_SIZE = 5000
+LOADTEST_EMAIL_PREFIX = "loadtest."
+LOADTEST_PASSWORD = "Load@1234"
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera", "Rohan", "Saanvi",
+               "Arjun", "Priya", "Rahul", "Sneha", "Vikram", "Neha", "Karan", "Pooja", "Siddharth", "Riya"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Nair", "Gupta", "Patel", "Mehta", "Rao", "Singh",
+              "Kulkarni", "Das", "Joshi", "Menon", "Bose"]
+TITLES = ["Software Engineer", "Senior Software Engineer", "Tech Lead", "Backend Developer", "Frontend Developer",
+          "DevOps Engineer", "Data Scientist", "Data Analyst", "Business Analyst", "Product Manager",
+          "Quality Assurance Engineer", "Architect"]
+DEPARTMENTS = ["Engineering", "Data", "Product", "Quality", "Infrastructure", "Finance", "Operations"]
+INDUSTRIES = ["Information Technology", "Banking", "Manufacturing", "Healthcare", "Retail", "Telecom"]
+QUALIFICATIONS = ["B.Tech", "B.E.", "M.Tech", "MCA", "MBA", "B.Sc", "M.Sc"]
+CITIES = ["Mumbai", "Delhi", "Bangalore", "Hyderabad", "Chennai", "Kolkata", "Pune", "Ahmedabad", "Noida", "Gurgaon"]
+SKILLS = ["Python", "Java", "JavaScript", "React", "Node.js", "MongoDB", "SQL", "AWS", "Docker", "Kubernetes",
+          "Go", "TypeScript", "FastAPI", "Django", "PostgreSQL", "Redis"]
+# Status mix of a mature pipeline: most candidates never get past sourcing
+CANDIDATE_STATUSES = {"sourced": 50, "shortlisted": 15, "approved": 8, "rejected": 12, "shared_with_client": 5,
+                      "client_review": 3, "interview_scheduled": 3, "selected": 2, "on_hold": 1, "no_action": 1}
+POSITION_STATUSES = {"open": 50, "in_progress": 30, "on_hold": 10, "closed": 10}
+ROLE_MIX = {"recruiter": 80, "team_leader": 15, "manager": 5}
+
+
+def weighted(rng: random.Random, weights: Dict[str, int]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def person_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def created_at(rng: random.Random, now: datetime, days: int = 730) -> datetime:
+    return now - timedelta(seconds=rng.randrange(days * 86400))
+
+
+# Data generation
+
+def generate_users(rng: random.Random, count: int, password_hash: str, now: datetime) -> List[dict]:
+    users = []
+    for i in range(count):
+        role = weighted(rng, ROLE_MIX) if i >= 3 else ("manager", "team_leader", "recruiter")[i]
+        users.append({
+            "id": str(uuid.uuid4()),
+            "email": f"{LOADTEST_EMAIL_PREFIX}{role}{i}@recruitment.com",
+            "name": person_name(rng),
+            "role": role,
+            "password": password_hash,
+            "created_at": created_at(rng, now)
+        })
+    return users
+
+
+def generate_clients(rng: random.Random, count: int, creators: List[str], now: datetime) -> List[dict]:
+    return [{
+        "id": str(uuid.uuid4()),
+        "client_name": f"{rng.choice(LAST_NAMES)} {rng.choice(['Technologies', 'Industries', 'Systems', 'Labs'])} {i}",
+        "industry": rng.choice(INDUSTRIES),
+        "organization_type": rng.choice(["Private", "Public", "MNC", "Startup"]),
+        "headquarter_location": rng.choice(CITIES),
+        "other_branches": None,
+        "website": None,
+        "core_business": rng.choice(INDUSTRIES),
+        "contact_emails": [f"hr{i}@client{i}.example.com"],
+        "created_by": rng.choice(creators),
+        "created_at": created_at(rng, now)
+    } for i in range(count)]
+
+
+def generate_positions(rng: random.Random, count: int, client_ids: List[str], creators: List[str],
+                       recruiters: List[str], now: datetime) -> Iterator[dict]:
+    for _ in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "client_id": rng.choice(client_ids),
+            "job_title": rng.choice(TITLES),
+            "department": rng.choice(DEPARTMENTS),
+            "num_openings": rng.randint(1, 10),
+            "reason_for_hiring": rng.choice(["Expansion", "Replacement", "New project"]),
+            "team_size": rng.randint(3, 40),
+            "location": rng.choice(CITIES),
+            "work_mode": rng.choice(["onsite", "hybrid", "remote"]),
+            "working_days": "Monday-Friday",
+            "qualification": rng.choice(QUALIFICATIONS),
+            "experience": f"{rng.randint(1, 8)}-{rng.randint(9, 15)} years",
+            "must_have_skills": rng.sample(SKILLS, 3),
+            "good_to_have_skills": rng.sample(SKILLS, 2),
+            "gender_preference": None,
+            "jd_file": None,
+            "assigned_recruiters": rng.sample(recruiters, min(len(recruiters), rng.randint(1, 3))),
+            "status": weighted(rng, POSITION_STATUSES),
+            "created_by": rng.choice(creators),
+            "created_at": created_at(rng, now)
+        }
+
+
+def generate_candidates(rng: random.Random, count: int, positions: List[tuple], now: datetime) -> Iterator[dict]:
+    """positions: (position_id, assigned recruiter ids) pairs"""
+    for i in range(count):
+        position_id, recruiters = rng.choice(positions)
+        experience = round(rng.uniform(0, 20), 1)
+        current_ctc = round(3 + experience * rng.uniform(1.0, 2.5), 1)
+        status = weighted(rng, CANDIDATE_STATUSES)
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": person_name(rng),
+            "email": f"candidate{i}.{uuid.uuid4().hex[:8]}@example.com",
+            "contact_number": f"+91{rng.randint(7000000000, 9999999999)}",
+            "qualification": rng.choice(QUALIFICATIONS),
+            "industry_sector": rng.choice(INDUSTRIES),
+            "current_designation": rng.choice(TITLES),
+            "department": rng.choice(DEPARTMENTS),
+            "current_location": rng.choice(CITIES),
+            "current_ctc": current_ctc,
+            "years_of_experience": experience,
+            "expected_ctc": round(current_ctc * rng.uniform(1.1, 1.5), 1),
+            "notice_period": rng.choice(["Immediate", "15 days", "30 days", "60 days", "90 days"]),
+            "resume_file": None,
+            "position_id": position_id,
+            "status": status,
+            "added_by": rng.choice(recruiters),
+            "rejection_reason": "Not a fit" if status == "rejected" else None,
+            "created_at": created_at(rng, now)
+        }
+
+
+def batches(docs: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def make_resume_docx(rng: random.Random) -> bytes:
+    """A DOCX resume the bulk-upload parser can extract name and email from"""
+    from docx import Document
+
+    name = person_name(rng)
+    document = Document()
+    document.add_paragraph(f"Name: {name}")
+    document.add_paragraph(f"Email: {name.lower().replace(' ', '.')}.{uuid.uuid4().hex[:8]}@example.com")
+    document.add_paragraph(f"Phone: +91 {rng.randint(7000000000, 9999999999)}")
+    document.add_paragraph(f"Location: {rng.choice(CITIES)}")
+    document.add_paragraph(f"{rng.choice(TITLES)} with {rng.randint(1, 15)} years of experience in "
+                           f"{', '.join(rng.sample(SKILLS, 4))}.")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+# Seeding
+
+async def drop_seeded(db) -> Dict[str, int]:
+    """Delete what earlier seeds and runs created, identified through the seeded users.
+
+    Everything the seeder writes hangs off a loadtest.* user: clients and positions are
+    created_by one, candidates (including bulk-upload traffic) are added_by one, and history
+    and rollups are keyed by them or by their positions and clients. Data belonging to real
+    users in the same database is left alone.
+    """
+    user_ids = [u["id"] async for u in db.users.find(
+        {"email": {"$regex": f"^{re.escape(LOADTEST_EMAIL_PREFIX)}"}}, {"_id": 0, "id": 1})]
+    client_ids = [c["id"] async for c in db.clients.find({"created_by": {"$in": user_ids}}, {"_id": 0, "id": 1})]
+    position_ids = [p["id"] async for p in db.positions.find({"created_by": {"$in": user_ids}}, {"_id": 0, "id": 1})]
+    scope_ids = user_ids + client_ids + position_ids
+    filters = {
+        "candidates": {"$or": [{"added_by": {"$in": user_ids}}, {"position_id": {"$in": position_ids}}]},
+        "status_events": {"$or": [{"recruiter_id": {"$in": user_ids}}, {"position_id": {"$in": position_ids}}]},
+        "status_daily": {"scope_id": {"$in": scope_ids}},
+        "pipeline_counters": {"scope_id": {"$in": scope_ids}},
+        "positions": {"id": {"$in": position_ids}},
+        "clients": {"id": {"$in": client_ids}},
+        "users": {"id": {"$in": user_ids}},
+    }
+    deleted = {}
+    for name, query in filters.items():
+        deleted[name] = (await db[name].delete_many(query)).deleted_count
+    return deleted
+
+
+async def seed(scale: str, drop: bool, rng_seed: int = 42) -> Dict[str, int]:
+    import server
+
+    sizes = SCALES[scale]
+    db = server.db
+    rng = random.Random(rng_seed)
+    now = datetime.now(timezone.utc)
+
+    seeded_users = {"email": {"$regex": f"^{re.escape(LOADTEST_EMAIL_PREFIX)}"}}
+    if await db.users.find_one(seeded_users):
+        if not drop:
+            raise SystemExit("Load-test data already present; pass --drop to replace it")
+        print(f"dropped {await drop_seeded(db)}", file=sys.stderr)
+
+    users = generate_users(rng, sizes["users"], server.hash_password(LOADTEST_PASSWORD), now)
+    await db.users.insert_many(users, ordered=False)
+    creators = [u["id"] for u in users if u["role"] in ("manager", "team_leader")]
+    recruiters = [u["id"] for u in users if u["role"] == "recruiter"]
+
+    clients = generate_clients(rng, sizes["clients"], creators, now)
+    await db.clients.insert_many(clients, ordered=False)
+    client_ids = [c["id"] for c in clients]
+
+    position_refs = []
+    for batch in batches(generate_positions(rng, sizes["positions"], client_ids, creators, recruiters, now), SEED_BATCH_SIZE):
+        await db.positions.insert_many(batch, ordered=False)
+        position_refs.extend((p["id"], p["assigned_recruiters"]) for p in batch)
+
+    started = time.perf_counter()
+    inserted = 0
+    for batch in batches(generate_candidates(rng, sizes["candidates"], position_refs, now), SEED_BATCH_SIZE):
+        await db.candidates.insert_many(batch, ordered=False)
+        inserted += len(batch)
+        rate = inserted / (time.perf_counter() - started)
+        print(f"\rcandidates {inserted:>9}/{sizes['candidates']} ({rate:,.0f}/s)", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    # Bulk inserts bypass the write paths that maintain counters and caches
+    await server.reconcile_pipeline_counters()
+    server.reset_all_caches()
+    return {"users": len(users), "clients": len(clients), "positions": len(position_refs), "candidates": inserted}
+
+
+# Traffic
+
+class VirtualUser:
+    def __init__(self, http, rng: random.Random, email: str, fixtures: dict):
+        self.http = http
+        self.rng = rng
+        self.email = email
+        self.fixtures = fixtures
+        self.headers: Dict[str, str] = {}
+
+    async def login(self):
+        response = await self.http.post("/api/auth/login", json={"email": self.email, "password": LOADTEST_PASSWORD})
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        return response
+
+    async def list_candidates(self):
+        params = {"position_id": self.rng.choice(self.fixtures["position_ids"])} if self.rng.random() < 0.5 else {}
+        return await self.http.get("/api/candidates", params=params, headers=self.headers)
+
+    async def list_positions(self):
+        return await self.http.get("/api/positions", headers=self.headers)
+
+    async def list_clients(self):
+        return await self.http.get("/api/clients", headers=self.headers)
+
+    async def search(self):
+        criteria = self.rng.choice([
+            {"keywords": self.rng.choice(TITLES).split()[0]},
+            {"current_city": self.rng.choice(CITIES), "min_experience": self.rng.randint(0, 10)},
+            {"designation": self.rng.choice(TITLES), "max_salary": self.rng.randint(10, 40)},
+        ])
+        return await self.http.post("/api/candidates/search", json=criteria, headers=self.headers)
+
+    async def dashboard(self):
+        return await self.http.get("/api/dashboard/stats", headers=self.headers)
+
+    async def export(self):
+        return await self.http.get("/api/export/candidates", headers=self.headers)
+
+    async def bulk_upload(self):
+        files = [("files", (f"resume_{i}.docx", make_resume_docx(self.rng),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document"))
+                 for i in range(2)]
+        data = {"position_id": self.rng.choice(self.fixtures["position_ids"])}
+        return await self.http.post("/api/candidates/bulk-upload", data=data, files=files, headers=self.headers)
+
+
+# name: (endpoint label, weight, VirtualUser method)
+SCENARIOS = {
+    "login": ("POST /api/auth/login", 5, VirtualUser.login),
+    "candidates": ("GET /api/candidates", 15, VirtualUser.list_candidates),
+    "positions": ("GET /api/positions", 10, VirtualUser.list_positions),
+    "clients": ("GET /api/clients", 10, VirtualUser.list_clients),
+    "search": ("POST /api/candidates/search", 20, VirtualUser.search),
+    "dashboard": ("GET /api/dashboard/stats", 20, VirtualUser.dashboard),
+    "export": ("GET /api/export/candidates", 1, VirtualUser.export),
+    "upload": ("POST /api/candidates/bulk-upload", 2, VirtualUser.bulk_upload),
+}
+
+
+async def load_fixtures(http, admin_email: str, admin_password: str) -> dict:
+    """Seeded user emails and position ids, fetched through the API so --url runs need no DB access"""
+    response = await http.post("/api/auth/login", json={"email": admin_email, "password": admin_password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    users = (await http.get("/api/users", headers=headers)).json()
+    positions = (await http.get("/api/positions", headers=headers)).json()
+    emails = [u["email"] for u in users if u["email"].startswith(LOADTEST_EMAIL_PREFIX)]
+    if not emails or not positions:
+        raise SystemExit("No load-test data found; run `loadtest.py seed` first or pass --seed")
+    return {"emails": emails, "position_ids": [p["id"] for p in positions]}
+
+
+async def virtual_user_loop(user: VirtualUser, scenarios: List[str], deadline: float, samples: Dict[str, list],
+                            errors: Dict[str, int]):
+    weights = [SCENARIOS[name][1] for name in scenarios]
+    await user.login()
+    while time.perf_counter() < deadline:
+        name = user.rng.choices(scenarios, weights=weights)[0]
+        label, _, action = SCENARIOS[name]
+        started = time.perf_counter()
+        try:
+            response = await action(user)
+            failed = response.status_code >= 500 or response.status_code in (401, 403)
+        except Exception:
+            failed = True
+        samples[label].append((time.perf_counter() - started) * 1000)
+        if failed:
+            errors[label] += 1
+
+
+async def drive(http, args) -> dict:
+    fixtures = await load_fixtures(http, args.admin_email, args.admin_password)
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    samples = {SCENARIOS[name][0]: [] for name in scenarios}
+    errors = {label: 0 for label in samples}
+    rng = random.Random(args.rng_seed)
+    users = [VirtualUser(http, random.Random(rng.random()), rng.choice(fixtures["emails"]), fixtures)
+             for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(virtual_user_loop(user, scenarios, deadline, samples, errors) for user in users))
+    return summarize(samples, errors, time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    import httpx
+
+    # httpx logs every request at INFO once server.py has configured logging
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=args.timeout) as http:
+            return await drive(http, args)
+
+    import server
+
+    # ASGITransport does not send lifespan events; run startup hooks (indexes, admin, workers) here
+    async with server.app.router.lifespan_context(server.app):
+        if args.seed:
+            counts = await seed(args.scale, args.drop, args.rng_seed)
+            print(f"Seeded {counts}", file=sys.stderr)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as http:
+            return await drive(http, args)
+
+
+# Reporting
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: Dict[str, list], errors: Dict[str, int], elapsed: float) -> dict:
+    results = {}
+    for label, latencies in samples.items():
+        ordered = sorted(latencies)
+        results[label] = {
+            "requests": len(ordered),
+            "errors": errors[label],
+            "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50), 1),
+            "p95_ms": round(percentile(ordered, 0.95), 1),
+            "p99_ms": round(percentile(ordered, 0.99), 1),
+        }
+    return results
+
+
+def compare_to_baseline(results: dict, baseline: Optional[dict], tolerance: float, floor_ms: float = 5.0) -> List[str]:
+    """Endpoints whose p95 or p99 regressed beyond tolerance (and by more than floor_ms)"""
+    regressions = []
+    for label, current in results.items():
+        previous = (baseline or {}).get(label)
+        if not previous or not current["requests"]:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            limit = previous[key] * (1 + tolerance)
+            if current[key] > limit and current[key] - previous[key] > floor_ms:
+                regressions.append(f"{label} {key} {current[key]:.1f} > {previous[key]:.1f} (+{tolerance:.0%})")
+    return regressions
+
+
+def print_report(results: dict, baseline: Optional[dict]):
+    print(f"{'endpoint':<34}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'base p95':>10}")
+    for label, r in results.items():
+        base = (baseline or {}).get(label, {}).get("p95_ms")
+        base_text = f"{base:>10.1f}" if base is not None else f"{'-':>10}"
+        print(f"{label:<34}{r['requests']:>9}{r['errors']:>8}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{base_text}")
+    total = sum(r["requests"] for r in results.values())
+    print(f"{'total':<34}{total:>9}{sum(r['errors'] for r in results.values()):>8}"
+          f"{sum(r['rps'] for r in results.values()):>9.1f}")
+
+
+def load_baselines() -> dict:
+    return json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="bulk-insert synthetic data into DB_NAME")
+    seed_parser.add_argument("--scale", choices=SCALES, default="small")
+    seed_parser.add_argument("--drop", action="store_true", help="replace existing load-test data (seeded records only)")
+    seed_parser.add_argument("--rng-seed", type=int, default=42)
+
+    run_parser = commands.add_parser("run", help="drive mixed traffic and report latency percentiles")
+    run_parser.add_argument("--url", help="base URL of a running server (default: in-process)")
+    run_parser.add_argument("--seed", action="store_true", help="seed before running (in-process only)")
+    run_parser.add_argument("--scale", choices=SCALES, default="small")
+    run_parser.add_argument("--drop", action="store_true")
+    run_parser.add_argument("--duration", type=float, default=60.0, help="seconds of traffic")
+    run_parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    run_parser.add_argument("--scenarios", help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    run_parser.add_argument("--timeout", type=float, default=60.0)
+    run_parser.add_argument("--admin-email", default="admin@recruitment.com")
+    run_parser.add_argument("--admin-password", default="Admin@123")
+    run_parser.add_argument("--rng-seed", type=int, default=42)
+    run_parser.add_argument("--profile", help="baseline key (default: <mode>-<scale>)")
+    run_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/p99 growth over baseline")
+    run_parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        async def seed_with_startup():
+            import server
+            async with server.app.router.lifespan_context(server.app):
+                return await seed(args.scale, args.drop, args.rng_seed)
+        print(asyncio.run(seed_with_startup()))
+        return
+
+    if args.seed and args.url:
+        parser.error("--seed only applies to in-process runs; use the seed command for a remote server")
+    mode = "http" if args.url else os.environ.get('STORAGE_BACKEND', 'mongo')
+    profile = args.profile or f"{mode}-{args.scale}"
+    baselines = load_baselines()
+
+    results = asyncio.run(run(args))
+    print(f"\nLoad test: profile={profile} concurrency={args.concurrency} duration={args.duration:.0f}s")
+    print_report(results, baselines.get(profile))
+
+    if args.save_baseline:
+        baselines[profile] = results
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline '{profile}' saved to {BASELINES_PATH.name}")
+        return
+    if profile not in baselines:
+        print(f"No baseline for '{profile}'; rerun with --save-baseline to record one")
+        return
+    regressions = compare_to_baseline(results, baselines[profile], args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Event loop stall detector.
+
+A heartbeat task on the loop records when it last ran; a monitor thread notices when the
+heartbeat is late by more than the threshold and snapshots the loop thread's stack while the
+blocking call is still running. When the loop wakes up, the stall is timed and attributed to
+the route (via TaskScopeMiddleware) or background task that was running, and aggregated per
+(origin, blocking site) so repeat offenders rise to the top.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Callable, Dict, List, Optional
+
+MAX_OFFENDERS = 200
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.1, stack_depth: int = 40,
+                 app_root: Optional[str] = None, on_stall: Optional[Callable[[dict], None]] = None):
+        self.threshold = threshold
+        # Poll often enough that a stall is caught while it is still in progress
+        self.interval = max(threshold / 4, 0.005)
+        self.stack_depth = stack_depth
+        self.app_root = app_root
+        self.on_stall = on_stall
+        self.task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+        self.stalls = 0
+        self._offenders: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+        self._pending: Optional[dict] = None
+        self._beat: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.to_thread(self._thread.join)
+        self._task = self._thread = self._beat = None
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            self._beat = before
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - before - self.interval
+            with self._lock:
+                capture, self._pending = self._pending, None
+            if capture is not None and capture["beat"] == before:
+                self._record(capture, lag)
+
+    def _monitor(self):
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            if beat is None or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            with self._lock:
+                if self._pending is None or self._pending["beat"] != beat:
+                    self._pending = self._capture(beat)
+
+    def _capture(self, beat: float) -> dict:
+        """Runs on the monitor thread while the loop thread is still blocked"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame, limit=self.stack_depth) if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        return {"beat": beat, "origin": self.describe(task), "site": self.blocking_site(stack),
+                "stack": [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]}
+
+    def describe(self, task: Optional[asyncio.Task]) -> str:
+        """Route template for request tasks, coroutine name for background tasks"""
+        if task is None:
+            return "loop callback"
+        scope = self.task_scopes.get(task)
+        if scope is not None:
+            route = scope.get("route")
+            return f"{scope.get('method', '')} {route.path if route is not None else scope.get('path', '')}".strip()
+        coro = task.get_coro()
+        return f"task {getattr(coro, '__qualname__', task.get_name())}"
+
+    def blocking_site(self, stack: List[traceback.FrameSummary]) -> str:
+        """Innermost frame in application code, else the innermost frame"""
+        if not stack:
+            return "unknown"
+        chosen = stack[-1]
+        if self.app_root:
+            for entry in reversed(stack):
+                if entry.filename.startswith(self.app_root) and entry.filename != __file__:
+                    chosen = entry
+                    break
+        return f"{os.path.basename(chosen.filename)}:{chosen.lineno} in {chosen.name}"
+
+    def _record(self, capture: dict, seconds: float):
+        stall = {"origin": capture["origin"], "site": capture["site"],
+                 "duration_ms": round(seconds * 1000, 1), "stack": capture["stack"]}
+        key = (capture["origin"], capture["site"])
+        with self._lock:
+            self.stalls += 1
+            entry = self._offenders.get(key)
+            if entry is None:
+                if len(self._offenders) >= MAX_OFFENDERS:
+                    del self._offenders[min(self._offenders, key=lambda k: self._offenders[k]["total_ms"])]
+                entry = self._offenders[key] = {"origin": capture["origin"], "site": capture["site"],
+                                                "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + stall["duration_ms"], 1)
+            entry["max_ms"] = max(entry["max_ms"], stall["duration_ms"])
+            entry["last_seen"] = time.time()
+            entry["stack"] = capture["stack"]
+        if self.on_stall:
+            self.on_stall(stall)
+
+    def report(self, limit: int = 20) -> List[dict]:
+        """Offenders by total blocked time, worst first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._offenders.values()]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._offenders.clear()
+            self.stalls = 0
+
+
+class TaskScopeMiddleware:
+    """Maps the task running each request to its ASGI scope, so stalls can name the route.
+
+    Must sit below any middleware that runs the app in a separate task (BaseHTTPMiddleware
+    does); the router fills in scope["route"] in place after this runs.
+    """
+
+    def __init__(self, app, watchdog: LoopWatchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        self.watchdog.task_scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.task_scopes.pop(task, None)
@@ -0,0 +1,802 @@
+"""
+In-memory storage backend implementing the subset of the Motor API used by server.py.
+
+Selected with STORAGE_BACKEND=memory so the whole API can run in-process (ASGI test
+client, CPU-only micro-benchmarks) without a MongoDB server. Every operation runs
+synchronously under the hood, so each call is atomic with respect to the event loop.
+"""
+import copy
+import itertools
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+_MISSING = object()
+_object_ids = itertools.count()
+
+
+def _next_object_id() -> str:
+    """Increasing 24-hex-digit ids, ordered like ObjectIds"""
+    return f"{int(time.time()):08x}{next(_object_ids):016x}"
+
+
+# Results mirroring pymongo's result objects
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self):
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_count = 0
+        self.acknowledged = True
+
+
+# Value helpers
+def _normalize(value):
+    """Store datetimes the way MongoDB returns them: naive UTC, millisecond precision"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "value") and isinstance(getattr(value, "value"), (str, int)):
+        # Enum members are stored by value, as the BSON encoder does for str/int mixins
+        return value.value
+    return value
+
+
+def _localize(value):
+    """Return datetimes as aware UTC, as Motor does with tz_aware=True"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+    if isinstance(value, dict):
+        return {k: _localize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_localize(v) for v in value]
+    return value
+
+
+def _get_path(doc, path: str):
+    """Resolve a dotted path, returning _MISSING when absent"""
+    current = doc
+    for part in path.split("."):
+        if isinstance(current, dict):
+            if part not in current:
+                return _MISSING
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit():
+            idx = int(part)
+            if idx >= len(current):
+                return _MISSING
+            current = current[idx]
+        else:
+            return _MISSING
+    return current
+
+
+def _set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _type_class(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, datetime):
+        return "date"
+    if value is None or value is _MISSING:
+        return "null"
+    return type(value).__name__
+
+
+def _sort_key(value):
+    """Order values across types the way MongoDB does (null < numbers < strings < dates)"""
+    order = {"null": 0, "number": 1, "string": 2, "dict": 3, "list": 4, "bool": 5, "date": 6}
+    type_class = _type_class(value)
+    if type_class == "null":
+        return (0, 0)
+    if type_class in ("dict", "list"):
+        return (order[type_class], repr(value))
+    return (order.get(type_class, 7), value)
+
+
+def _compare(left, right, op: str) -> bool:
+    if _type_class(left) != _type_class(right) or left is _MISSING or left is None:
+        return False
+    if op == "$gt":
+        return left > right
+    if op == "$gte":
+        return left >= right
+    if op == "$lt":
+        return left < right
+    return left <= right
+
+
+# Query matching
+def _candidates_for(value) -> list:
+    """A field matches a condition if it or any element of an array field does"""
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _equals(field_value, expected) -> bool:
+    if expected is None:
+        return field_value is _MISSING or field_value is None
+    return any(v == expected for v in _candidates_for(field_value) if v is not _MISSING)
+
+
+def _match_operators(field_value, conditions: dict) -> bool:
+    for op, arg in conditions.items():
+        arg = _normalize(arg)
+        if op == "$eq":
+            if not _equals(field_value, arg):
+                return False
+        elif op == "$ne":
+            if _equals(field_value, arg):
+                return False
+        elif op == "$in":
+            if not any(_equals(field_value, item) for item in arg):
+                return False
+        elif op == "$nin":
+            if any(_equals(field_value, item) for item in arg):
+                return False
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not any(_compare(v, arg, op) for v in _candidates_for(field_value)):
+                return False
+        elif op == "$exists":
+            if (field_value is not _MISSING) != bool(arg):
+                return False
+        elif op == "$regex":
+            flags = re.IGNORECASE if "i" in conditions.get("$options", "") else 0
+            pattern = re.compile(arg, flags)
+            if not any(isinstance(v, str) and pattern.search(v) for v in _candidates_for(field_value)):
+                return False
+        elif op == "$options":
+            continue
+        elif op == "$size":
+            if not isinstance(field_value, list) or len(field_value) != arg:
+                return False
+        elif op == "$type":
+            aliases = {"string": "string", "date": "date", "bool": "bool", "null": "null", "object": "dict",
+                       "array": "list", "double": "number", "int": "number", "long": "number", "number": "number"}
+            wanted = {aliases[t] for t in (arg if isinstance(arg, list) else [arg])}
+            if field_value is _MISSING or _type_class(field_value) not in wanted:
+                return False
+        else:
+            raise NotImplementedError(f"Query operator {op} is not supported by the memory backend")
+    return True
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        else:
+            field_value = _get_path(doc, key)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if not _match_operators(field_value, condition):
+                    return False
+            elif isinstance(condition, re.Pattern):
+                if not any(isinstance(v, str) and condition.search(v) for v in _candidates_for(field_value)):
+                    return False
+            elif not _equals(field_value, _normalize(condition)):
+                return False
+    return True
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include_id = bool(projection.get("_id", 1))
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        projected = {}
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(projected, path, value)
+        if include_id and "_id" in doc:
+            projected["_id"] = doc["_id"]
+        return projected
+    for path in fields:
+        _unset_path(doc, path)
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+
+def _sort_docs(docs: List[dict], sort_spec) -> List[dict]:
+    if not sort_spec:
+        return docs
+    if isinstance(sort_spec, dict):
+        sort_spec = list(sort_spec.items())
+    for field, direction in reversed(sort_spec):
+        docs = sorted(docs, key=lambda d: _sort_key(_get_path(d, field)), reverse=direction < 0)
+    return docs
+
+
+# Updates
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> bool:
+    """Apply update operators in place; returns whether the document changed"""
+    before = copy.deepcopy(doc)
+    if not any(key.startswith("$") for key in update):
+        # Replacement document
+        preserved_id = doc.get("_id")
+        doc.clear()
+        doc.update(_normalize(update))
+        if preserved_id is not None:
+            doc["_id"] = preserved_id
+        return doc != before
+    for op, fields in update.items():
+        fields = _normalize(fields)
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                _set_path(doc, path, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, delta in fields.items():
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + delta)
+        elif op == "$push":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                items = ([] if current is _MISSING else current) + items
+                if isinstance(value, dict) and "$slice" in value:
+                    limit = value["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                _set_path(doc, path, items)
+        elif op == "$addToSet":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                current = [] if current is _MISSING else current
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                _set_path(doc, path, current + [item for item in items if item not in current])
+        elif op == "$pull":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                if isinstance(current, list):
+                    _set_path(doc, path, [item for item in current if item != value])
+        else:
+            raise NotImplementedError(f"Update operator {op} is not supported by the memory backend")
+    return doc != before
+
+
+def _upsert_seed(query: dict) -> dict:
+    """Equality fields of a filter become fields of an upserted document"""
+    seed = {}
+    for key, condition in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            if "$eq" in condition:
+                _set_path(seed, key, _normalize(condition["$eq"]))
+            continue
+        _set_path(seed, key, _normalize(condition))
+    return seed
+
+
+# Aggregation expressions
+def _eval(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [_eval(item, doc) for item in expr]
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            op, arg = next(iter(expr.items()))
+            if op.startswith("$"):
+                return _eval_operator(op, arg, doc)
+        return {key: _eval(value, doc) for key, value in expr.items()}
+    return expr
+
+
+def _to_date(value):
+    if isinstance(value, datetime) or value is None:
+        return value
+    if isinstance(value, str):
+        return _normalize(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    if isinstance(value, (int, float)):
+        return datetime(1970, 1, 1) + timedelta(milliseconds=value)
+    raise ValueError(f"Cannot convert {value!r} to a date")
+
+
+def _date_trunc(spec: dict, doc) -> Optional[datetime]:
+    date = _to_date(_eval(spec["date"], doc))
+    if date is None:
+        return None
+    unit = _eval(spec["unit"], doc)
+    tz = ZoneInfo(_eval(spec.get("timezone", "UTC"), doc))
+    local = date.replace(tzinfo=timezone.utc).astimezone(tz)
+    if unit == "year":
+        local = local.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "month":
+        local = local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "week":
+        weekdays = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        start = weekdays.index(spec.get("startOfWeek", "sunday").lower())
+        local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        local -= timedelta(days=(local.weekday() - start) % 7)
+    elif unit == "day":
+        local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "hour":
+        local = local.replace(minute=0, second=0, microsecond=0)
+    else:
+        raise NotImplementedError(f"$dateTrunc unit {unit} is not supported by the memory backend")
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _eval_operator(op: str, arg, doc):
+    if op == "$literal":
+        return arg
+    if op == "$dateTrunc":
+        return _date_trunc(arg, doc)
+    values = _eval(arg, doc) if isinstance(arg, list) else [_eval(arg, doc)]
+    if op == "$size":
+        return len(values[0] or [])
+    if op == "$toDate":
+        return _to_date(values[0])
+    if op == "$ifNull":
+        return next((v for v in values if v is not None), None)
+    if op == "$add":
+        return sum(v for v in values if v is not None)
+    if op == "$subtract":
+        left, right = values
+        if isinstance(left, datetime) and isinstance(right, datetime):
+            return (left - right).total_seconds() * 1000
+        return left - right
+    if op == "$multiply":
+        result = 1
+        for v in values:
+            result *= v
+        return result
+    if op == "$divide":
+        return values[0] / values[1]
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        left, right = values
+        if op == "$eq":
+            return left == right
+        if op == "$ne":
+            return left != right
+        return _compare(left, right, op)
+    if op == "$cond":
+        if isinstance(arg, dict):
+            condition, then, otherwise = arg["if"], arg["then"], arg["else"]
+        else:
+            condition, then, otherwise = arg
+        return _eval(then, doc) if _eval(condition, doc) else _eval(otherwise, doc)
+    if op == "$in":
+        return values[0] in (values[1] or [])
+    if op == "$setUnion":
+        merged = []
+        for v in values:
+            merged.extend(item for item in (v or []) if item not in merged)
+        return merged
+    raise NotImplementedError(f"Expression operator {op} is not supported by the memory backend")
+
+
+def _accumulate(op: str, expr, docs: List[dict]):
+    values = [_eval(expr, doc) for doc in docs]
+    if op == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if op == "$avg":
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$min":
+        present = [v for v in values if v is not None]
+        return min(present, key=_sort_key) if present else None
+    if op == "$max":
+        present = [v for v in values if v is not None]
+        return max(present, key=_sort_key) if present else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$push":
+        return values
+    if op == "$addToSet":
+        unique = []
+        for v in values:
+            if v not in unique:
+                unique.append(v)
+        return unique
+    raise NotImplementedError(f"Accumulator {op} is not supported by the memory backend")
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: List[dict] = []
+
+    # Reads
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> "MemoryCursor":
+        return MemoryCursor(self, filter or {}, projection, sort=kwargs.get("sort"))
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        docs = self._matching(filter, kwargs.get("sort"))
+        return self._output(_project(docs[0], projection)) if docs else None
+
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs) -> int:
+        return len(self._matching(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None):
+        values = []
+        for doc in self._matching(filter):
+            field_value = _get_path(doc, key)
+            for value in field_value if isinstance(field_value, list) else [field_value]:
+                if value is not _MISSING and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> "MemoryCursor":
+        docs = run_pipeline(self.database, [copy.deepcopy(d) for d in self._docs], pipeline)
+        return MemoryCursor.from_docs(docs, self.database.tz_aware)
+
+    def watch(self, *args, **kwargs):
+        raise NotImplementedError("Change streams are not supported by the memory backend")
+
+    # Writes
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        document.setdefault("_id", _next_object_id())
+        self._docs.append(_normalize(copy.deepcopy(document)))
+        return InsertOneResult(document["_id"])
+
+    async def insert_many(self, documents: List[dict], **kwargs) -> InsertManyResult:
+        ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return InsertManyResult(ids)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, many=False)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, many=True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, replacement, upsert, many=False)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        return self._delete(filter, many=False)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        return self._delete(filter, many=True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  sort=None, upsert: bool = False, return_document: bool = False, **kwargs):
+        docs = self._matching(filter, sort)
+        if not docs:
+            if not upsert:
+                return None
+            doc = self._upsert(filter, update)
+            return self._output(_project(doc, projection)) if return_document else None
+        doc = docs[0]
+        before = _project(doc, projection)
+        _apply_update(doc, update)
+        # ReturnDocument.AFTER is True, ReturnDocument.BEFORE is False
+        return self._output(_project(doc, projection) if return_document else before)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs):
+        docs = self._matching(filter, sort)
+        if not docs:
+            return None
+        self._docs.remove(docs[0])
+        return self._output(_project(docs[0], projection))
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = BulkWriteResult()
+        for request in requests:
+            kind = type(request).__name__
+            if kind == "InsertOne":
+                await self.insert_one(request._doc)
+                result.inserted_count += 1
+            elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                outcome = self._update(request._filter, request._doc, request._upsert, many=kind == "UpdateMany")
+                result.matched_count += outcome.matched_count
+                result.modified_count += outcome.modified_count
+                result.upserted_count += 1 if outcome.upserted_id is not None else 0
+            elif kind in ("DeleteOne", "DeleteMany"):
+                result.deleted_count += self._delete(request._filter, many=kind == "DeleteMany").deleted_count
+            else:
+                raise NotImplementedError(f"Bulk operation {kind} is not supported by the memory backend")
+        return result
+
+    # Indexes are irrelevant for a linear scan; accept and ignore them
+    async def create_index(self, keys, **kwargs) -> str:
+        if isinstance(keys, str):
+            return f"{keys}_1"
+        return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    async def create_indexes(self, indexes, **kwargs) -> List[str]:
+        return [f"index_{idx}" for idx, _ in enumerate(indexes)]
+
+    async def drop(self):
+        self._docs = []
+
+    # Internals
+    def _output(self, doc: dict) -> dict:
+        return _localize(doc) if self.database.tz_aware else doc
+
+    def _matching(self, filter: Optional[dict], sort=None) -> List[dict]:
+        docs = [doc for doc in self._docs if matches(doc, filter)]
+        return _sort_docs(docs, sort)
+
+    def _upsert(self, filter: dict, update: dict) -> dict:
+        doc = _upsert_seed(filter)
+        _apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", _next_object_id())
+        self._docs.append(doc)
+        return doc
+
+    def _update(self, filter: dict, update: dict, upsert: bool, many: bool) -> UpdateResult:
+        docs = self._matching(filter)
+        if not many:
+            docs = docs[:1]
+        if not docs and upsert:
+            doc = self._upsert(filter, update)
+            return UpdateResult(0, 0, upserted_id=doc["_id"])
+        modified = sum(1 for doc in docs if _apply_update(doc, update))
+        return UpdateResult(len(docs), modified)
+
+    def _delete(self, filter: dict, many: bool) -> DeleteResult:
+        docs = self._matching(filter)
+        if not many:
+            docs = docs[:1]
+        for doc in docs:
+            self._docs.remove(doc)
+        return DeleteResult(len(docs))
+
+
+class MemoryCursor:
+    def __init__(self, collection: Optional[MemoryCollection], filter: dict, projection: Optional[dict], sort=None):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = sort
+        self._skip = 0
+        self._limit = 0
+        self._docs: Optional[List[dict]] = None
+        self._iterator = None
+        self._tz_aware = collection.database.tz_aware if collection else False
+
+    @classmethod
+    def from_docs(cls, docs: List[dict], tz_aware: bool = False) -> "MemoryCursor":
+        cursor = cls(None, {}, None)
+        cursor._docs = [_localize(doc) for doc in docs] if tz_aware else docs
+        cursor._tz_aware = tz_aware
+        return cursor
+
+    def sort(self, key_or_list, direction: int = 1) -> "MemoryCursor":
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "MemoryCursor":
+        return self
+
+    def _results(self) -> List[dict]:
+        if self._docs is None:
+            docs = self._collection._matching(self._filter, self._sort)[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._docs = [_project(doc, self._projection) for doc in docs]
+            if self._tz_aware:
+                self._docs = [_localize(doc) for doc in self._docs]
+        return self._docs
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._results()
+        return docs[:length] if length else list(docs)
+
+    def __aiter__(self):
+        self._iterator = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def run_pipeline(database: "MemoryDatabase", docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif name == "$sort":
+            docs = _sort_docs(docs, spec)
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$project" or name == "$addFields" or name == "$set":
+            docs = [_project_stage(doc, spec, name != "$project") for doc in docs]
+        elif name == "$unwind":
+            path = (spec if isinstance(spec, str) else spec["path"])[1:]
+            unwound = []
+            for doc in docs:
+                value = _get_path(doc, path)
+                for item in value if isinstance(value, list) else []:
+                    copied = copy.deepcopy(doc)
+                    _set_path(copied, path, item)
+                    unwound.append(copied)
+            docs = unwound
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$facet":
+            docs = [{key: run_pipeline(database, [copy.deepcopy(d) for d in docs], sub) for key, sub in spec.items()}]
+        elif name == "$lookup":
+            foreign = database[spec["from"]]._docs
+            for doc in docs:
+                local = _get_path(doc, spec["localField"])
+                local_values = local if isinstance(local, list) else [local]
+                doc[spec["as"]] = [
+                    copy.deepcopy(f) for f in foreign
+                    if any(_equals(_get_path(f, spec["foreignField"]), v) for v in local_values if v is not _MISSING)
+                ]
+        elif name == "$replaceRoot":
+            docs = [_eval(spec["newRoot"], doc) for doc in docs]
+        else:
+            raise NotImplementedError(f"Pipeline stage {name} is not supported by the memory backend")
+    return docs
+
+
+def _project_stage(doc: dict, spec: dict, add_fields: bool) -> dict:
+    if add_fields:
+        result = copy.deepcopy(doc)
+        for key, expr in spec.items():
+            _set_path(result, key, _eval(expr, doc))
+        return result
+    inclusions = {k: v for k, v in spec.items() if k != "_id"}
+    if all(v in (0, False) for v in inclusions.values()):
+        return _project(doc, spec)
+    result = {}
+    if spec.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for key, expr in inclusions.items():
+        if expr in (1, True):
+            value = _get_path(doc, key)
+            if value is not _MISSING:
+                _set_path(result, key, value)
+        else:
+            _set_path(result, key, _eval(expr, doc))
+    return result
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, List[dict]] = {}
+    keys: Dict[Any, Any] = {}
+    for doc in docs:
+        key = _eval(spec["_id"], doc)
+        hashable = repr(key)
+        groups.setdefault(hashable, []).append(doc)
+        keys[hashable] = key
+    results = []
+    for hashable, members in groups.items():
+        row = {"_id": keys[hashable]}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            row[field] = _accumulate(op, expr, members)
+        results.append(row)
+    return results
+
+
+class MemoryDatabase:
+    def __init__(self, name: str, tz_aware: bool = False):
+        self.name = name
+        self.tz_aware = tz_aware
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def watch(self, *args, **kwargs):
+        raise NotImplementedError("Change streams are not supported by the memory backend")
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command, *args, **kwargs):
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {command} is not supported by the memory backend")
+
+
+class MemoryClient:
+    """Drop-in for AsyncIOMotorClient backed by process memory"""
+
+    def __init__(self, *args, tz_aware: bool = False, **kwargs):
+        self.tz_aware = tz_aware
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name, self.tz_aware)
+        return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    def close(self):
+        pass
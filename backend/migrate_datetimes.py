@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Convert ISO-string timestamps to native BSON datetimes in place.
+
+Documents are processed in _id order in batches; the last converted _id per collection is
+checkpointed in the `migrations` collection, so an interrupted run resumes where it stopped.
+Each update is guarded by the original string value, so documents changed concurrently are
+left for the next run instead of being overwritten.
+
+Usage: python migrate_datetimes.py [--batch-size N] [--dry-run] [--restart]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from server import db
+
+MIGRATION_ID = "native_datetimes"
+
+DATETIME_FIELDS: Dict[str, List[str]] = {
+    "users": ["created_at"],
+    "clients": ["created_at"],
+    "positions": ["created_at"],
+    "candidates": ["created_at"],
+    "interviews": ["created_at", "interview_date"],
+    "attachments": ["created_at", "expires_at"],
+    "email_outbox": ["created_at", "next_attempt_at", "locked_at", "sent_at"],
+    "email_config": ["updated_at"],
+    "mail_merge_jobs": ["created_at", "finished_at"],
+    "profile_sharing_log": ["timestamp"],
+    "pipeline_counters": ["reconciled_at"],
+}
+
+logger = logging.getLogger("migrate_datetimes")
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse a stored ISO string; naive values were written as UTC"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+async def migrate_collection(name: str, fields: List[str], batch_size: int, dry_run: bool) -> dict:
+    collection = db[name]
+    checkpoint = await db.migrations.find_one({"id": MIGRATION_ID}, {"_id": 0, f"last_id.{name}": 1}) or {}
+    last_id = checkpoint.get("last_id", {}).get(name)
+    stats = {"scanned": 0, "converted": 0, "unparseable": 0}
+
+    while True:
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        projection = {"_id": 1, **{field: 1 for field in fields}}
+        batch = await collection.find(query, projection).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            stats["scanned"] += 1
+            guard, update = {"_id": doc["_id"]}, {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                parsed = parse_timestamp(value)
+                if parsed is None:
+                    stats["unparseable"] += 1
+                    logger.warning("%s %s: cannot parse %s=%r", name, doc["_id"], field, value)
+                    continue
+                guard[field] = value
+                update[field] = parsed
+            if update:
+                operations.append(UpdateOne(guard, {"$set": update}))
+
+        if operations and not dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+        elif dry_run:
+            stats["converted"] += len(operations)
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            await db.migrations.update_one(
+                {"id": MIGRATION_ID},
+                {"$set": {f"last_id.{name}": last_id, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        logger.info("%s: scanned %d, converted %d", name, stats["scanned"], stats["converted"])
+
+    return stats
+
+
+async def run(batch_size: int, dry_run: bool, restart: bool) -> Dict[str, dict]:
+    if restart and not dry_run:
+        await db.migrations.delete_one({"id": MIGRATION_ID})
+    results = {}
+    for name, fields in DATETIME_FIELDS.items():
+        results[name] = await migrate_collection(name, fields, batch_size, dry_run)
+    if not dry_run:
+        await db.migrations.update_one(
+            {"id": MIGRATION_ID},
+            {"$set": {"completed_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="count convertible documents without writing")
+    parser.add_argument("--restart", action="store_true", help="ignore saved checkpoints and rescan everything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    results = asyncio.run(run(args.batch_size, args.dry_run, args.restart))
+    for name, stats in results.items():
+        print(f"{name:<20} scanned={stats['scanned']:<8} converted={stats['converted']:<8} unparseable={stats['unparseable']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Copy uploaded resumes and JDs from this pod's uploads/ directories into FILE_STORAGE.
+
+Run it once per pod (or against a volume holding all pods' uploads) after switching
+FILE_STORAGE to gridfs or s3. Keys already in the target with the same size are skipped, so
+an interrupted run can simply be repeated. Every copy is verified by size before the local
+file is removed (only with --delete-source). Afterwards, candidate and position records whose
+file is still missing from the target are counted, to show which uploads were on other pods.
+
+Usage: FILE_STORAGE=gridfs python migrate_files.py [--dry-run] [--delete-source] [--concurrency N]
+"""
+import argparse
+import asyncio
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Dict, List
+
+from server import FILE_STORAGE, JD_DIR, RESUME_DIR, db, file_storage
+
+SOURCES = {"resumes": RESUME_DIR, "jds": JD_DIR}
+
+# Leftovers of the old bulk upload, which parsed from temp_<uuid>_<name> copies in RESUME_DIR
+SKIPPED_PREFIXES = ("temp_", ".")
+
+logger = logging.getLogger("migrate_files")
+
+
+def local_files(directory: Path) -> List[Path]:
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir()
+                  if path.is_file() and not path.name.startswith(SKIPPED_PREFIXES))
+
+
+async def copy_file(prefix: str, path: Path, dry_run: bool, delete_source: bool, stats: Dict[str, int]):
+    key = f"{prefix}/{path.name}"
+    size = path.stat().st_size
+    existing = await file_storage.stat(key)
+    if existing is not None and existing.size == size:
+        stats["skipped"] += 1
+    elif dry_run:
+        stats["copied"] += 1
+    else:
+        content_type = mimetypes.guess_type(path.name)[0]
+        with open(path, "rb") as source:
+            await file_storage.save(key, source, content_type)
+        stored = await file_storage.stat(key)
+        if stored is None or stored.size != size:
+            stats["failed"] += 1
+            logger.error("%s: stored size %s does not match local size %d", key, stored and stored.size, size)
+            return
+        stats["copied"] += 1
+        stats["bytes"] += size
+    if delete_source and not dry_run:
+        path.unlink()
+        stats["deleted"] += 1
+
+
+async def count_missing(collection: str, field: str, prefix: str) -> int:
+    missing = 0
+    async for doc in db[collection].find({field: {"$nin": [None, ""]}}, {"_id": 0, field: 1}):
+        if await file_storage.stat(f"{prefix}/{doc[field]}") is None:
+            missing += 1
+    return missing
+
+
+async def run(dry_run: bool, delete_source: bool, concurrency: int) -> Dict[str, dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def guarded(prefix: str, path: Path, stats: Dict[str, int]):
+        async with semaphore:
+            try:
+                await copy_file(prefix, path, dry_run, delete_source, stats)
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error("%s/%s: %s", prefix, path.name, e)
+
+    for prefix, directory in SOURCES.items():
+        stats = {"found": 0, "copied": 0, "skipped": 0, "failed": 0, "deleted": 0, "bytes": 0}
+        files = local_files(directory)
+        stats["found"] = len(files)
+        await asyncio.gather(*(guarded(prefix, path, stats) for path in files))
+        logger.info("%s: %d found, %d copied, %d already present", prefix, stats["found"], stats["copied"], stats["skipped"])
+        results[prefix] = stats
+
+    if not dry_run:
+        results["resumes"]["missing"] = await count_missing("candidates", "resume_file", "resumes")
+        results["jds"]["missing"] = await count_missing("positions", "jd_file", "jds")
+    await file_storage.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="count files to copy without writing")
+    parser.add_argument("--delete-source", action="store_true", help="remove local files once copied and verified")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    if FILE_STORAGE == "local":
+        raise SystemExit("FILE_STORAGE is local, which is where the files already are; set it to gridfs or s3")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    results = asyncio.run(run(args.dry_run, args.delete_source, args.concurrency))
+    for prefix, stats in results.items():
+        line = (f"{prefix:<8} found={stats['found']:<6} copied={stats['copied']:<6} skipped={stats['skipped']:<6} "
+                f"failed={stats['failed']:<4} deleted={stats['deleted']:<6} bytes={stats['bytes']}")
+        if "missing" in stats:
+            line += f" missing_in_target={stats['missing']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Stand-in S3-compatible object store for local development and tests.
+
+Implements the slice of the S3 API that FILE_STORAGE=s3 uses: path-style PUT, GET (with Range),
+HEAD and DELETE of objects, and ListObjectsV2. Objects are plain files under --dir, so they can
+be inspected by hand. Buckets are created on first write, and request signatures are accepted
+without being checked. Use MinIO or a real bucket for anything beyond local testing.
+
+Usage:
+    python object_store.py serve [--port 9000] [--dir object_store]
+"""
+import argparse
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+DEFAULT_DIR = Path(__file__).parent / 'object_store'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ObjectStoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _target(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = unquote(parts.path).lstrip("/").partition("/")
+        if not bucket or ".." in key.split("/") or ".." == bucket:
+            return None, None, parts
+        return self.server.root / bucket, key, parts
+
+    def _reply(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _not_found(self):
+        self._reply(404, b"<Error><Code>NoSuchKey</Code></Error>", {"Content-Type": "application/xml"})
+
+    def _object_headers(self, path: Path) -> dict:
+        st = path.stat()
+        return {"ETag": f'"{self.server.etag(path)}"', "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+                "Content-Type": self.server.content_types.get(path, "application/octet-stream"),
+                "Accept-Ranges": "bytes"}
+
+    def do_PUT(self):
+        bucket, key, _ = self._target()
+        if bucket is None or not key:
+            self._reply(400)
+            return
+        path = bucket / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        remaining = int(self.headers.get("Content-Length", 0))
+        digest = hashlib.md5()
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.part")
+        with open(tmp, "wb") as f:
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, 256 * 1024))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                remaining -= len(chunk)
+        os.replace(tmp, path)
+        with self.server.lock:
+            self.server.etags[path] = digest.hexdigest()
+            self.server.content_types[path] = self.headers.get("Content-Type", "application/octet-stream")
+        self._reply(200, headers={"ETag": f'"{digest.hexdigest()}"'})
+
+    def do_HEAD(self):
+        bucket, key, _ = self._target()
+        path = bucket / key if bucket is not None and key else None
+        if path is None or not path.is_file():
+            self._reply(404)
+            return
+        self._reply(200, headers={**self._object_headers(path), "Content-Length": str(path.stat().st_size)})
+
+    def do_GET(self):
+        bucket, key, parts = self._target()
+        if bucket is not None and not key:
+            self._list(bucket, parse_qs(parts.query))
+            return
+        path = bucket / key if bucket is not None else None
+        if path is None or not path.is_file():
+            self._not_found()
+            return
+        size = path.stat().st_size
+        start, end, status = 0, size - 1, 200
+        match = RANGE_PATTERN.match(self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start > end:
+                self._reply(416, headers={"Content-Range": f"bytes */{size}"})
+                return
+            status = 206
+        headers = {**self._object_headers(path), "Content-Length": str(end - start + 1)}
+        if status == 206:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        self._reply(status, headers=headers)
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, 256 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def do_DELETE(self):
+        bucket, key, _ = self._target()
+        if bucket is not None and key:
+            path = bucket / key
+            if path.is_file():
+                path.unlink()
+            with self.server.lock:
+                self.server.etags.pop(path, None)
+                self.server.content_types.pop(path, None)
+        self._reply(204)
+
+    def _list(self, bucket: Path, query: dict):
+        prefix = query.get("prefix", [""])[0]
+        limit = int(query.get("max-keys", ["1000"])[0])
+        after = query.get("continuation-token", [""])[0]
+        keys = sorted(path.relative_to(bucket).as_posix() for path in bucket.rglob("*")
+                      if path.is_file() and not path.name.startswith(".")) if bucket.is_dir() else []
+        keys = [key for key in keys if key.startswith(prefix) and key > after]
+        page, truncated = keys[:limit], len(keys) > limit
+        items = []
+        for key in page:
+            path = bucket / key
+            st = path.stat()
+            modified = datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            items.append(f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                         f"<ETag>\"{self.server.etag(path)}\"</ETag><Size>{st.st_size}</Size></Contents>")
+        token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f"<Name>{escape(bucket.name)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+                f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}{''.join(items)}"
+                "</ListBucketResult>")
+        self._reply(200, body.encode(), {"Content-Type": "application/xml"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ObjectStoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, root: Path):
+        super().__init__(address, ObjectStoreHandler)
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self.etags = {}
+        self.content_types = {}
+
+    def etag(self, path: Path) -> str:
+        """MD5 of the object, like S3 for single-part uploads; hashed lazily for files not PUT here"""
+        with self.lock:
+            known = self.etags.get(path)
+        if known is None:
+            with open(path, "rb") as f:
+                known = hashlib.md5(f.read()).hexdigest()
+            with self.lock:
+                self.etags[path] = known
+        return known
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="serve an S3-compatible API over a directory")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=9000)
+    serve_parser.add_argument("--dir", type=Path, default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    args.dir.mkdir(parents=True, exist_ok=True)
+    server = ObjectStoreServer((args.host, args.port), args.dir)
+    print(f"Serving S3-compatible API on http://{args.host}:{args.port} from {args.dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+On-demand statistical CPU profiler and allocation tracker for a live worker.
+
+A sampler thread snapshots every other thread's stack at a fixed interval via
+sys._current_frames, so the event loop, to_thread work and Motor's executor threads are all
+covered without instrumenting them. Each sample credits its innermost frame with "self" time
+and every distinct function on the stack with "total" time. tracemalloc runs alongside for
+the same window and reports where the memory allocated during it came from. Both add overhead
+(tracemalloc noticeably so), which is why a profile is time-boxed and runs only when asked for.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+MAX_STACK_DEPTH = 64
+
+# Innermost frames of threads parked waiting for work: the loop's selector, idle executor
+# workers, Event/Condition waits. Samples ending here are not CPU time and are skipped.
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+
+
+def frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    def __init__(self, interval: float = 0.005, memory: bool = True, memory_frames: int = 1):
+        self.interval = interval
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self.stack_counts: Counter = Counter()
+        self.thread_counts: Counter = Counter()
+        self._thread_names: Dict[int, str] = {}
+        self._loop_thread_id: Optional[int] = None
+        self._started_tracemalloc = False
+        self._memory_start: Optional[tracemalloc.Snapshot] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        self._elapsed = 0.0
+
+    def start(self, loop_thread_id: Optional[int] = None):
+        """Begin sampling; loop_thread_id labels the event loop thread in the report"""
+        self._loop_thread_id = loop_thread_id
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.memory_frames)
+                self._started_tracemalloc = True
+            self._memory_start = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, limit: int = 30) -> dict:
+        """Stop sampling and build the report; blocks briefly, call it off the event loop"""
+        self._stopped.set()
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+        memory = self._memory_report(limit) if self.memory else None
+        return {
+            "duration_seconds": round(self._elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 2),
+            "samples": self.samples,
+            "threads": self._thread_report(),
+            "functions": self._function_report(limit),
+            "stacks": self._stack_report(limit),
+            "memory": memory,
+        }
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self._names()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(thread_id, frame)
+            self.samples += 1
+
+    def _names(self):
+        for thread in threading.enumerate():
+            if thread.ident not in self._thread_names:
+                name = "event loop" if thread.ident == self._loop_thread_id else thread.name
+                self._thread_names[thread.ident] = name
+
+    def _sample(self, thread_id: int, frame):
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+            return
+        stack: List[str] = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        thread = self._thread_names.get(thread_id, str(thread_id))
+        self.thread_counts[thread] += 1
+        self.self_counts[stack[0]] += 1
+        for label in set(stack):
+            self.total_counts[label] += 1
+        self.stack_counts[(thread,) + tuple(reversed(stack))] += 1
+
+    def _thread_report(self) -> List[dict]:
+        return [{"thread": thread, "busy_samples": count,
+                 "busy_percent": round(100 * count / self.samples, 1) if self.samples else 0.0}
+                for thread, count in self.thread_counts.most_common()]
+
+    def _function_report(self, limit: int) -> List[dict]:
+        busy = sum(self.thread_counts.values()) or 1
+        return [{"function": label, "self_samples": count, "total_samples": self.total_counts[label],
+                 "self_percent": round(100 * count / busy, 1),
+                 "total_percent": round(100 * self.total_counts[label] / busy, 1)}
+                for label, count in self.self_counts.most_common(limit)]
+
+    def _stack_report(self, limit: int) -> List[dict]:
+        """Folded stacks (thread;outer;...;inner), the input format flame graph tools take"""
+        return [{"stack": ";".join(stack), "samples": count} for stack, count in self.stack_counts.most_common(limit)]
+
+    def _memory_report(self, limit: int) -> dict:
+        end = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        end = end.filter_traces(filters)
+        start = self._memory_start.filter_traces(filters)
+        sites = [stat for stat in end.compare_to(start, "lineno") if stat.size_diff > 0]
+        return {
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "allocated_bytes": sum(stat.size_diff for stat in sites),
+            "sites": [{"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                       "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff,
+                       "size_bytes": stat.size, "count": stat.count}
+                      for stat in sites[:limit]],
+        }
@@ -1,45 +1,206 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response
+from fastapi.responses import Response, HTMLResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, ReplaceOne, monitoring
+from pymongo.errors import OperationFailure, PyMongoError
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, BinaryIO, TYPE_CHECKING
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from passlib.context import CryptContext
 import jwt
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.units import inch
 import io
 import base64
+import binascii
+import hashlib
+import html
+import json
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from string import Template
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, LoopLagMonitor, MetricsRegistry, RequestMetricsMiddleware
+from loop_watchdog import LoopWatchdog, TaskScopeMiddleware
+from profiler import Profiler
+from file_storage import FileStorage, GridFSFileStorage, LocalFileStorage, S3FileStorage
+from file_responses import StoredFileResponse, etag_matches
+from tracing import KIND_CLIENT, KIND_CONSUMER, MongoCommandTracing, Tracer, TracingMiddleware, create_exporter, current_span
 from enum import Enum
 import re
-import pdfplumber
-from docx import Document
 from typing import Union
 import csv
 from io import StringIO
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+
+if TYPE_CHECKING:
+    import smtplib
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+
+# reportlab, pdfplumber, python-docx, PyPDF2 and smtplib/email are imported where they are
+# used, so a new pod serves its first request without paying for them; see warm_up_imports
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Storage backend: "mongo" (Motor) or "memory" (in-process, for tests and micro-benchmarks)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+
+# Uploaded resumes/JDs: "local" (uploads/ on this pod), "gridfs" (shared, in MongoDB) or "s3" (S3-compatible bucket).
+# Anything but local is needed once there is more than one replica.
+FILE_STORAGE = os.environ.get('FILE_STORAGE', 'local').lower()
+GRIDFS_BUCKET = os.environ.get('GRIDFS_BUCKET', 'files')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL', '')
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+S3_PREFIX = os.environ.get('S3_PREFIX', '')
+S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID', '')
+S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+
+# Import heavy document/email libraries in a background task once the app is serving ("0" = on first use)
+WARMUP_IMPORTS = os.environ.get('WARMUP_IMPORTS', '1') not in ('0', 'false', 'no')
+
+# Request tracing: none, file (OTLP/JSON lines in TRACE_FILE) or otlp (POST to TRACE_OTLP_ENDPOINT/v1/traces).
+# Trace ids are returned in X-Trace-Id / traceparent headers either way.
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none').lower()
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+TRACE_FILE = os.environ.get('TRACE_FILE', str(ROOT_DIR / 'traces' / 'spans.jsonl'))
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://localhost:4318')
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'recruithub-backend')
+
+# Connection pool and timeouts
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '10000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '0'))  # 0 = no timeout
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0'))  # 0 = wait forever
+
+# Read routing: which members serve each read-heavy workload.
+# Writes and read-your-own-write paths always use the primary through `db`.
+MONGO_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '90'))  # MongoDB minimum is 90
+READ_WORKLOADS = {
+    "analytics": os.environ.get('MONGO_READ_PREFERENCE_ANALYTICS', 'secondaryPreferred'),
+    "export": os.environ.get('MONGO_READ_PREFERENCE_EXPORT', 'secondaryPreferred'),
+    "search": os.environ.get('MONGO_READ_PREFERENCE_SEARCH', 'secondaryPreferred'),
+}
+
+
+# Metrics
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time from request to response headers by route template", ("method", "route"))
+http_requests_total = metrics.counter(
+    "http_requests_total", "Requests by route template and status code", ("method", "route", "status"))
+mongo_command_seconds = metrics.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips by command name", ("command", "outcome"))
+resume_parse_seconds = metrics.histogram(
+    "resume_parse_duration_seconds", "Resume text extraction and field parsing", ("format",))
+pdf_render_seconds = metrics.histogram(
+    "pdf_render_duration_seconds", "ReportLab layout of profile PDFs (one per document or batch chunk)")
+pdf_profiles_rendered_total = metrics.counter(
+    "pdf_profiles_rendered_total", "Candidate profiles rendered into PDFs")
+event_loop_lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds", "Delay in waking a sleeping task on the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+event_loop_lag_last_seconds = metrics.gauge(
+    "event_loop_lag_last_seconds", "Most recent event loop lag sample")
+background_queue_depth = metrics.gauge(
+    "background_queue_depth", "Pending work in background queues", ("queue",))
+event_loop_stalls_total = metrics.counter(
+    "event_loop_stalls_total", "Loop stalls over LOOP_WATCHDOG_THRESHOLD_MS by route or task", ("origin",))
+
+def executor_queue_stats(attribute: str) -> Dict[tuple, float]:
+    """Waiting work (attribute="queued") or running threads (attribute="threads") per thread pool"""
+    import anyio.to_thread
+    
+    values = {}
+    # asyncio.to_thread work: PDF rendering, SMTP, file writes
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is not None:
+        values[("asyncio_default",)] = executor._work_queue.qsize() if attribute == "queued" else len(executor._threads)
+    # Starlette threadpool: sync dependencies and UploadFile reads
+    limiter = anyio.to_thread.current_default_thread_limiter().statistics()
+    values[("anyio",)] = limiter.tasks_waiting if attribute == "queued" else limiter.borrowed_tokens
+    return values
+
+metrics.gauge("executor_queue_depth", "Tasks waiting for a worker thread", ("executor",),
+              callback=lambda: executor_queue_stats("queued"))
+metrics.gauge("executor_busy_threads", "Worker threads running or started per pool", ("executor",),
+              callback=lambda: executor_queue_stats("threads"))
+
+tracer = Tracer(create_exporter(TRACE_EXPORTER, TRACE_SERVICE_NAME, TRACE_FILE, TRACE_OTLP_ENDPOINT), TRACE_SAMPLE_RATE)
+metrics.gauge("trace_spans", "Spans by export outcome", ("outcome",), callback=lambda: {
+    ("exported",): tracer.exported, ("dropped",): tracer.dropped, ("queued",): len(tracer._queue)})
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Feeds mongodb_command_duration_seconds; PyMongo calls this from its own threads"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_seconds.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_command_seconds.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+
+def create_storage_client():
+    """Create the database client for the configured storage backend"""
+    if STORAGE_BACKEND == 'memory':
+        from memory_db import MemoryClient
+        return MemoryClient(tz_aware=True)
+    if STORAGE_BACKEND != 'mongo':
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS or None,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        event_listeners=[MongoCommandMetrics(), MongoCommandTracing(tracer)]
+    )
+
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+def make_read_preference(mode: str, max_staleness: int = MONGO_MAX_STALENESS_SECONDS):
+    """Build a read preference; secondaries further behind than max_staleness are skipped"""
+    if mode not in READ_PREFERENCE_MODES:
+        raise RuntimeError(f"Unknown read preference: {mode}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = create_storage_client()
 db = client[os.environ['DB_NAME']]
+READ_PREFERENCES = {workload: make_read_preference(mode) for workload, mode in READ_WORKLOADS.items()}
+analytics_db = client.get_database(os.environ['DB_NAME'], read_preference=READ_PREFERENCES["analytics"])
+export_db = client.get_database(os.environ['DB_NAME'], read_preference=READ_PREFERENCES["export"])
+search_db = client.get_database(os.environ['DB_NAME'], read_preference=READ_PREFERENCES["search"])
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -59,13 +220,149 @@ api_router = APIRouter(prefix="/api")
 async def root():
     return {"message": "Recruitment Management API", "status": "running"}
 
+# Registered first so the pool is open (and a bad MONGO_URL fails fast) before other startup hooks query
+@app.on_event("startup")
+async def open_storage_pool():
+    started = time.perf_counter()
+    await db.command("ping")
+    logger.info("Storage pool ready in %.0f ms", (time.perf_counter() - started) * 1000)
+
+HEAVY_MODULES = (
+    "reportlab.platypus", "reportlab.lib.styles", "pdfplumber", "PyPDF2", "docx",
+    "smtplib", "email.mime.multipart", "email.mime.base", "email.mime.text"
+)
+warmup_state = {"done": False, "seconds": None, "failed": []}
+
+def import_heavy_modules() -> List[str]:
+    """Import the lazily used libraries and load the bcrypt backend; returns modules that failed"""
+    import importlib
+    failed = []
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            failed.append(name)
+    pwd_context.dummy_verify()
+    return failed
+
+async def warm_up():
+    started = time.perf_counter()
+    try:
+        warmup_state["failed"] = await asyncio.to_thread(import_heavy_modules)
+    except Exception:
+        logger.exception("Warm-up failed; modules will load on first use")
+    warmup_state.update(done=True, seconds=round(time.perf_counter() - started, 3))
+    logger.info("Warm-up finished in %.2fs", warmup_state["seconds"])
+
+@app.on_event("startup")
+async def warm_up_imports():
+    # Not awaited: readiness does not wait for it, the first PDF/parse request just might
+    if WARMUP_IMPORTS:
+        app.state.warmup_task = asyncio.create_task(warm_up())
+
 # Ensure upload directories exist
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 JD_DIR = UPLOADS_DIR / 'jds'
 RESUME_DIR = UPLOADS_DIR / 'resumes'
+PDF_CACHE_DIR = UPLOADS_DIR / 'pdf_cache'
 JD_DIR.mkdir(parents=True, exist_ok=True)
 RESUME_DIR.mkdir(parents=True, exist_ok=True)
 
+def create_file_storage() -> FileStorage:
+    """Storage for uploads and generated files, keyed resumes/<name>, jds/<name> and attachments/<id>"""
+    if FILE_STORAGE == 'local':
+        return LocalFileStorage(UPLOADS_DIR)
+    if FILE_STORAGE == 'gridfs':
+        if STORAGE_BACKEND != 'mongo':
+            raise RuntimeError("FILE_STORAGE=gridfs needs STORAGE_BACKEND=mongo")
+        return GridFSFileStorage(db, GRIDFS_BUCKET)
+    if FILE_STORAGE == 's3':
+        if not (S3_ENDPOINT_URL and S3_BUCKET):
+            raise RuntimeError("FILE_STORAGE=s3 needs S3_ENDPOINT_URL and S3_BUCKET")
+        return S3FileStorage(S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY, S3_REGION, S3_PREFIX)
+    raise RuntimeError(f"Unknown FILE_STORAGE: {FILE_STORAGE}")
+
+file_storage = create_file_storage()
+
+def upload_name(prefix: str, filename: str) -> str:
+    """Stored file name: an id prefix plus the client's file name, stripped of any directories"""
+    return f"{prefix}_{Path(filename or 'upload').name}"
+
+async def stored_file_response(key: str, owner_id: str, request: Request) -> StoredFileResponse:
+    """Download response for a stored upload, named as the client originally uploaded it"""
+    info = await file_storage.stat(key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="File not found in storage")
+    name = key.rsplit("/", 1)[-1]
+    return StoredFileResponse(file_storage, info, request.headers, name.removeprefix(f"{owner_id}_"))
+
+# Generated attachments are kept this long for emails to reference them
+ATTACHMENT_TTL_HOURS = int(os.environ.get('ATTACHMENT_TTL_HOURS', '24'))
+# How often a worker sweeps file storage for attachments whose metadata the TTL index removed
+ATTACHMENT_PRUNE_INTERVAL_SECONDS = int(os.environ.get('ATTACHMENT_PRUNE_INTERVAL_SECONDS', '600'))
+# Multiple of 57 bytes so each chunk encodes to whole 76-character base64 lines
+ATTACHMENT_READ_CHUNK = 57 * 1024
+
+# Profile PDF cache limits
+PDF_CACHE_MAX_ENTRIES = int(os.environ.get('PDF_CACHE_MAX_ENTRIES', '256'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Resume previews: extracted text is kept per content hash in MongoDB, and per stored version in-process
+RESUME_PREVIEW_CACHE_TTL_SECONDS = float(os.environ.get('RESUME_PREVIEW_CACHE_TTL_SECONDS', '3600'))
+RESUME_PREVIEW_MAX_BYTES = int(os.environ.get('RESUME_PREVIEW_MAX_MB', '20')) * 1024 * 1024
+RESUME_PREVIEW_MAX_CHARS = int(os.environ.get('RESUME_PREVIEW_MAX_CHARS', '100000'))
+
+# Batch profile PDF generation limits
+PDF_BATCH_MAX_CANDIDATES = int(os.environ.get('PDF_BATCH_MAX_CANDIDATES', '5000'))
+PDF_BATCH_JOB_TTL_SECONDS = int(os.environ.get('PDF_BATCH_JOB_TTL_SECONDS', '3600'))
+# A running job whose worker has not reported progress for this long is taken to have died with it
+PDF_BATCH_STALE_SECONDS = int(os.environ.get('PDF_BATCH_STALE_SECONDS', '600'))
+
+# Interview scheduling: durations are bounded so overlap checks scan a fixed window of interview_date
+INTERVIEW_DEFAULT_MINUTES = int(os.environ.get('INTERVIEW_DEFAULT_MINUTES', '60'))
+INTERVIEW_MAX_MINUTES = int(os.environ.get('INTERVIEW_MAX_MINUTES', '480'))
+INTERVIEW_CALENDAR_MAX_DAYS = int(os.environ.get('INTERVIEW_CALENDAR_MAX_DAYS', '93'))
+
+# Dashboard stats cache
+DASHBOARD_CACHE_TTL_SECONDS = float(os.environ.get('DASHBOARD_CACHE_TTL_SECONDS', '15'))
+ANALYTICS_CACHE_TTL_SECONDS = float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '300'))
+# Per-user visible positions/clients; evicted on position writes, TTL bounds staleness from other replicas
+ACCESS_SCOPE_TTL_SECONDS = float(os.environ.get('ACCESS_SCOPE_TTL_SECONDS', '300'))
+# Authenticated user documents; evicted across replicas by the invalidation bus
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+
+# Cross-replica cache invalidation over change streams ("auto" disables itself without a replica set)
+CACHE_INVALIDATION_BUS = os.environ.get('CACHE_INVALIDATION_BUS', 'auto').lower()
+# Only a stable id (one per replica that survives restarts) is worth checkpointing; without one a
+# process starts from an empty cache and follows the stream from the moment it opens
+CACHE_BUS_CONSUMER_ID = os.environ.get('CACHE_BUS_CONSUMER_ID') or None
+CACHE_BUS_CHECKPOINT_SECONDS = float(os.environ.get('CACHE_BUS_CHECKPOINT_SECONDS', '5'))
+
+# Metrics exposed on /metrics (outside /api, so the ingress does not route it); 0 disables the loop-lag probe
+METRICS_LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('METRICS_LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+# Queue depth gauges are counted in MongoDB on this interval, not per scrape; 0 disables them
+METRICS_QUEUE_DEPTH_INTERVAL_SECONDS = float(os.environ.get('METRICS_QUEUE_DEPTH_INTERVAL_SECONDS', '30'))
+
+# Opt-in stall detector: captures the stack of whatever blocks the event loop longer than the threshold
+LOOP_WATCHDOG_ENABLED = os.environ.get('LOOP_WATCHDOG', '0').lower() in ('1', 'true', 'yes')
+LOOP_WATCHDOG_THRESHOLD_MS = float(os.environ.get('LOOP_WATCHDOG_THRESHOLD_MS', '100'))
+
+# Upper bound for admin on-demand profiles (/api/debug/profile)
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))
+
+# Outbound email queue
+EMAIL_OUTBOX_CONCURRENCY = int(os.environ.get('EMAIL_OUTBOX_CONCURRENCY', '2'))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', '5'))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5'))
+EMAIL_RETRY_BASE_SECONDS = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', '30'))
+EMAIL_SENDING_TIMEOUT_SECONDS = int(os.environ.get('EMAIL_SENDING_TIMEOUT_SECONDS', '600'))
+# Running mail-merge jobs record a heartbeat; one silent for longer died with its worker
+MAIL_MERGE_HEARTBEAT_SECONDS = float(os.environ.get('MAIL_MERGE_HEARTBEAT_SECONDS', '15'))
+MAIL_MERGE_STALE_SECONDS = int(os.environ.get('MAIL_MERGE_STALE_SECONDS', '600'))
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', str(EMAIL_OUTBOX_CONCURRENCY)))
+SMTP_IDLE_SECONDS = float(os.environ.get('SMTP_IDLE_SECONDS', '240'))
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+
 # Enums
 class UserRole(str, Enum):
     ADMIN = "admin"
@@ -246,6 +543,8 @@ class Interview(BaseModel):
     position_id: str
     interview_mode: InterviewMode
     interview_date: datetime
+    duration_minutes: int = INTERVIEW_DEFAULT_MINUTES
+    interview_end: Optional[datetime] = None
     action_plan: Optional[str] = None
     feedback: Optional[str] = None
     result: Optional[str] = None
@@ -257,8 +556,26 @@ class InterviewCreate(BaseModel):
     position_id: str
     interview_mode: InterviewMode
     interview_date: datetime
+    duration_minutes: int = Field(default=INTERVIEW_DEFAULT_MINUTES, ge=5, le=INTERVIEW_MAX_MINUTES)
     action_plan: Optional[str] = None
 
+class PdfBatchRequest(BaseModel):
+    candidate_ids: List[str] = []
+    position_id: Optional[str] = None
+    chunk_size: int = Field(default=50, ge=1, le=500)
+
+class MailMergeRecipient(BaseModel):
+    to: List[str] = []
+    client_id: Optional[str] = None
+    candidate_ids: List[str] = []
+    variables: Dict[str, str] = {}
+
+class MailMergeRequest(BaseModel):
+    subject_template: str
+    body_template: str
+    recipients: List[MailMergeRecipient]
+    attach_profiles: bool = True
+
 class EmailDraft(BaseModel):
     to: List[str]
     subject: str
@@ -278,13 +595,16 @@ class EmailSend(BaseModel):
     subject: str
     body: str
     candidate_ids: List[str] = []
+    attachment_ids: List[str] = []
     attachment_base64: Optional[str] = None
     attachment_filename: Optional[str] = None
 
 # Helper functions
+@tracer.traced("bcrypt.hash")
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
+@tracer.traced("bcrypt.verify")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -301,10 +621,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     try:
         token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
+        user = await user_cache.get_or_compute(
+            payload["user_id"], lambda: db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
+        )
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return user
+        # Handlers get their own copy of the cached document
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
@@ -317,6 +640,70 @@ def check_role(allowed_roles: List[UserRole]):
         return current_user
     return role_checker
 
+class AsyncTTLCache:
+    """In-process TTL cache that coalesces concurrent misses for the same key.
+
+    The first caller for a missing key starts the computation; callers arriving
+    while it runs await the same task instead of issuing their own queries.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key, compute):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        
+        task = self._inflight.get(key)
+        if task:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            generation = self._generation
+            task.add_done_callback(lambda t: self._complete(key, t, generation))
+        # Shielded so one cancelled request does not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def _complete(self, key, task: asyncio.Task, generation: int):
+        # An invalidation may already have replaced this task with a fresh load
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        # Results computed before an invalidation may already be stale
+        if generation != self._generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given, including loads already running"""
+        if key is None:
+            self._entries.clear()
+            self._inflight.clear()
+        else:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+        self._generation += 1
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+user_cache = AsyncTTLCache(USER_CACHE_TTL_SECONDS, max_entries=4096)
+
 # Initialize default admin
 @app.on_event("startup")
 async def create_default_admin():
@@ -329,13 +716,60 @@ async def create_default_admin():
         )
         admin_dict = admin.model_dump()
         admin_dict["password"] = hash_password("Admin@123")
-        admin_dict["created_at"] = admin_dict["created_at"].isoformat()
         await db.users.insert_one(admin_dict)
         logger.info("Default admin created: admin@recruitment.com / Admin@123")
 
+# Resume parsing patterns and keyword lists, compiled once at startup rather than per resume
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERNS = [re.compile(p) for p in (
+    r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
+    r'\d{10}',
+    r'\+\d{12}'
+)]
+PHONE_STRIP_PATTERN = re.compile(r'[^\d+]')
+NAME_LABEL_PATTERN = re.compile(r'(name|full name|candidate name)[\s:]+(.+)', re.IGNORECASE)
+NAME_SKIP_PATTERN = re.compile(r'(resume|cv|curriculum|email|phone|address)', re.IGNORECASE)
+EXPERIENCE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+)\+?\s*(?:years?|yrs?)[\s\w]*(?:of)?\s*(?:experience|exp)',
+    r'(?:experience|exp)[\s:]*(\d+)\+?\s*(?:years?|yrs?)',
+    r'(\d+)\+?\s*(?:years?|yrs?)'
+)]
+DESIGNATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:current role|position|designation|title)[\s:]+([^\n]+)',
+    r'(?:working as|employed as)[\s:]+([^\n]+)',
+)]
+LOCATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:location|city|address)[\s:]+([^\n]+)',
+    r'(?:based in|residing in)[\s:]+([^\n]+)'
+)]
+# (keyword, lowercased keyword) pairs for substring matching
+COMMON_TITLES = [(t, t.lower()) for t in (
+    'Software Engineer', 'Senior Software Engineer', 'Lead Engineer', 'Tech Lead',
+    'Full Stack Developer', 'Frontend Developer', 'Backend Developer',
+    'DevOps Engineer', 'Data Scientist', 'Data Analyst', 'Business Analyst',
+    'Project Manager', 'Product Manager', 'Scrum Master',
+    'UI/UX Designer', 'Graphic Designer', 'System Administrator',
+    'Database Administrator', 'Network Engineer', 'Security Analyst',
+    'Quality Assurance Engineer', 'Test Engineer', 'Architect',
+    'Consultant', 'Team Leader', 'Manager', 'Director', 'VP', 'CTO', 'CEO'
+)]
+# Indian cities
+COMMON_CITIES = [(c, c.lower()) for c in (
+    'Mumbai', 'Delhi', 'Bangalore', 'Bengaluru', 'Hyderabad', 'Chennai',
+    'Kolkata', 'Pune', 'Ahmedabad', 'Jaipur', 'Noida', 'Gurgaon', 'Gurugram'
+)]
+COMMON_SKILLS = [(s, s.lower()) for s in (
+    'Python', 'Java', 'JavaScript', 'React', 'Angular', 'Node.js', 'MongoDB',
+    'SQL', 'AWS', 'Azure', 'Docker', 'Kubernetes', 'Git', 'Agile', 'Scrum',
+    'Machine Learning', 'AI', 'Data Science', 'C++', 'C#', '.NET', 'PHP',
+    'Ruby', 'Go', 'Swift', 'Kotlin', 'TypeScript', 'HTML', 'CSS', 'REST API',
+    'GraphQL', 'Redis', 'PostgreSQL', 'MySQL', 'FastAPI', 'Django', 'Flask'
+)]
+
 # Resume parsing utilities
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_text_from_pdf(file_path: Union[str, BinaryIO]) -> str:
     """Extract text from PDF file"""
+    import pdfplumber  # heavy; loaded on first use or by the startup warm-up
     try:
         text = ""
         with pdfplumber.open(file_path) as pdf:
@@ -346,8 +780,9 @@ def extract_text_from_pdf(file_path: str) -> str:
         logger.error(f"Error extracting PDF text: {str(e)}")
         return ""
 
-def extract_text_from_docx(file_path: str) -> str:
+def extract_text_from_docx(file_path: Union[str, BinaryIO]) -> str:
     """Extract text from DOCX file"""
+    from docx import Document  # heavy; loaded on first use or by the startup warm-up
     try:
         doc = Document(file_path)
         text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
@@ -358,21 +793,15 @@ def extract_text_from_docx(file_path: str) -> str:
 
 def extract_email(text: str) -> str:
     """Extract email from text"""
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    emails = re.findall(email_pattern, text)
+    emails = EMAIL_PATTERN.findall(text)
     return emails[0] if emails else ""
 
 def extract_phone(text: str) -> str:
     """Extract phone number from text"""
-    phone_patterns = [
-        r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-        r'\d{10}',
-        r'\+\d{12}'
-    ]
-    for pattern in phone_patterns:
-        phones = re.findall(pattern, text)
+    for pattern in PHONE_PATTERNS:
+        phones = pattern.findall(text)
         if phones:
-            return re.sub(r'[^\d+]', '', phones[0])
+            return PHONE_STRIP_PATTERN.sub('', phones[0])
     return ""
 
 def extract_name(text: str) -> str:
@@ -381,15 +810,14 @@ def extract_name(text: str) -> str:
     
     # Try to find name after "Name:" label
     for line in lines:
-        if re.match(r'(name|full name|candidate name)[\s:]+(.+)', line, re.IGNORECASE):
-            match = re.search(r'(name|full name|candidate name)[\s:]+(.+)', line, re.IGNORECASE)
-            if match:
-                return match.group(2).strip()
+        match = NAME_LABEL_PATTERN.match(line)
+        if match:
+            return match.group(2).strip()
     
     # Otherwise, assume first non-empty line is name
     for line in lines[:5]:
         # Skip lines that are likely headers or contact info
-        if not re.search(r'(resume|cv|curriculum|email|phone|address)', line, re.IGNORECASE):
+        if not NAME_SKIP_PATTERN.search(line):
             if len(line.split()) <= 4 and len(line) < 50:
                 return line
     
@@ -397,14 +825,8 @@ def extract_name(text: str) -> str:
 
 def extract_experience_years(text: str) -> float:
     """Extract years of experience from text"""
-    experience_patterns = [
-        r'(\d+)\+?\s*(?:years?|yrs?)[\s\w]*(?:of)?\s*(?:experience|exp)',
-        r'(?:experience|exp)[\s:]*(\d+)\+?\s*(?:years?|yrs?)',
-        r'(\d+)\+?\s*(?:years?|yrs?)'
-    ]
-    
-    for pattern in experience_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in EXPERIENCE_PATTERNS:
+        matches = pattern.findall(text)
         if matches:
             return float(matches[0])
     
@@ -412,32 +834,16 @@ def extract_experience_years(text: str) -> float:
 
 def extract_designation(text: str) -> str:
     """Extract current designation from resume"""
-    common_titles = [
-        'Software Engineer', 'Senior Software Engineer', 'Lead Engineer', 'Tech Lead',
-        'Full Stack Developer', 'Frontend Developer', 'Backend Developer',
-        'DevOps Engineer', 'Data Scientist', 'Data Analyst', 'Business Analyst',
-        'Project Manager', 'Product Manager', 'Scrum Master',
-        'UI/UX Designer', 'Graphic Designer', 'System Administrator',
-        'Database Administrator', 'Network Engineer', 'Security Analyst',
-        'Quality Assurance Engineer', 'Test Engineer', 'Architect',
-        'Consultant', 'Team Leader', 'Manager', 'Director', 'VP', 'CTO', 'CEO'
-    ]
-    
     text_lower = text.lower()
     
     # Search for designation patterns
-    for title in common_titles:
-        if title.lower() in text_lower:
+    for title, title_lower in COMMON_TITLES:
+        if title_lower in text_lower:
             return title
     
     # Try to find designation after keywords
-    patterns = [
-        r'(?:current role|position|designation|title)[\s:]+([^\n]+)',
-        r'(?:working as|employed as)[\s:]+([^\n]+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in DESIGNATION_PATTERNS:
+        match = pattern.search(text)
         if match:
             designation = match.group(1).strip()
             if len(designation) < 50:
@@ -447,25 +853,14 @@ def extract_designation(text: str) -> str:
 
 def extract_location(text: str) -> str:
     """Extract location from resume"""
-    # Indian cities pattern
-    cities = [
-        'Mumbai', 'Delhi', 'Bangalore', 'Bengaluru', 'Hyderabad', 'Chennai',
-        'Kolkata', 'Pune', 'Ahmedabad', 'Jaipur', 'Noida', 'Gurgaon', 'Gurugram'
-    ]
-    
     text_lower = text.lower()
-    for city in cities:
-        if city.lower() in text_lower:
+    for city, city_lower in COMMON_CITIES:
+        if city_lower in text_lower:
             return city
     
     # Try to find location patterns
-    location_patterns = [
-        r'(?:location|city|address)[\s:]+([^\n]+)',
-        r'(?:based in|residing in)[\s:]+([^\n]+)'
-    ]
-    
-    for pattern in location_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in LOCATION_PATTERNS:
+        match = pattern.search(text)
         if match:
             location = match.group(1).strip()
             if len(location) < 50:
@@ -475,66 +870,332 @@ def extract_location(text: str) -> str:
 
 def extract_skills(text: str) -> list:
     """Extract skills from text"""
-    common_skills = [
-        'Python', 'Java', 'JavaScript', 'React', 'Angular', 'Node.js', 'MongoDB',
-        'SQL', 'AWS', 'Azure', 'Docker', 'Kubernetes', 'Git', 'Agile', 'Scrum',
-        'Machine Learning', 'AI', 'Data Science', 'C++', 'C#', '.NET', 'PHP',
-        'Ruby', 'Go', 'Swift', 'Kotlin', 'TypeScript', 'HTML', 'CSS', 'REST API',
-        'GraphQL', 'Redis', 'PostgreSQL', 'MySQL', 'FastAPI', 'Django', 'Flask'
-    ]
-    
-    found_skills = []
     text_lower = text.lower()
-    
-    for skill in common_skills:
-        if skill.lower() in text_lower:
-            found_skills.append(skill)
-    
-    return found_skills
-    """Extract skills from text"""
-    common_skills = [
-        'Python', 'Java', 'JavaScript', 'React', 'Angular', 'Node.js', 'MongoDB',
-        'SQL', 'AWS', 'Azure', 'Docker', 'Kubernetes', 'Git', 'Agile', 'Scrum',
-        'Machine Learning', 'AI', 'Data Science', 'C++', 'C#', '.NET', 'PHP',
-        'Ruby', 'Go', 'Swift', 'Kotlin', 'TypeScript', 'HTML', 'CSS', 'REST API',
-        'GraphQL', 'Redis', 'PostgreSQL', 'MySQL', 'FastAPI', 'Django', 'Flask'
-    ]
-    
-    found_skills = []
-    text_lower = text.lower()
-    
-    for skill in common_skills:
-        if skill.lower() in text_lower:
-            found_skills.append(skill)
-    
-    return found_skills
+    return [skill for skill, skill_lower in COMMON_SKILLS if skill_lower in text_lower]
 
 def parse_resume(file_path: str) -> dict:
     """Parse resume and extract candidate information"""
     # Determine file type and extract text
     if file_path.lower().endswith('.pdf'):
-        text = extract_text_from_pdf(file_path)
+        file_format, extract_text = 'pdf', extract_text_from_pdf
     elif file_path.lower().endswith('.docx'):
-        text = extract_text_from_docx(file_path)
+        file_format, extract_text = 'docx', extract_text_from_docx
     else:
         return None
     
-    if not text:
-        return None
+    with tracer.span("resume.parse", **{"file.format": file_format}), resume_parse_seconds.labels(file_format).time():
+        text = extract_text(file_path)
+        if not text:
+            return None
+        
+        # Extract information
+        candidate_data = {
+            'name': extract_name(text),
+            'email': extract_email(text),
+            'contact_number': extract_phone(text),
+            'years_of_experience': extract_experience_years(text),
+            'skills': extract_skills(text),
+            'current_designation': extract_designation(text),
+            'current_location': extract_location(text),
+            'raw_text': text[:500]  # Store first 500 chars for reference
+        }
     
-    # Extract information
-    candidate_data = {
-        'name': extract_name(text),
-        'email': extract_email(text),
-        'contact_number': extract_phone(text),
-        'years_of_experience': extract_experience_years(text),
-        'skills': extract_skills(text),
-        'current_designation': extract_designation(text),
-        'current_location': extract_location(text),
-        'raw_text': text[:500]  # Store first 500 chars for reference
+    return candidate_data
+
+# Pipeline rollup counters
+# One document per scope ("global", "position:<id>", "client:<id>", "recruiter:<id>")
+# holding candidate counts per status, kept in step with $inc on every write
+CANDIDATE_ROLLUP_FIELDS = {"_id": 0, "id": 1, "status": 1, "position_id": 1, "added_by": 1, "created_at": 1}
+# Guarded status writes retry this many times when another writer got there first
+STATUS_UPDATE_ATTEMPTS = 5
+# Tags of the last status writes kept on each candidate, to tell which writes of a bulk call matched
+STATUS_WRITE_HISTORY = 8
+
+async def position_client_map(position_ids: List[str]) -> Dict[str, str]:
+    """Map position ids to their client ids"""
+    positions = await db.positions.find({"id": {"$in": list(set(position_ids))}}, {"_id": 0, "id": 1, "client_id": 1}).to_list(None)
+    return {p["id"]: p["client_id"] for p in positions}
+
+def rollup_scopes(candidate: dict, client_id: Optional[str]) -> List[tuple]:
+    """Counter scopes a candidate contributes to, as (scope, scope_id)"""
+    scopes = [("global", None), ("position", candidate["position_id"]), ("recruiter", candidate["added_by"])]
+    if client_id:
+        scopes.append(("client", client_id))
+    return scopes
+
+async def record_status_changes(changes: List[tuple], changed_by: Optional[str] = None, log_events: bool = True):
+    """Apply (candidate, old_status, new_status) transitions to the rollup counters
+    and the status history. old_status is None for new candidates and new_status
+    is None for deleted ones."""
+    if not changes:
+        return
+    # Freshly built models still carry CandidateStatus members
+    changes = [
+        (candidate,
+         old_status.value if isinstance(old_status, Enum) else old_status,
+         new_status.value if isinstance(new_status, Enum) else new_status)
+        for candidate, old_status, new_status in changes
+    ]
+    clients_by_position = await position_client_map([c["position_id"] for c, _, _ in changes])
+    await update_pipeline_counters(changes, clients_by_position)
+    if log_events:
+        await log_status_events(changes, clients_by_position, changed_by)
+
+async def update_pipeline_counters(changes: List[tuple], clients_by_position: Dict[str, str]):
+    """$inc the counters of every scope touched by the transitions"""
+    increments: Dict[tuple, Dict[str, int]] = {}
+    for candidate, old_status, new_status in changes:
+        for scope in rollup_scopes(candidate, clients_by_position.get(candidate["position_id"])):
+            inc = increments.setdefault(scope, {})
+            if old_status:
+                inc[f"counts.{old_status}"] = inc.get(f"counts.{old_status}", 0) - 1
+            if new_status:
+                inc[f"counts.{new_status}"] = inc.get(f"counts.{new_status}", 0) + 1
+            if not old_status:
+                inc["total"] = inc.get("total", 0) + 1
+            if not new_status:
+                inc["total"] = inc.get("total", 0) - 1
+    
+    operations = []
+    for (scope, scope_id), inc in increments.items():
+        inc = {field: delta for field, delta in inc.items() if delta}
+        if not inc:
+            continue
+        counter_id = scope if scope_id is None else f"{scope}:{scope_id}"
+        operations.append(UpdateOne(
+            {"id": counter_id},
+            {"$inc": inc, "$setOnInsert": {"scope": scope, "scope_id": scope_id}},
+            upsert=True
+        ))
+    if operations:
+        await db.pipeline_counters.bulk_write(operations, ordered=False)
+
+async def set_candidates_status(query: dict, new_status: str, extra_fields: Optional[dict] = None, changed_by: Optional[str] = None) -> int:
+    """Change the status of matching candidates in one bulk write and update the rollups and history.
+    Returns how many candidates were updated."""
+    write_id = uuid.uuid4().hex
+    update = {
+        "$set": {"status": new_status, **(extra_fields or {})},
+        "$push": {"status_writes": {"$each": [write_id], "$slice": -STATUS_WRITE_HISTORY}}
     }
     
-    return candidate_data
+    candidates = await db.candidates.find(query, CANDIDATE_ROLLUP_FIELDS).to_list(None)
+    updated = []
+    for _ in range(STATUS_UPDATE_ATTEMPTS):
+        if not candidates:
+            break
+        # Guarded on the status just read, so of two concurrent changes only one sees the
+        # old status and the transition is counted once, from the status read here
+        result = await db.candidates.bulk_write(
+            [UpdateOne({"id": c["id"], "status": c["status"]}, update) for c in candidates], ordered=False
+        )
+        if result.matched_count == len(candidates):
+            updated.extend(candidates)
+            candidates = []
+            break
+        # Some guards missed: the write tag shows which documents this call changed,
+        # and only the others are read again and retried
+        ids = [c["id"] for c in candidates]
+        won = {doc["id"] async for doc in db.candidates.find({"id": {"$in": ids}, "status_writes": write_id}, {"_id": 0, "id": 1})}
+        updated.extend(c for c in candidates if c["id"] in won)
+        candidates = await db.candidates.find(
+            {"id": {"$in": [candidate_id for candidate_id in ids if candidate_id not in won]}}, CANDIDATE_ROLLUP_FIELDS
+        ).to_list(None)
+    
+    await record_status_changes([(c, c["status"], new_status) for c in updated if c["status"] != new_status], changed_by)
+    if candidates:
+        raise HTTPException(status_code=409, detail="Candidate status changed concurrently, please retry")
+    return len(updated)
+
+async def move_position_counters(position_id: str, old_client_id: Optional[str], new_client_id: Optional[str]):
+    """Shift a position's candidate counts from its old client's rollup to the new client's"""
+    counter = await db.pipeline_counters.find_one({"id": f"position:{position_id}"}, {"_id": 0, "counts": 1, "total": 1})
+    if not counter or not counter.get("total"):
+        return
+    inc = {f"counts.{status}": count for status, count in counter.get("counts", {}).items() if count}
+    inc["total"] = counter["total"]
+    operations = []
+    if old_client_id:
+        operations.append(UpdateOne({"id": f"client:{old_client_id}"}, {"$inc": {field: -delta for field, delta in inc.items()}}))
+    if new_client_id:
+        operations.append(UpdateOne(
+            {"id": f"client:{new_client_id}"},
+            {"$inc": inc, "$setOnInsert": {"scope": "client", "scope_id": new_client_id}},
+            upsert=True
+        ))
+    await db.pipeline_counters.bulk_write(operations, ordered=False)
+
+async def reconcile_pipeline_counters() -> int:
+    """Rebuild every rollup counter from the candidates collection"""
+    pipeline = [{"$group": {
+        "_id": {"position_id": "$position_id", "added_by": "$added_by", "status": "$status"},
+        "count": {"$sum": 1}
+    }}]
+    groups = await db.candidates.aggregate(pipeline).to_list(None)
+    clients_by_position = await position_client_map([g["_id"]["position_id"] for g in groups])
+    
+    counters: Dict[tuple, dict] = {}
+    for group in groups:
+        key = group["_id"]
+        for scope in rollup_scopes(key, clients_by_position.get(key["position_id"])):
+            counter = counters.setdefault(scope, {"counts": {}, "total": 0})
+            counter["counts"][key["status"]] = counter["counts"].get(key["status"], 0) + group["count"]
+            counter["total"] += group["count"]
+    
+    if not counters:
+        counters[("global", None)] = {"counts": {}, "total": 0}
+    
+    operations = []
+    live_ids = []
+    for (scope, scope_id), counter in counters.items():
+        counter_id = scope if scope_id is None else f"{scope}:{scope_id}"
+        live_ids.append(counter_id)
+        operations.append(ReplaceOne(
+            {"id": counter_id},
+            {"id": counter_id, "scope": scope, "scope_id": scope_id, **counter,
+             "reconciled_at": datetime.now(timezone.utc)},
+            upsert=True
+        ))
+    await db.pipeline_counters.bulk_write(operations, ordered=False)
+    
+    # Drop counters for scopes that no longer have candidates
+    await db.pipeline_counters.delete_many({"id": {"$nin": live_ids}})
+    return len(operations)
+
+@app.on_event("startup")
+async def ensure_pipeline_counters():
+    await db.pipeline_counters.create_index("id", unique=True)
+    await db.pipeline_counters.create_index([("scope", 1), ("scope_id", 1)])
+    if not await db.pipeline_counters.find_one({"id": "global"}, {"_id": 1}):
+        await reconcile_pipeline_counters()
+
+# Candidate status history
+# Every transition is appended to status_events; status_daily holds per-day,
+# per-scope rollups of stage entries, exits and time-in-stage histograms
+FUNNEL_STAGES = [
+    CandidateStatus.SOURCED.value,
+    CandidateStatus.SHORTLISTED.value,
+    CandidateStatus.APPROVED.value,
+    CandidateStatus.SHARED_WITH_CLIENT.value,
+    CandidateStatus.CLIENT_REVIEW.value,
+    CandidateStatus.INTERVIEW_SCHEDULED.value,
+    CandidateStatus.SELECTED.value
+]
+
+# Upper bounds (hours) of the time-in-stage histogram buckets; the last is open-ended
+STAGE_HISTOGRAM_HOURS = [1, 4, 12, 24, 48, 72, 120, 168, 240, 336, 504, 720, 1080, 1440, 2160]
+
+def as_utc(value) -> Optional[datetime]:
+    """Read a stored timestamp (ISO string or BSON datetime) as an aware UTC datetime"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def datetime_range(field: str, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """Inclusive range filter on a native datetime field; naive bounds are taken as UTC"""
+    if start and end and as_utc(start) > as_utc(end):
+        raise HTTPException(status_code=400, detail="Range start must not be after range end")
+    bounds = {}
+    if start:
+        bounds["$gte"] = as_utc(start)
+    if end:
+        bounds["$lte"] = as_utc(end)
+    return {field: bounds} if bounds else {}
+
+def stage_histogram_bucket(seconds: float) -> str:
+    hours = seconds / 3600
+    for idx, upper in enumerate(STAGE_HISTOGRAM_HOURS):
+        if hours <= upper:
+            return f"b{idx}"
+    return f"b{len(STAGE_HISTOGRAM_HOURS)}"
+
+async def last_status_entry_times(candidates: List[dict]) -> Dict[str, datetime]:
+    """When each candidate entered its current status"""
+    candidate_ids = [c["id"] for c in candidates]
+    pipeline = [
+        {"$match": {"candidate_id": {"$in": candidate_ids}}},
+        {"$sort": {"candidate_id": 1, "at": -1}},
+        {"$group": {"_id": "$candidate_id", "at": {"$first": "$at"}}}
+    ]
+    entered = {row["_id"]: as_utc(row["at"]) async for row in db.status_events.aggregate(pipeline)}
+    # Candidates created before history was recorded entered their status on creation
+    for candidate in candidates:
+        if candidate["id"] not in entered and candidate.get("created_at"):
+            entered[candidate["id"]] = as_utc(candidate["created_at"])
+    return entered
+
+async def log_status_events(changes: List[tuple], clients_by_position: Dict[str, str], changed_by: Optional[str]):
+    """Append transitions to status_events and fold them into the daily buckets"""
+    now = datetime.now(timezone.utc)
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    entered_at = await last_status_entry_times([c for c, old_status, _ in changes if old_status])
+    
+    events = []
+    increments: Dict[tuple, Dict[str, float]] = {}
+    for candidate, old_status, new_status in changes:
+        client_id = clients_by_position.get(candidate["position_id"])
+        since = entered_at.get(candidate["id"]) if old_status else None
+        seconds = max((now - since).total_seconds(), 0.0) if since else None
+        events.append({
+            "id": str(uuid.uuid4()),
+            "candidate_id": candidate["id"],
+            "position_id": candidate["position_id"],
+            "client_id": client_id,
+            "recruiter_id": candidate["added_by"],
+            "from_status": old_status,
+            "to_status": new_status,
+            "time_in_stage_seconds": seconds,
+            "changed_by": changed_by,
+            "at": now
+        })
+        for scope in rollup_scopes(candidate, client_id):
+            inc = increments.setdefault(scope, {})
+            if new_status:
+                inc[f"entered.{new_status}"] = inc.get(f"entered.{new_status}", 0) + 1
+            if old_status:
+                inc[f"exited.{old_status}"] = inc.get(f"exited.{old_status}", 0) + 1
+                if seconds is not None:
+                    bucket = f"stage_hist.{old_status}.{stage_histogram_bucket(seconds)}"
+                    inc[bucket] = inc.get(bucket, 0) + 1
+                    inc[f"stage_seconds.{old_status}"] = inc.get(f"stage_seconds.{old_status}", 0) + seconds
+                    inc[f"stage_samples.{old_status}"] = inc.get(f"stage_samples.{old_status}", 0) + 1
+    
+    await db.status_events.insert_many(events)
+    operations = []
+    for (scope, scope_id), inc in increments.items():
+        counter_id = scope if scope_id is None else f"{scope}:{scope_id}"
+        operations.append(UpdateOne(
+            {"id": f"{day.date().isoformat()}:{counter_id}"},
+            {"$inc": inc, "$setOnInsert": {"day": day, "scope": scope, "scope_id": scope_id}},
+            upsert=True
+        ))
+    await db.status_daily.bulk_write(operations, ordered=False)
+
+def histogram_percentile(histogram: Dict[str, int], percentile: float) -> Optional[float]:
+    """Estimate a percentile (in hours) as the upper bound of the bucket containing it"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    threshold = total * percentile
+    cumulative = 0
+    for idx in range(len(STAGE_HISTOGRAM_HOURS) + 1):
+        cumulative += histogram.get(f"b{idx}", 0)
+        if cumulative >= threshold:
+            return float(STAGE_HISTOGRAM_HOURS[idx]) if idx < len(STAGE_HISTOGRAM_HOURS) else None
+    return None
+
+@app.on_event("startup")
+async def create_status_history_indexes():
+    await db.status_events.create_index([("candidate_id", 1), ("at", -1)])
+    await db.status_events.create_index([("position_id", 1), ("at", 1)])
+    await db.status_events.create_index([("client_id", 1), ("at", 1)])
+    await db.status_events.create_index([("recruiter_id", 1), ("at", 1)])
+    await db.status_daily.create_index("id", unique=True)
+    await db.status_daily.create_index([("scope", 1), ("scope_id", 1), ("day", 1)])
 
 # Auth routes
 @api_router.post("/auth/register")
@@ -550,7 +1211,6 @@ async def register(user_data: UserCreate, current_user: dict = Depends(check_rol
     )
     user_dict = user.model_dump()
     user_dict["password"] = hash_password(user_data.password)
-    user_dict["created_at"] = user_dict["created_at"].isoformat()
     
     await db.users.insert_one(user_dict)
     return {"message": "User created successfully", "user": user}
@@ -581,29 +1241,65 @@ async def get_users(current_user: dict = Depends(check_role([UserRole.ADMIN, Use
 async def create_client(client_data: ClientCreate, current_user: dict = Depends(get_current_user)):
     client = Client(**client_data.model_dump(), created_by=current_user["id"])
     client_dict = client.model_dump()
-    client_dict["created_at"] = client_dict["created_at"].isoformat()
     await db.clients.insert_one(client_dict)
     return client
 
+def position_scope_match(role: str, user_id: str) -> dict:
+    """Positions a team leader created or a recruiter is assigned to"""
+    if role == "team_leader":
+        return {"created_by": user_id}
+    return {"assigned_recruiters": user_id}
+
+access_scope_cache = AsyncTTLCache(ACCESS_SCOPE_TTL_SECONDS, max_entries=4096)
+
+async def compute_access_scope(role: str, user_id: str) -> dict:
+    """Visible positions grouped by client, with the client documents, in one aggregation"""
+    pipeline = [
+        {"$match": position_scope_match(role, user_id)},
+        {"$group": {"_id": "$client_id", "position_ids": {"$push": "$id"}}},
+        {"$lookup": {"from": "clients", "localField": "_id", "foreignField": "id", "as": "client"}}
+    ]
+    rows = await db.positions.aggregate(pipeline).to_list(None)
+    return {
+        "position_ids": [position_id for row in rows for position_id in row["position_ids"]],
+        "client_ids": sorted(row["_id"] for row in rows),
+        # Positions whose client was deleted stay visible, they just add no client
+        "clients": [{k: v for k, v in row["client"][0].items() if k != "_id"} for row in rows if row["client"]]
+    }
+
+async def get_access_scope(user: dict) -> dict:
+    """Visible position and client ids of a team leader or recruiter"""
+    return await access_scope_cache.get_or_compute(
+        user["id"], lambda: compute_access_scope(user["role"], user["id"])
+    )
+
+def invalidate_access_scopes(*positions: Optional[dict]):
+    """Evict the scopes of everyone who can see the given position versions"""
+    for position in positions:
+        if not position:
+            continue
+        for user_id in [position.get("created_by"), *position.get("assigned_recruiters", [])]:
+            if user_id:
+                access_scope_cache.invalidate(user_id)
+
 @api_router.get("/clients", response_model=List[Client])
 async def get_clients(current_user: dict = Depends(get_current_user)):
     role = current_user["role"]
     
     if role in ["admin", "manager"]:
         clients = await db.clients.find({}, {"_id": 0}).to_list(1000)
-    elif role == "team_leader":
-        # Get positions assigned to this team leader
-        positions = await db.positions.find({"created_by": current_user["id"]}, {"_id": 0, "client_id": 1}).to_list(1000)
-        client_ids = list(set([p["client_id"] for p in positions]))
-        clients = await db.clients.find({"id": {"$in": client_ids}}, {"_id": 0}).to_list(1000)
-    else:  # recruiter
-        # Get positions assigned to this recruiter
-        positions = await db.positions.find({"assigned_recruiters": current_user["id"]}, {"_id": 0, "client_id": 1}).to_list(1000)
-        client_ids = list(set([p["client_id"] for p in positions]))
-        clients = await db.clients.find({"id": {"$in": client_ids}}, {"_id": 0}).to_list(1000)
+    else:
+        scope = await get_access_scope(current_user)
+        clients = scope["clients"][:1000]
     
     return clients
 
+@app.on_event("startup")
+async def create_scope_indexes():
+    await db.clients.create_index("id")
+    await db.positions.create_index([("created_by", 1), ("client_id", 1)])
+    await db.positions.create_index([("assigned_recruiters", 1), ("client_id", 1)])
+
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str, current_user: dict = Depends(get_current_user)):
     client = await db.clients.find_one({"id": client_id}, {"_id": 0})
@@ -620,6 +1316,8 @@ async def update_client(client_id: str, client_data: ClientCreate, current_user:
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
     
+    # Scopes carry the client documents; who sees this client is not known without a lookup
+    access_scope_cache.invalidate()
     updated_client = await db.clients.find_one({"id": client_id}, {"_id": 0})
     return updated_client
 
@@ -641,8 +1339,8 @@ async def delete_client(client_id: str, current_user: dict = Depends(check_role(
 async def create_position(position_data: PositionCreate, current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))):
     position = Position(**position_data.model_dump(), created_by=current_user["id"])
     position_dict = position.model_dump()
-    position_dict["created_at"] = position_dict["created_at"].isoformat()
     await db.positions.insert_one(position_dict)
+    invalidate_access_scopes(position_dict)
     return position
 
 @api_router.get("/positions", response_model=List[Position])
@@ -667,14 +1365,20 @@ async def get_position(position_id: str, current_user: dict = Depends(get_curren
 
 @api_router.put("/positions/{position_id}", response_model=Position)
 async def update_position(position_id: str, position_data: PositionCreate, current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))):
-    result = await db.positions.update_one(
+    update = position_data.model_dump()
+    previous = await db.positions.find_one_and_update(
         {"id": position_id},
-        {"$set": position_data.model_dump()}
+        {"$set": update},
+        projection={"_id": 0}
     )
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Position not found")
     
-    updated_position = await db.positions.find_one({"id": position_id}, {"_id": 0})
+    updated_position = {**previous, **update}
+    if previous.get("client_id") != update["client_id"]:
+        await move_position_counters(position_id, previous.get("client_id"), update["client_id"])
+    # Recruiters dropped from the assignment lose visibility, so evict the old audience too
+    invalidate_access_scopes(previous, updated_position)
     return updated_position
 
 @api_router.delete("/positions/{position_id}")
@@ -684,32 +1388,43 @@ async def delete_position(position_id: str, current_user: dict = Depends(check_r
     if candidates:
         raise HTTPException(status_code=400, detail="Cannot delete position with existing candidates")
     
-    result = await db.positions.delete_one({"id": position_id})
-    if result.deleted_count == 0:
+    deleted = await db.positions.find_one_and_delete(
+        {"id": position_id}, projection={"_id": 0, "created_by": 1, "assigned_recruiters": 1}
+    )
+    if not deleted:
         raise HTTPException(status_code=404, detail="Position not found")
     
+    invalidate_access_scopes(deleted)
     return {"message": "Position deleted successfully"}
 
 @api_router.post("/positions/{position_id}/upload-jd")
 async def upload_jd(position_id: str, file: UploadFile = File(...), current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))):
-    file_path = JD_DIR / f"{position_id}_{file.filename}"
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    filename = upload_name(position_id, file.filename)
+    await file_storage.save(f"jds/{filename}", file.file, file.content_type)
     
     await db.positions.update_one(
         {"id": position_id},
-        {"$set": {"jd_file": str(file_path.name)}}
+        {"$set": {"jd_file": filename}}
     )
-    return {"message": "JD uploaded successfully", "filename": file_path.name}
+    return {"message": "JD uploaded successfully", "filename": filename}
+
+@api_router.api_route("/positions/{position_id}/jd", methods=["GET", "HEAD"])
+async def download_jd(position_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Stream the position's JD; supports Range and If-None-Match"""
+    position = await db.positions.find_one({"id": position_id}, {"_id": 0, "jd_file": 1})
+    if not position:
+        raise HTTPException(status_code=404, detail="Position not found")
+    if not position.get("jd_file"):
+        raise HTTPException(status_code=404, detail="No JD uploaded for this position")
+    return await stored_file_response(f"jds/{position['jd_file']}", position_id, request)
 
 # Candidate routes
 @api_router.post("/candidates", response_model=Candidate)
 async def create_candidate(candidate_data: CandidateCreate, current_user: dict = Depends(get_current_user)):
     candidate = Candidate(**candidate_data.model_dump(), added_by=current_user["id"])
     candidate_dict = candidate.model_dump()
-    candidate_dict["created_at"] = candidate_dict["created_at"].isoformat()
     await db.candidates.insert_one(candidate_dict)
+    await record_status_changes([(candidate_dict, None, candidate_dict["status"])], current_user["id"])
     return candidate
 
 @api_router.post("/candidates/bulk-upload")
@@ -736,6 +1451,8 @@ async def bulk_upload_candidates(
     if not position:
         raise HTTPException(status_code=404, detail="Position not found")
     
+    # Rollups and history for every created candidate are written together at the end
+    created = []
     for file in files:
         try:
             # Validate file type
@@ -746,8 +1463,8 @@ async def bulk_upload_candidates(
                 })
                 continue
             
-            # Save file temporarily
-            file_path = RESUME_DIR / f"temp_{uuid.uuid4()}_{file.filename}"
+            # Save a scratch copy to parse; it goes to file storage once the candidate exists
+            file_path = Path(tempfile.gettempdir()) / f"resume_{uuid.uuid4()}_{Path(file.filename).name}"
             with open(file_path, "wb") as f:
                 content = await file.read()
                 f.write(content)
@@ -797,19 +1514,21 @@ async def bulk_upload_candidates(
             )
             
             candidate_dict = candidate.model_dump()
-            candidate_dict["created_at"] = candidate_dict["created_at"].isoformat()
             
             # Save to database
             await db.candidates.insert_one(candidate_dict)
+            created.append((candidate_dict, None, candidate_dict["status"]))
             
-            # Rename temp file to permanent name
-            permanent_path = RESUME_DIR / f"{candidate.id}_{file.filename}"
-            file_path.rename(permanent_path)
+            # Store under the permanent name
+            filename = upload_name(candidate.id, file.filename)
+            with open(file_path, "rb") as source:
+                await file_storage.save(f"resumes/{filename}", source, file.content_type)
+            file_path.unlink()
             
-            # Update candidate with permanent file path
+            # Update candidate with permanent file name
             await db.candidates.update_one(
                 {"id": candidate.id},
-                {"$set": {"resume_file": permanent_path.name}}
+                {"$set": {"resume_file": filename}}
             )
             
             results["successful"].append({
@@ -831,27 +1550,38 @@ async def bulk_upload_candidates(
             if 'file_path' in locals() and file_path.exists():
                 file_path.unlink()
     
+    await record_status_changes(created, current_user["id"])
     return results
 
 @api_router.put("/candidates/{candidate_id}")
 async def update_candidate(candidate_id: str, candidate_data: CandidateCreate, current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))):
     update_data = candidate_data.model_dump()
-    result = await db.candidates.update_one(
+    previous = await db.candidates.find_one_and_update(
         {"id": candidate_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=CANDIDATE_ROLLUP_FIELDS,
+        return_document=ReturnDocument.BEFORE
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
+    # Moving a candidate to another position shifts its position/client counters
+    if previous["position_id"] != update_data["position_id"]:
+        moved = {**previous, "position_id": update_data["position_id"]}
+        await record_status_changes([(previous, previous["status"], None), (moved, None, previous["status"])], log_events=False)
+    
+    await asyncio.to_thread(profile_pdf_cache.invalidate_candidate, candidate_id)
     updated_candidate = await db.candidates.find_one({"id": candidate_id}, {"_id": 0})
     return updated_candidate
 
 @api_router.delete("/candidates/{candidate_id}")
 async def delete_candidate(candidate_id: str, current_user: dict = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.candidates.delete_one({"id": candidate_id})
-    if result.deleted_count == 0:
+    deleted = await db.candidates.find_one_and_delete({"id": candidate_id}, projection=CANDIDATE_ROLLUP_FIELDS)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
+    await record_status_changes([(deleted, deleted["status"], None)], current_user["id"])
+    await asyncio.to_thread(profile_pdf_cache.invalidate_candidate, candidate_id)
     return {"message": "Candidate deleted successfully"}
 
 @api_router.delete("/interviews/{interview_id}")
@@ -872,12 +1602,18 @@ async def delete_user(user_id: str, current_user: dict = Depends(check_role([Use
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    user_cache.invalidate(user_id)
+    access_scope_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
 # CSV Export endpoints
+def csv_datetime(value) -> Optional[str]:
+    """ISO timestamp for CSV cells"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
 @api_router.get("/export/clients")
 async def export_clients_csv(current_user: dict = Depends(get_current_user)):
-    clients = await db.clients.find({}, {"_id": 0}).to_list(10000)
+    clients = await export_db.clients.find({}, {"_id": 0}).to_list(10000)
     
     if not clients:
         raise HTTPException(status_code=404, detail="No clients found")
@@ -898,7 +1634,7 @@ async def export_clients_csv(current_user: dict = Depends(get_current_user)):
             'other_branches': client.get('other_branches', ''),
             'website': client.get('website', ''),
             'core_business': client.get('core_business'),
-            'created_at': client.get('created_at')
+            'created_at': csv_datetime(client.get('created_at'))
         })
     
     output.seek(0)
@@ -907,7 +1643,7 @@ async def export_clients_csv(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/export/positions")
 async def export_positions_csv(current_user: dict = Depends(get_current_user)):
-    positions = await db.positions.find({}, {"_id": 0}).to_list(10000)
+    positions = await export_db.positions.find({}, {"_id": 0}).to_list(10000)
     
     if not positions:
         raise HTTPException(status_code=404, detail="No positions found")
@@ -929,7 +1665,7 @@ async def export_positions_csv(current_user: dict = Depends(get_current_user)):
             'qualification': position.get('qualification'),
             'experience': position.get('experience'),
             'status': position.get('status'),
-            'created_at': position.get('created_at')
+            'created_at': csv_datetime(position.get('created_at'))
         })
     
     output.seek(0)
@@ -938,7 +1674,7 @@ async def export_positions_csv(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/export/candidates")
 async def export_candidates_csv(current_user: dict = Depends(get_current_user)):
-    candidates = await db.candidates.find({}, {"_id": 0}).to_list(10000)
+    candidates = await export_db.candidates.find({}, {"_id": 0}).to_list(10000)
     
     if not candidates:
         raise HTTPException(status_code=404, detail="No candidates found")
@@ -965,7 +1701,7 @@ async def export_candidates_csv(current_user: dict = Depends(get_current_user)):
             'expected_ctc': candidate.get('expected_ctc'),
             'notice_period': candidate.get('notice_period'),
             'status': candidate.get('status'),
-            'created_at': candidate.get('created_at')
+            'created_at': csv_datetime(candidate.get('created_at'))
         })
     
     output.seek(0)
@@ -974,7 +1710,7 @@ async def export_candidates_csv(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/export/interviews")
 async def export_interviews_csv(current_user: dict = Depends(get_current_user)):
-    interviews = await db.interviews.find({}, {"_id": 0}).to_list(10000)
+    interviews = await export_db.interviews.find({}, {"_id": 0}).to_list(10000)
     
     if not interviews:
         raise HTTPException(status_code=404, detail="No interviews found")
@@ -990,11 +1726,11 @@ async def export_interviews_csv(current_user: dict = Depends(get_current_user)):
             'candidate_id': interview.get('candidate_id'),
             'position_id': interview.get('position_id'),
             'interview_mode': interview.get('interview_mode'),
-            'interview_date': interview.get('interview_date'),
+            'interview_date': csv_datetime(interview.get('interview_date')),
             'action_plan': interview.get('action_plan', ''),
             'feedback': interview.get('feedback', ''),
             'result': interview.get('result', ''),
-            'created_at': interview.get('created_at')
+            'created_at': csv_datetime(interview.get('created_at'))
         })
     
     output.seek(0)
@@ -1003,7 +1739,7 @@ async def export_interviews_csv(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/export/users")
 async def export_users_csv(current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER]))):
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(10000)
+    users = await export_db.users.find({}, {"_id": 0, "password": 0}).to_list(10000)
     
     if not users:
         raise HTTPException(status_code=404, detail="No users found")
@@ -1018,7 +1754,7 @@ async def export_users_csv(current_user: dict = Depends(check_role([UserRole.ADM
             'name': user.get('name'),
             'email': user.get('email'),
             'role': user.get('role'),
-            'created_at': user.get('created_at')
+            'created_at': csv_datetime(user.get('created_at'))
         })
     
     output.seek(0)
@@ -1026,8 +1762,13 @@ async def export_users_csv(current_user: dict = Depends(check_role([UserRole.ADM
                    headers={"Content-Disposition": "attachment; filename=users.csv"})
 
 @api_router.get("/candidates", response_model=List[Candidate])
-async def get_candidates(position_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
-    query = {}
+async def get_candidates(
+    position_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = datetime_range("created_at", created_from, created_to)
     
     if position_id:
         query["position_id"] = position_id
@@ -1049,16 +1790,121 @@ async def get_candidate(candidate_id: str, current_user: dict = Depends(get_curr
 
 @api_router.post("/candidates/{candidate_id}/upload-resume")
 async def upload_resume(candidate_id: str, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    file_path = RESUME_DIR / f"{candidate_id}_{file.filename}"
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    filename = upload_name(candidate_id, file.filename)
+    await file_storage.save(f"resumes/{filename}", file.file, file.content_type)
     
     await db.candidates.update_one(
         {"id": candidate_id},
-        {"$set": {"resume_file": str(file_path.name)}}
+        {"$set": {"resume_file": filename}}
     )
-    return {"message": "Resume uploaded successfully", "filename": file_path.name}
+    return {"message": "Resume uploaded successfully", "filename": filename}
+
+@api_router.api_route("/candidates/{candidate_id}/resume", methods=["GET", "HEAD"])
+async def download_resume(candidate_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Stream the candidate's resume; supports Range and If-None-Match"""
+    candidate = await db.candidates.find_one({"id": candidate_id}, {"_id": 0, "resume_file": 1})
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    if not candidate.get("resume_file"):
+        raise HTTPException(status_code=404, detail="No resume uploaded for this candidate")
+    return await stored_file_response(f"resumes/{candidate['resume_file']}", candidate_id, request)
+
+RESUME_TEXT_EXTRACTORS = {".pdf": ("pdf", extract_text_from_pdf), ".docx": ("docx", extract_text_from_docx)}
+
+resume_preview_cache = AsyncTTLCache(RESUME_PREVIEW_CACHE_TTL_SECONDS, max_entries=512)
+
+@app.on_event("startup")
+async def create_resume_preview_indexes():
+    await db.resume_previews.create_index("hash", unique=True)
+    await db.resume_previews.create_index("versions")
+
+def extract_preview_text(source: Union[str, BinaryIO], file_format: str, extract_text) -> str:
+    """Runs in a worker thread; the extractors are CPU-bound"""
+    with tracer.span("resume.preview", **{"file.format": file_format}):
+        return extract_text(source)
+
+async def build_resume_preview(key: str, version: str) -> dict:
+    """Preview for one stored version, reusing any preview of identical content.
+    Files without extractable text (scans) are only cached in-process, not persisted."""
+    cached = await db.resume_previews.find_one({"versions": version}, {"_id": 0, "versions": 0})
+    if cached:
+        return cached
+    
+    file_format, extract_text = RESUME_TEXT_EXTRACTORS[Path(key).suffix.lower()]
+    local_path = file_storage.local_path(key)
+    digest, buffer, size = hashlib.sha256(), io.BytesIO(), 0
+    async for chunk in file_storage.open(key):
+        size += len(chunk)
+        if size > RESUME_PREVIEW_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Resume is too large to preview")
+        digest.update(chunk)
+        if local_path is None:
+            buffer.write(chunk)
+    content_hash = digest.hexdigest()
+    
+    preview = await db.resume_previews.find_one({"hash": content_hash}, {"_id": 0, "versions": 0})
+    if preview is None:
+        buffer.seek(0)
+        text = await asyncio.to_thread(extract_preview_text, str(local_path) if local_path else buffer,
+                                       file_format, extract_text)
+        preview = {
+            "hash": content_hash,
+            "format": file_format,
+            "text": text[:RESUME_PREVIEW_MAX_CHARS],
+            "truncated": len(text) > RESUME_PREVIEW_MAX_CHARS,
+            "created_at": datetime.now(timezone.utc)
+        }
+        if not preview["text"].strip():
+            return preview
+    await db.resume_previews.update_one(
+        {"hash": content_hash},
+        {"$setOnInsert": preview, "$addToSet": {"versions": version}},
+        upsert=True
+    )
+    return preview
+
+def render_preview_html(text: str) -> str:
+    """Minimal HTML: blank-line separated paragraphs, line breaks kept, everything escaped"""
+    paragraphs = [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+    body = "\n".join(f"<p>{'<br>'.join(html.escape(line.strip()) for line in block.splitlines())}</p>"
+                     for block in paragraphs)
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            '<style>body{font:14px/1.5 system-ui,sans-serif;max-width:50em;margin:1em auto;padding:0 1em}</style>'
+            f'</head><body>{body}</body></html>')
+
+@api_router.get("/candidates/{candidate_id}/resume/preview")
+async def preview_resume(candidate_id: str, request: Request, format: str = "text", current_user: dict = Depends(get_current_user)):
+    """Extracted resume text as plain text or lightweight HTML, generated once per file content"""
+    if format not in ("text", "html"):
+        raise HTTPException(status_code=400, detail="format must be text or html")
+    candidate = await db.candidates.find_one({"id": candidate_id}, {"_id": 0, "resume_file": 1})
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    if not candidate.get("resume_file"):
+        raise HTTPException(status_code=404, detail="No resume uploaded for this candidate")
+    key = f"resumes/{candidate['resume_file']}"
+    if Path(key).suffix.lower() not in RESUME_TEXT_EXTRACTORS:
+        raise HTTPException(status_code=415, detail="Only PDF and DOCX resumes can be previewed")
+    info = await file_storage.stat(key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="File not found in storage")
+    if info.size > RESUME_PREVIEW_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Resume is too large to preview")
+    
+    # A re-upload changes the storage version, so entries never need invalidating
+    version = f"{key}:{info.etag}"
+    preview = await resume_preview_cache.get_or_compute(version, lambda: build_resume_preview(key, version))
+    if not preview["text"].strip():
+        raise HTTPException(status_code=422, detail="No text could be extracted from this resume")
+    
+    headers = {"ETag": f'"{preview["hash"][:32]}-{format}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if preview["truncated"]:
+        headers["X-Preview-Truncated"] = "true"
+    if format == "html":
+        return HTMLResponse(render_preview_html(preview["text"]), headers=headers)
+    return PlainTextResponse(preview["text"], headers=headers)
 
 @api_router.post("/candidates/search", response_model=List[Candidate])
 async def search_candidates(search_params: CandidateSearch, current_user: dict = Depends(get_current_user)):
@@ -1098,7 +1944,7 @@ async def search_candidates(search_params: CandidateSearch, current_user: dict =
     if search_params.designation:
         query["current_designation"] = {"$regex": search_params.designation, "$options": "i"}
     
-    candidates = await db.candidates.find(query, {"_id": 0}).to_list(1000)
+    candidates = await search_db.candidates.find(query, {"_id": 0}).to_list(1000)
     return candidates
 
 # Profile workflow routes
@@ -1115,28 +1961,169 @@ async def candidate_action(candidate_id: str, action_data: ProfileAction, curren
         update_data["rejection_reason"] = action_data.reason
     elif action_data.action == "shortlist":
         update_data["status"] = CandidateStatus.SHORTLISTED.value
+    else:
+        raise HTTPException(status_code=400, detail="Invalid action")
     
-    result = await db.candidates.update_one(
-        {"id": candidate_id},
-        {"$set": update_data}
-    )
+    new_status = update_data.pop("status")
+    updated = await set_candidates_status({"id": candidate_id}, new_status, update_data, current_user["id"])
     
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
     return {"message": f"Candidate {action_data.action}ed successfully"}
 
-# Profile sharing and PDF generation
-@api_router.post("/candidates/generate-pdf")
-async def generate_candidate_pdf(candidate_ids: List[str] = [], current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
-    candidates = await db.candidates.find({"id": {"$in": candidate_ids}}, {"_id": 0}).to_list(100)
-    
-    if not candidates:
-        raise HTTPException(status_code=404, detail="No candidates found")
-    
-    # Create PDF in memory
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+# Profile PDF rendering and cache
+# Bump when the profile layout changes so previously cached documents are not reused
+PDF_LAYOUT_VERSION = 1
+
+# Candidate fields that appear in the rendered profile
+PDF_PROFILE_FIELDS = [
+    'name', 'qualification', 'current_designation', 'department', 'industry_sector',
+    'current_location', 'years_of_experience', 'current_ctc', 'expected_ctc', 'notice_period'
+]
+
+def candidate_content_version(candidate: dict) -> str:
+    """Hash of the candidate fields rendered into the profile PDF"""
+    content = {field: candidate.get(field) for field in PDF_PROFILE_FIELDS}
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def profile_pdf_cache_key(candidates: List[dict]) -> str:
+    """Cache key for a document built from the given candidates, in render order"""
+    parts = [f"v{PDF_LAYOUT_VERSION}"]
+    parts.extend(f"{c['id']}:{candidate_content_version(c)}" for c in candidates)
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+class ProfilePdfCache:
+    """LRU-bounded on-disk cache of rendered candidate profile PDFs.
+
+    Each entry is stored as ``<key>.pdf`` with a ``<key>.json`` sidecar listing
+    the candidate ids it contains, so entries can be dropped when a candidate
+    is updated. Recency is tracked in memory and seeded from file mtimes.
+    Lookups and writes touch the disk, so callers run them in worker threads.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._by_candidate: Dict[str, set] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _pdf_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load(self):
+        """Rebuild the index from disk, oldest entries first"""
+        pdf_files = sorted(self.cache_dir.glob("*.pdf"), key=lambda f: f.stat().st_mtime)
+        for pdf_file in pdf_files:
+            key = pdf_file.stem
+            try:
+                meta = json.loads(self._meta_path(key).read_text())
+            except (OSError, ValueError):
+                pdf_file.unlink(missing_ok=True)
+                continue
+            self._track(key, pdf_file.stat().st_size, meta.get("candidate_ids", []))
+        self._evict()
+
+    def _track(self, key: str, size: int, candidate_ids: List[str]):
+        self._entries[key] = {"size": size, "candidate_ids": candidate_ids}
+        self.total_bytes += size
+        for candidate_id in candidate_ids:
+            self._by_candidate.setdefault(candidate_id, set()).add(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        self.total_bytes -= entry["size"]
+        for candidate_id in entry["candidate_ids"]:
+            keys = self._by_candidate.get(candidate_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_candidate[candidate_id]
+        self._pdf_path(key).unlink(missing_ok=True)
+        self._meta_path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        if key in self._entries:
+            try:
+                pdf_bytes = self._pdf_path(key).read_bytes()
+            except OSError:
+                self._remove(key)
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+        self.misses += 1
+        return None
+
+    def put(self, key: str, candidate_ids: List[str], pdf_bytes: bytes):
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._meta_path(key).write_text(json.dumps({"candidate_ids": candidate_ids}))
+            self._pdf_path(key).write_bytes(pdf_bytes)
+            self._track(key, len(pdf_bytes), candidate_ids)
+            self._evict()
+
+    def invalidate_candidate(self, candidate_id: str) -> int:
+        """Drop every cached document containing the candidate"""
+        with self._lock:
+            keys = list(self._by_candidate.get(candidate_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+profile_pdf_cache = ProfilePdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_ENTRIES, PDF_CACHE_MAX_BYTES)
+
+def build_candidate_profiles(candidates: List[dict], target, include_header: bool = True):
+    """Build candidate profiles into a PDF written to a file path or buffer"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    
+    doc = SimpleDocTemplate(target, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
     
     # Container for PDF elements
     elements = []
@@ -1150,18 +2137,12 @@ async def generate_candidate_pdf(candidate_ids: List[str] = [], current_user: di
         textColor=colors.HexColor('#4F46E5'),
         spaceAfter=12
     )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#64748b'),
-        spaceAfter=6
-    )
     
     # Add company header
-    header_text = Paragraph('<font color="#4F46E5"><b>RecruitHub</b></font>', styles['Heading1'])
-    elements.append(header_text)
-    elements.append(Spacer(1, 0.3 * inch))
+    if include_header:
+        header_text = Paragraph('<font color="#4F46E5"><b>RecruitHub</b></font>', styles['Heading1'])
+        elements.append(header_text)
+        elements.append(Spacer(1, 0.3 * inch))
     
     # Add each candidate
     for idx, candidate in enumerate(candidates):
@@ -1205,63 +2186,451 @@ async def generate_candidate_pdf(candidate_ids: List[str] = [], current_user: di
             elements.append(Spacer(1, 0.4 * inch))
     
     # Build PDF
-    doc.build(elements)
+    with tracer.span("pdf.build", profiles=len(candidates)), pdf_render_seconds.time():
+        doc.build(elements)
+    pdf_profiles_rendered_total.inc(len(candidates))
+
+def render_candidate_profiles_pdf(candidates: List[dict]) -> bytes:
+    """Render candidate profiles into a single in-memory PDF document"""
+    buffer = io.BytesIO()
+    build_candidate_profiles(candidates, buffer)
     
     # Get PDF bytes
     pdf_bytes = buffer.getvalue()
     buffer.close()
-    
-    # Return as base64 for preview
-    pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-    
+    return pdf_bytes
+
+class ProfilePdfBatchWriter:
+    """Renders candidate profiles chunk by chunk into a PDF file on disk.
+
+    Each chunk is built into its own part file so only one chunk of
+    flowables is held in memory at a time; ``finish`` stitches the parts
+    into the output file, opening one part at a time.
+    """
+
+    def __init__(self, work_dir: Path):
+        self.work_dir = work_dir
+        self.output_path = work_dir / "profiles.pdf"
+        self.part_paths: List[Path] = []
+        self.candidates_rendered = 0
+        self.pages = 0
+
+    def add_chunk(self, candidates: List[dict]):
+        from PyPDF2 import PdfReader
+        
+        part_path = self.work_dir / f"part_{len(self.part_paths):05d}.pdf"
+        build_candidate_profiles(candidates, str(part_path), include_header=not self.part_paths)
+        self.part_paths.append(part_path)
+        self.candidates_rendered += len(candidates)
+        self.pages += len(PdfReader(str(part_path)).pages)
+
+    def finish(self) -> Path:
+        from PyPDF2 import PdfReader, PdfWriter
+        
+        # PdfMerger keeps every part open until write(), one descriptor per part; adding
+        # pages to a writer copies them, so each part can be closed as soon as it is read
+        writer = PdfWriter()
+        for part_path in self.part_paths:
+            with open(part_path, "rb") as part:
+                for page in PdfReader(part).pages:
+                    writer.add_page(page)
+            part_path.unlink()
+        with open(self.output_path, "wb") as output:
+            writer.write(output)
+        return self.output_path
+
+# Batch PDF jobs: state in MongoDB and the finished document in file storage, so any
+# replica can report progress and serve the download
+# Running jobs, referenced so they are not garbage collected mid-render
+pdf_batch_tasks: set = set()
+
+def pdf_batch_key(job_id: str) -> str:
+    return f"pdf_batches/{job_id}.pdf"
+
+async def prune_pdf_batch_jobs():
+    """Forget finished batch jobs older than the TTL and remove their files"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=PDF_BATCH_JOB_TTL_SECONDS)
+    expired = await db.pdf_batch_jobs.find(
+        {"status": {"$in": ["completed", "failed"]}, "finished_at": {"$lte": cutoff}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    if not expired:
+        return
+    for job in expired:
+        await file_storage.delete(pdf_batch_key(job["id"]))
+    await db.pdf_batch_jobs.delete_many({"id": {"$in": [job["id"] for job in expired]}})
+
+def pdf_batch_job_view(job: dict) -> dict:
+    """Public progress report for a batch job"""
+    finished_at = as_utc(job["finished_at"]) or datetime.now(timezone.utc)
+    elapsed = (finished_at - as_utc(job["started_at"])).total_seconds()
     return {
-        "pdf_base64": pdf_base64,
-        "filename": f"candidates_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.pdf"
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "candidates_rendered": job["candidates_rendered"],
+        "pages": job["pages"],
+        "progress": round(job["candidates_rendered"] / job["total"], 4) if job["total"] else 1.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_sec": round(job["pages"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "error": job["error"],
+        "filename": job["filename"]
     }
 
-@api_router.post("/candidates/share-email-draft")
-async def create_email_draft(email_data: EmailDraft, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
-    # Mark candidates as shared
-    await db.candidates.update_many(
-        {"id": {"$in": email_data.candidate_ids}},
-        {"$set": {"status": CandidateStatus.SHARED_WITH_CLIENT.value}}
-    )
+async def find_pdf_batch_job(job_id: str, user_id: str) -> dict:
+    """A batch job started by the user; a running job whose worker went quiet is marked failed"""
+    job = await db.pdf_batch_jobs.find_one({"id": job_id, "created_by": user_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=PDF_BATCH_STALE_SECONDS)
+    if job["status"] == "running" and as_utc(job["updated_at"]) < stale_before:
+        failed = await db.pdf_batch_jobs.find_one_and_update(
+            {"id": job_id, "status": "running", "updated_at": job["updated_at"]},
+            {"$set": {"status": "failed", "error": "Worker stopped before the job finished",
+                      "finished_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        job = failed or await db.pdf_batch_jobs.find_one({"id": job_id}, {"_id": 0})
+    return job
+
+async def run_pdf_batch_job(job: dict, query: dict, chunk_size: int):
+    """Stream candidates from the cursor and render them chunk by chunk"""
+    work_dir = Path(tempfile.mkdtemp(prefix=f"profiles_{job['id']}_"))
+    writer = ProfilePdfBatchWriter(work_dir)
+    
+    async def add_chunk(chunk: List[dict]):
+        await asyncio.to_thread(writer.add_chunk, chunk)
+        await db.pdf_batch_jobs.update_one({"id": job["id"]}, {"$set": {
+            "candidates_rendered": writer.candidates_rendered, "pages": writer.pages,
+            "updated_at": datetime.now(timezone.utc)
+        }})
+    
+    update = {}
+    try:
+        cursor = export_db.candidates.find(query, {"_id": 0}).sort("created_at", 1).batch_size(chunk_size)
+        chunk = []
+        async for candidate in cursor:
+            chunk.append(candidate)
+            if len(chunk) >= chunk_size:
+                await add_chunk(chunk)
+                chunk = []
+            if writer.candidates_rendered + len(chunk) >= PDF_BATCH_MAX_CANDIDATES:
+                break
+        if chunk:
+            await add_chunk(chunk)
+        if not writer.part_paths:
+            raise ValueError("No candidates found")
+        output_path = await asyncio.to_thread(writer.finish)
+        with open(output_path, "rb") as output:
+            await file_storage.save(pdf_batch_key(job["id"]), output, "application/pdf")
+        update["status"] = "completed"
+    except Exception as e:
+        logger.error(f"PDF batch job {job['id']} failed: {str(e)}")
+        update.update(status="failed", error=str(e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        now = datetime.now(timezone.utc)
+        await db.pdf_batch_jobs.update_one({"id": job["id"]}, {"$set": {**update, "finished_at": now, "updated_at": now}})
+
+@app.on_event("startup")
+async def create_pdf_batch_indexes():
+    await db.pdf_batch_jobs.create_index("id", unique=True)
+    await db.pdf_batch_jobs.create_index([("status", 1), ("finished_at", 1)])
+
+# Server-side attachments, kept in file storage so any replica's outbox worker can send them
+def attachment_key(attachment_id: str) -> str:
+    return f"attachments/{attachment_id}"
+
+attachments_pruned_at = 0.0
+
+async def prune_expired_attachments():
+    """Remove stored attachment files whose metadata has expired, at most once per interval.
+    The TTL index deletes the metadata itself, so files are matched against what is left."""
+    global attachments_pruned_at
+    if time.monotonic() - attachments_pruned_at < ATTACHMENT_PRUNE_INTERVAL_SECONDS:
+        return
+    attachments_pruned_at = time.monotonic()
+    # Only files old enough to have expired, so an upload racing its metadata insert is kept
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=ATTACHMENT_TTL_HOURS)
+    candidates = [info async for info in file_storage.list("attachments/")
+                  if info.modified is None or as_utc(info.modified) <= cutoff]
+    if not candidates:
+        return
+    ids = [info.key.rsplit("/", 1)[-1] for info in candidates]
+    live = {a["id"] async for a in db.attachments.find(
+        {"id": {"$in": ids}, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0, "id": 1})}
+    for attachment_id in ids:
+        if attachment_id not in live:
+            await file_storage.delete(attachment_key(attachment_id))
+    await db.attachments.delete_many({"id": {"$in": ids}, "expires_at": {"$lte": datetime.now(timezone.utc)}})
+
+async def store_attachment(content: bytes, filename: str, content_type: str, created_by: str) -> dict:
+    """Persist a generated file so emails can reference it by id"""
+    await prune_expired_attachments()
+    now = datetime.now(timezone.utc)
+    attachment = {
+        "id": str(uuid.uuid4()),
+        "filename": filename,
+        "content_type": content_type,
+        "size": len(content),
+        "created_by": created_by,
+        "created_at": now,
+        "expires_at": now + timedelta(hours=ATTACHMENT_TTL_HOURS)
+    }
+    await file_storage.save(attachment_key(attachment["id"]), io.BytesIO(content), content_type)
+    await db.attachments.insert_one(dict(attachment))
+    return attachment
+
+async def attachment_mime_part(attachment: dict) -> "MIMEBase":
+    """Base64-encode a stored attachment into a MIME part, streaming the file from storage"""
+    from email.mime.base import MIMEBase
+    
+    maintype, subtype = attachment["content_type"].split('/', 1)
+    part = MIMEBase(maintype, subtype)
+    encoded = []
+    pending = b""
+    async for chunk in file_storage.open(attachment_key(attachment["id"])):
+        pending += chunk
+        whole = len(pending) - len(pending) % ATTACHMENT_READ_CHUNK
+        if whole:
+            encoded.append(base64.encodebytes(pending[:whole]).decode('ascii'))
+            pending = pending[whole:]
+    if pending:
+        encoded.append(base64.encodebytes(pending).decode('ascii'))
+    part.set_payload(''.join(encoded))
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment', filename=attachment["filename"])
+    return part
+
+@app.on_event("startup")
+async def create_attachment_indexes():
+    await db.attachments.create_index("id", unique=True)
+    try:
+        await db.attachments.create_index("expires_at", expireAfterSeconds=0)
+    except OperationFailure as e:
+        # IndexOptionsConflict: the plain expires_at index of earlier versions is replaced by the TTL one
+        if e.code != 85:
+            raise
+        await db.attachments.drop_index("expires_at_1")
+        await db.attachments.create_index("expires_at", expireAfterSeconds=0)
+
+@api_router.get("/attachments/{attachment_id}")
+async def download_attachment(attachment_id: str, request: Request, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Download a generated attachment"""
+    attachment = await db.attachments.find_one({"id": attachment_id, "created_by": current_user["id"]}, {"_id": 0})
+    info = await file_storage.stat(attachment_key(attachment_id)) if attachment else None
+    if info is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return StoredFileResponse(file_storage, info, request.headers, attachment["filename"],
+                              media_type=attachment["content_type"], disposition="attachment")
+
+# Profile sharing and PDF generation
+@api_router.post("/candidates/generate-pdf")
+async def generate_candidate_pdf(candidate_ids: List[str] = [], include_base64: bool = True, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    candidates = await db.candidates.find({"id": {"$in": candidate_ids}}, {"_id": 0}).to_list(100)
     
-    # Log the sharing action
-    sharing_log = {
+    if not candidates:
+        raise HTTPException(status_code=404, detail="No candidates found")
+    
+    # Reuse the cached document when none of the rendered fields changed
+    cache_key = profile_pdf_cache_key(candidates)
+    pdf_bytes = await asyncio.to_thread(profile_pdf_cache.get, cache_key)
+    if pdf_bytes is None:
+        pdf_bytes = await asyncio.to_thread(render_candidate_profiles_pdf, candidates)
+        await asyncio.to_thread(profile_pdf_cache.put, cache_key, [c["id"] for c in candidates], pdf_bytes)
+    
+    # Keep the document server-side so emails can attach it by id
+    filename = f"candidates_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.pdf"
+    attachment = await store_attachment(pdf_bytes, filename, "application/pdf", current_user["id"])
+    
+    response = {"attachment_id": attachment["id"], "filename": filename}
+    if include_base64:
+        # Return as base64 for preview
+        response["pdf_base64"] = base64.b64encode(pdf_bytes).decode('utf-8')
+    return response
+
+@api_router.post("/candidates/generate-pdf/batch")
+async def start_pdf_batch(batch_request: PdfBatchRequest, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Start streaming profile PDF generation for a large set of candidates"""
+    if not batch_request.candidate_ids and not batch_request.position_id:
+        raise HTTPException(status_code=400, detail="Provide candidate_ids or position_id")
+    
+    query = {}
+    if batch_request.candidate_ids:
+        query["id"] = {"$in": batch_request.candidate_ids}
+    if batch_request.position_id:
+        query["position_id"] = batch_request.position_id
+    
+    total = min(await db.candidates.count_documents(query), PDF_BATCH_MAX_CANDIDATES)
+    if total == 0:
+        raise HTTPException(status_code=404, detail="No candidates found")
+    
+    await prune_pdf_batch_jobs()
+    now = datetime.now(timezone.utc)
+    job = {
         "id": str(uuid.uuid4()),
-        "candidate_ids": email_data.candidate_ids,
-        "shared_by": current_user["id"],
-        "shared_to": email_data.to,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "status": "running",
+        "total": total,
+        "candidates_rendered": 0,
+        "pages": 0,
+        "created_by": current_user["id"],
+        "started_at": now,
+        "updated_at": now,
+        "finished_at": None,
+        "error": None,
+        "filename": f"candidates_{now.strftime('%Y%m%d_%H%M%S')}.pdf"
     }
-    await db.profile_sharing_log.insert_one(sharing_log)
+    await db.pdf_batch_jobs.insert_one(dict(job))
+    task = asyncio.create_task(run_pdf_batch_job(job, query, batch_request.chunk_size))
+    pdf_batch_tasks.add(task)
+    task.add_done_callback(pdf_batch_tasks.discard)
+    
+    return pdf_batch_job_view(job)
+
+@api_router.get("/candidates/generate-pdf/batch/{job_id}")
+async def get_pdf_batch(job_id: str, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Report progress of a batch PDF job"""
+    return pdf_batch_job_view(await find_pdf_batch_job(job_id, current_user["id"]))
+
+@api_router.get("/candidates/generate-pdf/batch/{job_id}/download")
+async def download_pdf_batch(job_id: str, request: Request, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Stream the finished batch PDF from file storage"""
+    job = await find_pdf_batch_job(job_id, current_user["id"])
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Batch job is {job['status']}")
+    info = await file_storage.stat(pdf_batch_key(job_id))
+    if info is None:
+        raise HTTPException(status_code=404, detail="Batch output no longer available")
+    return StoredFileResponse(file_storage, info, request.headers, job["filename"],
+                              media_type="application/pdf", disposition="attachment")
+
+@api_router.get("/pdf-cache/stats")
+async def get_pdf_cache_stats(current_user: dict = Depends(check_role([UserRole.ADMIN]))):
+    """Profile PDF cache size and hit-rate metrics"""
+    return profile_pdf_cache.stats()
+
+@api_router.post("/candidates/share-email-draft")
+async def create_email_draft(email_data: EmailDraft, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    # Mark candidates as shared and log the sharing action
+    await mark_candidates_shared(email_data.candidate_ids, current_user["id"], email_data.to)
     
     return {"message": "Email draft created successfully", "email": email_data}
 
 # Interview routes
+# Interviews may not overlap for the same candidate or the same interviewer (the scheduler)
+INTERVIEW_CONFLICT_FIELDS = {"candidate_id": "Candidate", "scheduled_by": "Interviewer"}
+# Creation time assumed for interviews stored before created_at was recorded
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+async def find_interview_conflicts(field: str, value: str, start: datetime, end: datetime) -> List[dict]:
+    """Interviews with the same candidate_id or scheduled_by overlapping [start, end)
+
+    Durations are capped at INTERVIEW_MAX_MINUTES, so any overlapping interview starts within
+    that window before `end`; the scan stays a bounded range on (field, interview_date).
+    """
+    earliest_start = start - timedelta(minutes=INTERVIEW_MAX_MINUTES)
+    legacy_earliest = start - timedelta(minutes=INTERVIEW_DEFAULT_MINUTES)
+    query = {
+        field: value,
+        "interview_date": {"$gt": earliest_start, "$lt": end},
+        "$or": [
+            {"interview_end": {"$gt": start}},
+            # Interviews scheduled before durations were recorded
+            {"interview_end": None, "interview_date": {"$gt": legacy_earliest}}
+        ]
+    }
+    return await db.interviews.find(query, {"_id": 0}).sort("interview_date", 1).to_list(50)
+
+async def interview_slot_conflicts(interview: Interview) -> List[tuple]:
+    """(label, conflicts) for each of the candidate's and interviewer's calendars the slot clashes with"""
+    clashes = []
+    for field, label in INTERVIEW_CONFLICT_FIELDS.items():
+        conflicts = [c for c in await find_interview_conflicts(
+            field, getattr(interview, field), interview.interview_date, interview.interview_end
+        ) if c["id"] != interview.id]
+        if conflicts:
+            clashes.append((label, conflicts))
+    return clashes
+
+def interview_conflict_error(label: str, conflicts: List[dict]) -> HTTPException:
+    return HTTPException(status_code=409, detail={
+        "message": f"{label} already has an interview in this time slot",
+        "conflicts": [
+            {"id": c["id"], "position_id": c["position_id"], "interview_date": as_utc(c["interview_date"]).isoformat()}
+            for c in conflicts
+        ]
+    })
+
 @api_router.post("/interviews", response_model=Interview)
 async def create_interview(interview_data: InterviewCreate, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
     interview = Interview(**interview_data.model_dump(), scheduled_by=current_user["id"])
-    interview_dict = interview.model_dump()
-    interview_dict["created_at"] = interview_dict["created_at"].isoformat()
-    interview_dict["interview_date"] = interview_dict["interview_date"].isoformat()
+    interview.interview_date = as_utc(interview.interview_date)
+    interview.interview_end = interview.interview_date + timedelta(minutes=interview.duration_minutes)
+    # Milliseconds, as stored, so every request orders racing inserts the same way
+    interview.created_at = interview.created_at.replace(microsecond=interview.created_at.microsecond // 1000 * 1000)
     
+    clashes = await interview_slot_conflicts(interview)
+    if clashes:
+        raise interview_conflict_error(*clashes[0])
+    
+    interview_dict = interview.model_dump()
     await db.interviews.insert_one(interview_dict)
     
+    # Two requests can both pass the check above; once both are inserted each sees the other,
+    # and every interview that clashes with an earlier-created one (by created_at, then id) withdraws
+    for label, conflicts in await interview_slot_conflicts(interview):
+        earlier = [c for c in conflicts
+                   if (as_utc(c.get("created_at")) or EPOCH, c["id"]) < (interview.created_at, interview.id)]
+        if earlier:
+            await db.interviews.delete_one({"id": interview.id})
+            raise interview_conflict_error(label, earlier)
+    
     # Update candidate status
-    await db.candidates.update_one(
-        {"id": interview_data.candidate_id},
-        {"$set": {"status": CandidateStatus.INTERVIEW_SCHEDULED.value}}
-    )
+    await set_candidates_status({"id": interview_data.candidate_id}, CandidateStatus.INTERVIEW_SCHEDULED.value, changed_by=current_user["id"])
     
     return interview
 
 @api_router.get("/interviews", response_model=List[Interview])
-async def get_interviews(current_user: dict = Depends(get_current_user)):
-    interviews = await db.interviews.find({}, {"_id": 0}).to_list(1000)
+async def get_interviews(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = datetime_range("interview_date", date_from, date_to)
+    interviews = await db.interviews.find(query, {"_id": 0}).sort("interview_date", 1).to_list(1000)
     return interviews
 
+@api_router.get("/interviews/calendar", response_model=List[Interview])
+async def get_interview_calendar(
+    start: datetime,
+    end: datetime,
+    position_id: Optional[str] = None,
+    candidate_id: Optional[str] = None,
+    scheduled_by: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Interviews starting in [start, end), optionally for one position, candidate or scheduler"""
+    start, end = as_utc(start), as_utc(end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > timedelta(days=INTERVIEW_CALENDAR_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Calendar window is limited to {INTERVIEW_CALENDAR_MAX_DAYS} days")
+    
+    # Equality filters first so each combination hits a (field, interview_date) index
+    query = {field: value for field, value in
+             (("position_id", position_id), ("candidate_id", candidate_id), ("scheduled_by", scheduled_by)) if value}
+    query["interview_date"] = {"$gte": start, "$lt": end}
+    return await db.interviews.find(query, {"_id": 0}).sort("interview_date", 1).to_list(None)
+
+@app.on_event("startup")
+async def create_datetime_indexes():
+    await db.candidates.create_index([("created_at", -1)])
+    await db.candidates.create_index([("position_id", 1), ("created_at", -1)])
+    await db.interviews.create_index([("interview_date", 1)])
+    await db.interviews.create_index([("candidate_id", 1), ("interview_date", 1), ("interview_end", 1)])
+    await db.interviews.create_index([("position_id", 1), ("interview_date", 1)])
+    await db.interviews.create_index([("scheduled_by", 1), ("interview_date", 1)])
+
 @api_router.put("/interviews/{interview_id}")
 async def update_interview(interview_id: str, feedback: Optional[str] = None, result: Optional[str] = None, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
     update_data = {}
@@ -1287,7 +2656,7 @@ async def configure_email(email_config: EmailConfig, current_user: dict = Depend
     config_dict = email_config.model_dump()
     config_dict["id"] = "email_config"
     config_dict["updated_by"] = current_user["id"]
-    config_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    config_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.email_config.update_one(
         {"id": "email_config"},
@@ -1295,6 +2664,9 @@ async def configure_email(email_config: EmailConfig, current_user: dict = Depend
         upsert=True
     )
     
+    # Sessions opened with the previous settings must not be reused
+    await asyncio.to_thread(smtp_pool.close_all)
+    
     return {"message": "Email configuration saved successfully"}
 
 @api_router.get("/email/config")
@@ -1305,96 +2677,1204 @@ async def get_email_config(current_user: dict = Depends(check_role([UserRole.ADM
         raise HTTPException(status_code=404, detail="Email not configured")
     return config
 
-@api_router.post("/email/send")
+# Outbound email delivery
+class SMTPConnectionPool:
+    """Pool of connected, authenticated SMTP sessions reused across messages.
+
+    Sessions are keyed by the SMTP settings they were opened with, so saving a
+    new email configuration never reuses a session for the old account.
+    All methods are blocking and meant to run in worker threads.
+    """
+
+    # Sessions idle for longer than this are probed with NOOP before reuse
+    PROBE_AFTER_SECONDS = 5.0
+
+    def __init__(self, max_idle: int, idle_seconds: float, timeout: float):
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self._idle: List[tuple] = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    @staticmethod
+    def fingerprint(config: dict) -> tuple:
+        password_hash = hashlib.sha256(config['smtp_password'].encode('utf-8')).hexdigest()
+        return (config['smtp_host'], config['smtp_port'], config['smtp_user'], password_hash, config['use_tls'])
+
+    def connect(self, config: dict) -> "smtplib.SMTP":
+        """Open and authenticate a new session"""
+        import smtplib
+        
+        server = smtplib.SMTP(config['smtp_host'], config['smtp_port'], timeout=self.timeout)
+        try:
+            if config['use_tls']:
+                server.starttls()
+            server.login(config['smtp_user'], config['smtp_password'])
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.opened += 1
+        return server
+
+    def acquire(self, config: dict) -> "smtplib.SMTP":
+        """Take an idle session for these settings, or open a new one"""
+        import smtplib
+        
+        key = self.fingerprint(config)
+        while True:
+            found = None
+            with self._lock:
+                for idx, (idle_key, _, _) in enumerate(self._idle):
+                    if idle_key == key:
+                        found = self._idle.pop(idx)
+                        break
+            if found is None:
+                return self.connect(config)
+            
+            _, server, last_used = found
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_seconds:
+                self.discard(server)
+                continue
+            if idle_for > self.PROBE_AFTER_SECONDS:
+                try:
+                    if server.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP rejected")
+                except (smtplib.SMTPException, OSError):
+                    self.discard(server)
+                    continue
+            with self._lock:
+                self.reused += 1
+            return server
+
+    def release(self, config: dict, server: "smtplib.SMTP"):
+        """Return a healthy session to the pool"""
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((self.fingerprint(config), server, time.monotonic()))
+                return
+        self.discard(server)
+
+    @staticmethod
+    def discard(server: "smtplib.SMTP"):
+        import smtplib
+        
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, server, _ in idle:
+            self.discard(server)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "opened": self.opened, "reused": self.reused}
+
+smtp_pool = SMTPConnectionPool(SMTP_POOL_SIZE, SMTP_IDLE_SECONDS, SMTP_TIMEOUT_SECONDS)
+
+def build_email_message(config: dict, message: dict, attachments: List["MIMEBase"] = ()) -> "MIMEMultipart":
+    """Build the MIME message for a queued email"""
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    
+    msg = MIMEMultipart()
+    msg['From'] = config['from_email']
+    msg['To'] = ', '.join(message['to'])
+    msg['Subject'] = message['subject']
+    
+    # Add body
+    msg.attach(MIMEText(message['body'], 'plain'))
+    
+    # Inline attachment of messages queued before inline files were stored by id
+    if message.get('attachment_base64') and message.get('attachment_filename'):
+        pdf_data = base64.b64decode(message['attachment_base64'])
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(pdf_data)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename={message["attachment_filename"]}')
+        msg.attach(part)
+    
+    # Add stored attachments referenced by id, already encoded by attachment_mime_part
+    for part in attachments:
+        msg.attach(part)
+    
+    return msg
+
+@tracer.traced("smtp.send", KIND_CLIENT)
+def deliver_email(config: dict, msg: "MIMEMultipart"):
+    """Send a message over a pooled session, reconnecting once if the server dropped it"""
+    import smtplib
+    
+    for attempt in range(2):
+        server = smtp_pool.connect(config) if attempt else smtp_pool.acquire(config)
+        try:
+            server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            smtp_pool.discard(server)
+            if attempt:
+                raise
+            continue
+        except Exception:
+            smtp_pool.discard(server)
+            raise
+        smtp_pool.release(config, server)
+        return
+
+async def mark_candidates_shared(candidate_ids: List[str], shared_by: str, shared_to: List[str]):
+    """Mark candidates as shared with the client and log the sharing action"""
+    await set_candidates_status({"id": {"$in": candidate_ids}}, CandidateStatus.SHARED_WITH_CLIENT.value, changed_by=shared_by)
+    
+    sharing_log = {
+        "id": str(uuid.uuid4()),
+        "candidate_ids": candidate_ids,
+        "shared_by": shared_by,
+        "shared_to": shared_to,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    await db.profile_sharing_log.insert_one(sharing_log)
+
+class EmailOutboxWorker:
+    """Background workers draining the ``email_outbox`` collection.
+
+    Messages are claimed atomically, so several workers and pods can share
+    the queue. Claims left in ``sending`` by a crashed worker are picked up
+    again once EMAIL_SENDING_TIMEOUT_SECONDS has passed.
+    """
+
+    def __init__(self, concurrency: int, poll_seconds: float):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a message is enqueued"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=EMAIL_SENDING_TIMEOUT_SECONDS)
+        return await db.email_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "locked_at": {"$lte": stale_before}}
+            ]},
+            {"$set": {"status": "sending", "locked_at": now}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                message = await self._claim()
+                if message is None:
+                    await self._wait()
+                    continue
+                await self._process(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _process(self, message: dict):
+        root = tracer.start_root("email_outbox.deliver", message.get("traceparent"),
+                                 {"email.message_id": message["id"], "email.attempt": message.get("attempts", 0) + 1},
+                                 KIND_CONSUMER)
+        with tracer.activate(root):
+            await self._deliver(message)
+
+    async def _deliver(self, message: dict):
+        import smtplib
+        
+        config = await db.email_config.find_one({"id": "email_config"}, {"_id": 0})
+        try:
+            if not config:
+                raise RuntimeError("Email not configured")
+            attachments = []
+            if message.get("attachment_ids"):
+                attachments = await db.attachments.find({"id": {"$in": message["attachment_ids"]}}, {"_id": 0}).to_list(None)
+                if len(attachments) != len(set(message["attachment_ids"])):
+                    raise RuntimeError("Attachment no longer available")
+                attachments = [await attachment_mime_part(attachment) for attachment in attachments]
+            msg = await asyncio.to_thread(build_email_message, config, message, attachments)
+            await asyncio.to_thread(deliver_email, config, msg)
+        except smtplib.SMTPAuthenticationError:
+            await self._record_failure(message, "SMTP authentication failed", permanent=True)
+            return
+        except Exception as e:
+            await self._record_failure(message, str(e))
+            return
+        
+        await db.email_outbox.update_one(
+            {"id": message["id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)},
+             "$unset": {"locked_at": "", "attachment_base64": ""}}
+        )
+        if message.get("candidate_ids"):
+            await mark_candidates_shared(message["candidate_ids"], message["created_by"], message["to"])
+
+    async def _record_failure(self, message: dict, error: str, permanent: bool = False):
+        attempts = message.get("attempts", 0) + 1
+        update = {"attempts": attempts, "last_error": error}
+        if permanent or attempts >= EMAIL_MAX_ATTEMPTS:
+            update["status"] = "failed"
+            logger.error(f"Email {message['id']} failed after {attempts} attempt(s): {error}")
+        else:
+            delay = EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+            update["status"] = "queued"
+            update["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        await db.email_outbox.update_one({"id": message["id"]}, {"$set": update, "$unset": {"locked_at": ""}})
+
+email_outbox_worker = EmailOutboxWorker(EMAIL_OUTBOX_CONCURRENCY, EMAIL_OUTBOX_POLL_SECONDS)
+
+@app.on_event("startup")
+async def start_email_outbox():
+    await db.email_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+    email_outbox_worker.start()
+
+@api_router.post("/email/send", status_code=202)
 async def send_email(email_data: EmailSend, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
-    """Send email with optional PDF attachment"""
+    """Queue email with optional PDF attachment for background delivery"""
     # Get email configuration
-    config = await db.email_config.find_one({"id": "email_config"}, {"_id": 0})
+    config = await db.email_config.find_one({"id": "email_config"}, {"_id": 0, "id": 1})
     if not config:
         raise HTTPException(status_code=400, detail="Email not configured. Please configure SMTP settings first.")
     
+    if email_data.attachment_ids:
+        attachment_ids = list(set(email_data.attachment_ids))
+        # Only the user who generated an attachment may send it
+        found = await db.attachments.count_documents({"id": {"$in": attachment_ids}, "created_by": current_user["id"],
+                                                      "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        if found != len(attachment_ids):
+            raise HTTPException(status_code=400, detail="Attachment not found or expired")
+    
+    # Inline files go to attachment storage, so the queue holds only their id
+    attachment_ids = list(email_data.attachment_ids)
+    if email_data.attachment_base64:
+        try:
+            content = base64.b64decode(email_data.attachment_base64, validate=True)
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="attachment_base64 is not valid base64")
+        attachment = await store_attachment(content, email_data.attachment_filename or "attachment",
+                                            "application/octet-stream", current_user["id"])
+        attachment_ids.append(attachment["id"])
+    
+    now = datetime.now(timezone.utc)
+    message = {
+        "id": str(uuid.uuid4()),
+        **email_data.model_dump(exclude={"attachment_base64", "attachment_filename", "attachment_ids"}),
+        "attachment_ids": attachment_ids,
+        "status": "queued",
+        "attempts": 0,
+        "last_error": None,
+        "created_by": current_user["id"],
+        "created_at": now,
+        "next_attempt_at": now
+    }
+    if current_span.get() is not None:
+        # Delivery spans join the request's trace
+        message["traceparent"] = current_span.get().traceparent
+    await db.email_outbox.insert_one(message)
+    email_outbox_worker.notify()
+    
+    return {"message": "Email queued for delivery", "id": message["id"], "status": "queued"}
+
+@api_router.get("/email/outbox/{message_id}")
+async def get_outbox_message(message_id: str, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Get delivery status of a queued email the user sent; admins can see any"""
+    query = {"id": message_id}
+    if current_user["role"] != "admin":
+        query["created_by"] = current_user["id"]
+    message = await db.email_outbox.find_one(query, {"_id": 0, "attachment_base64": 0, "body": 0})
+    if not message:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return message
+
+# Mail merge
+# Running jobs, referenced so they are not garbage collected mid-send
+mail_merge_tasks: set = set()
+# Recorded on the jobs this process runs
+MAIL_MERGE_WORKER_ID = f"{os.environ.get('HOSTNAME') or uuid.uuid4().hex[:12]}:{os.getpid()}"
+
+@tracer.traced("smtp.send", KIND_CLIENT)
+def pipelined_sendmail(server: "smtplib.SMTP", from_addr: str, to_addrs: List[str],
+                       msg: Union["MIMEMultipart", bytes]) -> dict:
+    """Send one message, batching MAIL/RCPT/DATA into a single round-trip
+    when the server advertises PIPELINING (RFC 2920). Returns refused recipients.
+    msg may be passed already flattened, so callers that need its size serialize it once."""
+    import smtplib
+    
+    if not isinstance(msg, bytes):
+        msg = msg.as_bytes()
+    server.ehlo_or_helo_if_needed()
+    if not server.has_extn('pipelining'):
+        return server.sendmail(from_addr, to_addrs, msg)
+    
+    commands = [f"MAIL FROM:<{from_addr}>"] + [f"RCPT TO:<{addr}>" for addr in to_addrs] + ["DATA"]
+    server.send("".join(f"{command}\r\n" for command in commands))
+    replies = [server.getreply() for _ in commands]
+    mail_reply, rcpt_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+    refused = {addr: reply for addr, reply in zip(to_addrs, rcpt_replies) if reply[0] not in (250, 251)}
+    
+    if data_reply[0] != 354:
+        server.rset()
+        if mail_reply[0] != 250:
+            raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+        if len(refused) == len(to_addrs):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        raise smtplib.SMTPDataError(*data_reply)
+    
+    # Normalise line endings and dot-stuff the payload before the terminator
+    data = re.sub(rb'(?:\r\n|\n|\r(?!\n))', b'\r\n', msg)
+    data = re.sub(rb'(?m)^\.', b'..', data)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    server.send(data + b'.\r\n')
+    code, resp = server.getreply()
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    if mail_reply[0] != 250:
+        raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+    return refused
+
+def render_mail_merge_template(template: str, variables: dict) -> str:
+    """Substitute $placeholders, leaving unknown ones untouched"""
+    return Template(template).safe_substitute(variables)
+
+async def run_mail_merge_job(job_id: str, request: MailMergeRequest, config: dict, shared_by: str):
+    """Render and send every mail-merge message over one SMTP session"""
+    import smtplib
+    from email import encoders
+    from email.mime.base import MIMEBase
+    
+    candidate_ids = list({cid for r in request.recipients for cid in r.candidate_ids})
+    client_ids = list({r.client_id for r in request.recipients if r.client_id})
+    candidates = {c["id"]: c for c in await db.candidates.find({"id": {"$in": candidate_ids}}, {"_id": 0}).to_list(None)}
+    clients = {c["id"]: c for c in await db.clients.find({"id": {"$in": client_ids}}, {"_id": 0}).to_list(None)}
+    
+    results = []
+    shared_candidate_ids = set()
+    sharing_logs = []
+    bytes_sent = 0
+    server = None
+    started = time.perf_counter()
+    heartbeat = started
     try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = config['from_email']
-        msg['To'] = ', '.join(email_data.to)
-        msg['Subject'] = email_data.subject
-        
-        # Add body
-        msg.attach(MIMEText(email_data.body, 'plain'))
-        
-        # Add PDF attachment if provided
-        if email_data.attachment_base64 and email_data.attachment_filename:
-            pdf_data = base64.b64decode(email_data.attachment_base64)
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(pdf_data)
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f'attachment; filename={email_data.attachment_filename}')
-            msg.attach(part)
-        
-        # Connect to SMTP server and send
-        if config['use_tls']:
-            server = smtplib.SMTP(config['smtp_host'], config['smtp_port'])
-            server.starttls()
-        else:
-            server = smtplib.SMTP(config['smtp_host'], config['smtp_port'])
-        
-        server.login(config['smtp_user'], config['smtp_password'])
-        server.send_message(msg)
-        server.quit()
-        
-        # Update candidate status if candidate_ids provided
-        if email_data.candidate_ids:
-            await db.candidates.update_many(
-                {"id": {"$in": email_data.candidate_ids}},
-                {"$set": {"status": CandidateStatus.SHARED_WITH_CLIENT.value}}
-            )
+        server = await asyncio.to_thread(smtp_pool.acquire, config)
+        pipelined = server.has_extn('pipelining')
+        for idx, recipient in enumerate(request.recipients):
+            if time.perf_counter() - heartbeat >= MAIL_MERGE_HEARTBEAT_SECONDS:
+                heartbeat = time.perf_counter()
+                await db.mail_merge_jobs.update_one({"id": job_id}, {"$set": {
+                    "heartbeat_at": datetime.now(timezone.utc), "processed": idx}})
+            client = clients.get(recipient.client_id) if recipient.client_id else None
+            to = recipient.to or (client or {}).get("contact_emails", [])
+            recipient_candidates = [candidates[cid] for cid in recipient.candidate_ids if cid in candidates]
+            if not to:
+                results.append({"index": idx, "to": to, "status": "failed", "error": "No recipient addresses"})
+                continue
             
-            # Log the sharing action
-            sharing_log = {
-                "id": str(uuid.uuid4()),
-                "candidate_ids": email_data.candidate_ids,
-                "shared_by": current_user["id"],
-                "shared_to": email_data.to,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+            variables = {
+                "client_name": (client or {}).get("client_name", ""),
+                "candidate_count": str(len(recipient_candidates)),
+                "candidate_names": ", ".join(c["name"] for c in recipient_candidates),
+                **recipient.variables
             }
-            await db.profile_sharing_log.insert_one(sharing_log)
-        
-        return {"message": "Email sent successfully"}
-        
-    except smtplib.SMTPAuthenticationError:
-        raise HTTPException(status_code=401, detail="SMTP authentication failed. Please check email credentials.")
+            message = {
+                "to": to,
+                "subject": render_mail_merge_template(request.subject_template, variables),
+                "body": render_mail_merge_template(request.body_template, variables)
+            }
+            msg = build_email_message(config, message)
+            if request.attach_profiles and recipient_candidates:
+                cache_key = profile_pdf_cache_key(recipient_candidates)
+                pdf_bytes = await asyncio.to_thread(profile_pdf_cache.get, cache_key)
+                if pdf_bytes is None:
+                    pdf_bytes = await asyncio.to_thread(render_candidate_profiles_pdf, recipient_candidates)
+                    await asyncio.to_thread(profile_pdf_cache.put, cache_key, [c["id"] for c in recipient_candidates], pdf_bytes)
+                part = MIMEBase('application', 'pdf')
+                part.set_payload(pdf_bytes)
+                encoders.encode_base64(part)
+                part.add_header('Content-Disposition', f'attachment; filename=candidates_{idx + 1}.pdf')
+                msg.attach(part)
+            
+            # Flattened once: the same bytes are sent, resent after a reconnect and counted
+            data = await asyncio.to_thread(msg.as_bytes)
+            try:
+                try:
+                    refused = await asyncio.to_thread(pipelined_sendmail, server, config['from_email'], to, data)
+                except smtplib.SMTPServerDisconnected:
+                    await asyncio.to_thread(smtp_pool.discard, server)
+                    server = None
+                    server = await asyncio.to_thread(smtp_pool.connect, config)
+                    refused = await asyncio.to_thread(pipelined_sendmail, server, config['from_email'], to, data)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                results.append({"index": idx, "to": to, "status": "failed", "error": str(e)})
+                continue
+            
+            bytes_sent += len(data)
+            results.append({"index": idx, "to": to, "status": "sent", "refused": list(refused)})
+            if recipient_candidates:
+                shared_candidate_ids.update(c["id"] for c in recipient_candidates)
+                sharing_logs.append({
+                    "id": str(uuid.uuid4()),
+                    "candidate_ids": [c["id"] for c in recipient_candidates],
+                    "shared_by": shared_by,
+                    "shared_to": to,
+                    "mail_merge_job_id": job_id,
+                    "timestamp": datetime.now(timezone.utc)
+                })
+        await asyncio.to_thread(smtp_pool.release, config, server)
+        status = "completed"
+        error = None
+    except Exception as e:
+        logger.error(f"Mail merge job {job_id} failed: {str(e)}")
+        if server is not None:
+            await asyncio.to_thread(smtp_pool.discard, server)
+        pipelined = False
+        status = "failed"
+        error = str(e)
+    
+    # The emails are out either way; a failure recording them must not leave the job running
+    bookkeeping_error = None
+    try:
+        if sharing_logs:
+            await db.profile_sharing_log.insert_many(sharing_logs)
+        if shared_candidate_ids:
+            await set_candidates_status({"id": {"$in": list(shared_candidate_ids)}}, CandidateStatus.SHARED_WITH_CLIENT.value, changed_by=shared_by)
     except Exception as e:
-        logger.error(f"Email sending failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        bookkeeping_error = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Mail merge job {job_id} sent its emails but could not record the sharing: {bookkeeping_error}")
+    
+    elapsed = time.perf_counter() - started
+    sent = sum(1 for r in results if r["status"] == "sent")
+    try:
+        await db.mail_merge_jobs.update_one(
+            {"id": job_id},
+            {"$set": {
+                "status": status,
+                "error": error,
+                "bookkeeping_error": bookkeeping_error,
+                "results": results,
+                "sent": sent,
+                "failed": len(results) - sent,
+                "processed": len(results),
+                "metrics": {
+                    "elapsed_seconds": round(elapsed, 3),
+                    "messages_per_sec": round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+                    "bytes_sent": bytes_sent,
+                    "pipelined": pipelined
+                },
+                "finished_at": datetime.now(timezone.utc)
+            }}
+        )
+    except Exception as e:
+        logger.error(f"Mail merge job {job_id} finished but its outcome could not be saved: {str(e)}")
+
+async def fail_stale_mail_merge_jobs(query: Optional[dict] = None) -> int:
+    """Mark running jobs whose worker stopped sending heartbeats as failed.
+    Recipients are not resent automatically: the results so far were never written."""
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=MAIL_MERGE_STALE_SECONDS)
+    result = await db.mail_merge_jobs.update_many(
+        {**(query or {}), "status": "running", "$or": [
+            {"heartbeat_at": {"$lt": stale_before}},
+            {"heartbeat_at": {"$exists": False}, "created_at": {"$lt": stale_before}}
+        ]},
+        {"$set": {"status": "failed", "error": "Worker stopped before the job finished", "finished_at": now}}
+    )
+    return result.modified_count
+
+@app.on_event("startup")
+async def recover_mail_merge_jobs():
+    await db.mail_merge_jobs.create_index("id", unique=True)
+    await db.mail_merge_jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+    failed = await fail_stale_mail_merge_jobs()
+    if failed:
+        logger.warning(f"Marked {failed} interrupted mail merge job(s) as failed")
+
+@api_router.post("/email/mail-merge", status_code=202)
+async def start_mail_merge(merge_request: MailMergeRequest, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Send personalised profile emails to many recipients in one job.
+    Templates use $client_name, $candidate_count, $candidate_names and per-recipient variables."""
+    if not merge_request.recipients:
+        raise HTTPException(status_code=400, detail="No recipients provided")
+    
+    config = await db.email_config.find_one({"id": "email_config"}, {"_id": 0})
+    if not config:
+        raise HTTPException(status_code=400, detail="Email not configured. Please configure SMTP settings first.")
+    
+    job = {
+        "id": str(uuid.uuid4()),
+        "status": "running",
+        "total": len(merge_request.recipients),
+        "sent": 0,
+        "failed": 0,
+        "created_by": current_user["id"],
+        "created_at": datetime.now(timezone.utc),
+        "worker": MAIL_MERGE_WORKER_ID,
+        "heartbeat_at": datetime.now(timezone.utc)
+    }
+    await db.mail_merge_jobs.insert_one(job)
+    task = asyncio.create_task(run_mail_merge_job(job["id"], merge_request, config, current_user["id"]))
+    mail_merge_tasks.add(task)
+    task.add_done_callback(mail_merge_tasks.discard)
+    
+    return {"message": "Mail merge started", "id": job["id"], "status": "running", "total": job["total"]}
+
+@api_router.get("/email/mail-merge/{job_id}")
+async def get_mail_merge(job_id: str, current_user: dict = Depends(check_role([UserRole.MANAGER, UserRole.TEAM_LEADER, UserRole.ADMIN]))):
+    """Get progress, per-recipient results and throughput of a mail-merge job"""
+    await fail_stale_mail_merge_jobs({"id": job_id})
+    job = await db.mail_merge_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Mail merge job not found")
+    return job
+
+# Pipeline counters
+@api_router.get("/pipeline/counters")
+async def get_pipeline_counters(scope: str = "global", scope_id: Optional[str] = None, current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))):
+    """Candidate counts per status for a scope: global, position, client or recruiter"""
+    if scope not in ("global", "position", "client", "recruiter"):
+        raise HTTPException(status_code=400, detail="Invalid scope")
+    query = {"scope": scope}
+    if scope_id:
+        query["scope_id"] = scope_id
+    return await analytics_db.pipeline_counters.find(query, {"_id": 0}).to_list(1000)
+
+@api_router.post("/pipeline/counters/reconcile")
+async def reconcile_counters(current_user: dict = Depends(check_role([UserRole.ADMIN]))):
+    """Rebuild rollup counters from the candidates collection"""
+    counters = await reconcile_pipeline_counters()
+    dashboard_stats_cache.invalidate()
+    return {"message": "Pipeline counters reconciled", "counters": counters}
+
+# Analytics
+def parse_report_range(start_date: Optional[str], end_date: Optional[str], default_days: int = 365,
+                       tz: tzinfo = timezone.utc) -> tuple:
+    """Parse YYYY-MM-DD report bounds into inclusive day starts in the report's timezone"""
+    try:
+        end = datetime.fromisoformat(end_date) if end_date else datetime.now(tz)
+        end = end.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=tz)
+        start = datetime.fromisoformat(start_date).replace(tzinfo=tz) if start_date else end - timedelta(days=default_days - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    return start, end
+
+async def count_funnel_reached(event_match: dict, start: datetime, end_exclusive: datetime) -> List[int]:
+    """Candidates per funnel stage that entered it or any later stage in the range,
+    so skipped stages still count and no stage exceeds the one before it"""
+    rank = -1
+    for idx, status_value in enumerate(FUNNEL_STAGES):
+        rank = {"$cond": [{"$eq": ["$to_status", status_value]}, idx, rank]}
+    pipeline = [
+        {"$match": {**event_match, "to_status": {"$in": FUNNEL_STAGES}, "at": {"$gte": start, "$lt": end_exclusive}}},
+        {"$group": {"_id": "$candidate_id", "furthest": {"$max": rank}}},
+        {"$group": {"_id": "$furthest", "candidates": {"$sum": 1}}}
+    ]
+    furthest = {row["_id"]: row["candidates"] async for row in analytics_db.status_events.aggregate(pipeline)}
+    reached, total = [], 0
+    for idx in reversed(range(len(FUNNEL_STAGES))):
+        total += furthest.get(idx, 0)
+        reached.append(total)
+    return reached[::-1]
+
+@api_router.get("/analytics/funnel")
+async def get_funnel_analytics(
+    position_id: Optional[str] = None,
+    client_id: Optional[str] = None,
+    recruiter_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))
+):
+    """Stage conversion and time-in-stage percentiles from the daily status buckets.
+    Team leaders see only the positions they created, as on the dashboard."""
+    filters = [(scope, scope_id) for scope, scope_id in
+               (("position", position_id), ("client", client_id), ("recruiter", recruiter_id)) if scope_id]
+    if len(filters) > 1:
+        raise HTTPException(status_code=400, detail="Filter by only one of position_id, client_id or recruiter_id")
+    scope, scope_id = filters[0] if filters else ("global", None)
+    start, end = parse_report_range(start_date, end_date)
+    
+    if current_user["role"] in ["admin", "manager"]:
+        bucket_match = {"scope": scope, "scope_id": scope_id}
+        event_match = {f"{scope}_id": scope_id} if scope_id else {}
+    else:
+        # Recruiter rollups span every position a recruiter works on, visible or not
+        if scope == "recruiter":
+            raise HTTPException(status_code=403, detail="recruiter_id is only available to admins and managers")
+        access = await get_access_scope(current_user)
+        position_ids = access["position_ids"]
+        if scope == "position":
+            if position_id not in position_ids:
+                raise HTTPException(status_code=404, detail="Position not found")
+            position_ids = [position_id]
+        elif scope == "client":
+            if client_id not in access["client_ids"]:
+                raise HTTPException(status_code=404, detail="Client not found")
+            position_ids = [p["id"] async for p in db.positions.find(
+                {"id": {"$in": position_ids}, "client_id": client_id}, {"_id": 0, "id": 1})]
+        bucket_match = {"scope": "position", "scope_id": {"$in": position_ids}}
+        event_match = {"position_id": {"$in": position_ids}}
+    
+    statuses = [s.value for s in CandidateStatus]
+    group = {"_id": None}
+    for status_value in statuses:
+        group[f"entered_{status_value}"] = {"$sum": f"$entered.{status_value}"}
+        group[f"exited_{status_value}"] = {"$sum": f"$exited.{status_value}"}
+        group[f"seconds_{status_value}"] = {"$sum": f"$stage_seconds.{status_value}"}
+        group[f"samples_{status_value}"] = {"$sum": f"$stage_samples.{status_value}"}
+        for idx in range(len(STAGE_HISTOGRAM_HOURS) + 1):
+            group[f"hist_{status_value}_b{idx}"] = {"$sum": f"$stage_hist.{status_value}.b{idx}"}
+    pipeline = [
+        {"$match": {**bucket_match, "day": {"$gte": start, "$lte": end}}},
+        {"$group": group}
+    ]
+    rows, reached = await asyncio.gather(
+        analytics_db.status_daily.aggregate(pipeline).to_list(1),
+        count_funnel_reached(event_match, start, end + timedelta(days=1))
+    )
+    totals = rows[0] if rows else {}
+    
+    def stage_report(status_value: str) -> dict:
+        histogram = {f"b{idx}": totals.get(f"hist_{status_value}_b{idx}", 0) for idx in range(len(STAGE_HISTOGRAM_HOURS) + 1)}
+        samples = totals.get(f"samples_{status_value}", 0)
+        return {
+            "status": status_value,
+            "entered": totals.get(f"entered_{status_value}", 0),
+            "exited": totals.get(f"exited_{status_value}", 0),
+            "time_in_stage_hours": {
+                "avg": round(totals.get(f"seconds_{status_value}", 0) / samples / 3600, 2) if samples else None,
+                "p50": histogram_percentile(histogram, 0.5),
+                "p90": histogram_percentile(histogram, 0.9),
+                "samples": samples
+            }
+        }
+    
+    stages = []
+    for idx, status_value in enumerate(FUNNEL_STAGES):
+        report = stage_report(status_value)
+        report["reached"] = reached[idx]
+        if idx > 0:
+            previous = stages[-1]["reached"]
+            report["conversion_from_previous"] = round(report["reached"] / previous, 4) if previous else None
+        stages.append(report)
+    
+    return {
+        "scope": scope,
+        "scope_id": scope_id,
+        "start_date": start.date().isoformat(),
+        "end_date": end.date().isoformat(),
+        "stages": stages,
+        "outcomes": [stage_report(s) for s in statuses if s not in FUNNEL_STAGES]
+    }
+
+RECRUITER_METRICS = ["added", "shortlisted", "interviewed", "selected"]
+
+recruiter_report_cache = AsyncTTLCache(ANALYTICS_CACHE_TTL_SECONDS, max_entries=256)
+
+def bucketed_count_pipeline(match: dict, user_field: str, date_field: str, unit: str, tz: str) -> list:
+    """Count documents per user per $dateTrunc bucket"""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user": f"${user_field}",
+                "period": {"$dateTrunc": {"date": f"${date_field}", "unit": unit,
+                                          "timezone": tz, "startOfWeek": "monday"}}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+
+def report_timezone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {name}")
+
+async def compute_recruiter_report(start: datetime, end: datetime, unit: str, tz: str, recruiter_id: Optional[str]) -> dict:
+    # Bounds are local midnights; adding a day to an aware datetime keeps wall time across DST changes
+    start_utc = start.astimezone(timezone.utc)
+    end_exclusive = (end + timedelta(days=1)).astimezone(timezone.utc)
+    
+    def user_filter(field: str) -> dict:
+        return {field: recruiter_id} if recruiter_id else {}
+    
+    pipelines = {
+        "added": (analytics_db.candidates, bucketed_count_pipeline(
+            {**user_filter("added_by"), "created_at": {"$gte": start_utc, "$lt": end_exclusive}},
+            "added_by", "created_at", unit, tz)),
+        "shortlisted": (analytics_db.status_events, bucketed_count_pipeline(
+            {"to_status": CandidateStatus.SHORTLISTED.value, **user_filter("recruiter_id"), "at": {"$gte": start_utc, "$lt": end_exclusive}},
+            "recruiter_id", "at", unit, tz)),
+        "interviewed": (analytics_db.interviews, bucketed_count_pipeline(
+            {**user_filter("scheduled_by"), "created_at": {"$gte": start_utc, "$lt": end_exclusive}},
+            "scheduled_by", "created_at", unit, tz)),
+        "selected": (analytics_db.status_events, bucketed_count_pipeline(
+            {"to_status": CandidateStatus.SELECTED.value, **user_filter("recruiter_id"), "at": {"$gte": start_utc, "$lt": end_exclusive}},
+            "recruiter_id", "at", unit, tz)),
+    }
+    results = await asyncio.gather(*[collection.aggregate(pipeline).to_list(None) for collection, pipeline in pipelines.values()])
+    
+    series: Dict[str, Dict[str, dict]] = {}
+    for metric, rows in zip(pipelines.keys(), results):
+        for row in rows:
+            period = as_utc(row["_id"]["period"]).isoformat()
+            bucket = series.setdefault(row["_id"]["user"], {}).setdefault(period, {m: 0 for m in RECRUITER_METRICS})
+            bucket[metric] += row["count"]
+    
+    users = await analytics_db.users.find({"id": {"$in": list(series)}}, {"_id": 0, "id": 1, "name": 1, "role": 1}).to_list(None)
+    users_by_id = {u["id"]: u for u in users}
+    recruiters = []
+    for user_id, periods in series.items():
+        totals = {m: sum(p[m] for p in periods.values()) for m in RECRUITER_METRICS}
+        recruiters.append({
+            "recruiter_id": user_id,
+            "name": users_by_id.get(user_id, {}).get("name"),
+            "role": users_by_id.get(user_id, {}).get("role"),
+            "totals": totals,
+            "series": [{"period": period, **counts} for period, counts in sorted(periods.items())]
+        })
+    recruiters.sort(key=lambda r: (-r["totals"]["selected"], -r["totals"]["added"]))
+    
+    return {
+        "granularity": unit,
+        "timezone": tz,
+        "start_date": start.date().isoformat(),
+        "end_date": end.date().isoformat(),
+        "recruiters": recruiters
+    }
+
+@api_router.get("/analytics/recruiters")
+async def get_recruiter_analytics(
+    granularity: str = "week",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    recruiter_id: Optional[str] = None,
+    timezone_name: str = "UTC",
+    current_user: dict = Depends(check_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.TEAM_LEADER]))
+):
+    """Per-recruiter candidates added, shortlisted, interviewed and selected, bucketed by day/week/month"""
+    if granularity not in ("day", "week", "month"):
+        raise HTTPException(status_code=400, detail="granularity must be day, week or month")
+    tz = report_timezone(timezone_name)
+    start, end = parse_report_range(start_date, end_date, default_days=90, tz=tz)
+    timezone_name = tz.key
+    
+    cache_key = (granularity, start, end, timezone_name, recruiter_id)
+    return await recruiter_report_cache.get_or_compute(
+        cache_key, lambda: compute_recruiter_report(start, end, granularity, timezone_name, recruiter_id)
+    )
+
+@app.on_event("startup")
+async def create_analytics_indexes():
+    await db.candidates.create_index([("added_by", 1), ("created_at", 1)])
+    await db.interviews.create_index([("scheduled_by", 1), ("created_at", 1)])
+    await db.status_events.create_index([("to_status", 1), ("at", 1), ("recruiter_id", 1)])
 
 # Dashboard statistics
+dashboard_stats_cache = AsyncTTLCache(DASHBOARD_CACHE_TTL_SECONDS)
+
+async def count_candidates_by_status(statuses: List[str], position_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """Candidate counts per status, read from the global rollup counter or summed over the given positions' counters"""
+    if position_ids is None:
+        counters = [await analytics_db.pipeline_counters.find_one({"id": "global"}, {"_id": 0, "counts": 1}) or {}]
+    else:
+        counters = await analytics_db.pipeline_counters.find(
+            {"id": {"$in": [f"position:{position_id}" for position_id in position_ids]}}, {"_id": 0, "counts": 1}
+        ).to_list(None)
+    return {
+        status_value: sum(counter.get("counts", {}).get(status_value, 0) for counter in counters)
+        for status_value in statuses
+    }
+
+async def scoped_position_stats(role: str, user_id: str) -> dict:
+    """Position and client counts visible to the user; scoped roles read their cached access scope"""
+    if role in ["admin", "manager"]:
+        pipeline = [
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "open": [{"$match": {"status": "open"}}, {"$count": "n"}]
+            }}
+        ]
+        result = (await analytics_db.positions.aggregate(pipeline).to_list(1))[0]
+        return {
+            "total_positions": result["total"][0]["n"] if result["total"] else 0,
+            "open_positions": result["open"][0]["n"] if result["open"] else 0
+        }
+    scope = await get_access_scope({"id": user_id, "role": role})
+    if role == "team_leader":
+        return {"assigned_clients": len(scope["client_ids"]), "assigned_positions": len(scope["position_ids"])}
+    # recruiter
+    return {"assigned_positions": len(scope["position_ids"])}
+
+async def compute_dashboard_stats(role: str, user_id: str) -> dict:
+    """Run every dashboard query concurrently; team leaders and recruiters only count their own positions"""
+    statuses = ["shared_with_client", "selected", "client_review"]
+    if role in ["admin", "manager"]:
+        queries = [
+            scoped_position_stats(role, user_id),
+            count_candidates_by_status(statuses),
+            analytics_db.interviews.estimated_document_count(),
+            analytics_db.clients.estimated_document_count()
+        ]
+    else:
+        scope = await get_access_scope({"id": user_id, "role": role})
+        queries = [
+            scoped_position_stats(role, user_id),
+            count_candidates_by_status(statuses, scope["position_ids"]),
+            analytics_db.interviews.count_documents({"position_id": {"$in": scope["position_ids"]}})
+        ]
+    results = await asyncio.gather(*queries)
+    position_stats, status_counts, interview_count = results[:3]
+    
+    stats = {}
+    if role in ["admin", "manager"]:
+        stats["total_clients"] = results[3]
+    stats.update(position_stats)
+    stats["profiles_shared"] = status_counts["shared_with_client"]
+    stats["interviews_scheduled"] = interview_count
+    stats["candidates_selected"] = status_counts["selected"]
+    stats["feedback_pending"] = status_counts["client_review"]
+    return stats
+
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     role = current_user["role"]
     user_id = current_user["id"]
     
-    stats = {}
-    
-    if role in ["admin", "manager"]:
-        stats["total_clients"] = await db.clients.count_documents({})
-        stats["total_positions"] = await db.positions.count_documents({})
-        stats["open_positions"] = await db.positions.count_documents({"status": "open"})
-    elif role == "team_leader":
-        positions = await db.positions.find({"created_by": user_id}, {"_id": 0, "client_id": 1}).to_list(1000)
-        client_ids = list(set([p["client_id"] for p in positions]))
-        stats["assigned_clients"] = len(client_ids)
-        stats["assigned_positions"] = len(positions)
-    else:  # recruiter
-        positions = await db.positions.find({"assigned_recruiters": user_id}, {"_id": 0}).to_list(1000)
-        stats["assigned_positions"] = len(positions)
-    
-    stats["profiles_shared"] = await db.candidates.count_documents({"status": "shared_with_client"})
-    stats["interviews_scheduled"] = await db.interviews.count_documents({})
-    stats["candidates_selected"] = await db.candidates.count_documents({"status": "selected"})
-    stats["feedback_pending"] = await db.candidates.count_documents({"status": "client_review"})
-    
-    return stats
+    # Admins and managers see the same global numbers, so they share one entry
+    cache_key = ("global",) if role in ["admin", "manager"] else (role, user_id)
+    return await dashboard_stats_cache.get_or_compute(cache_key, lambda: compute_dashboard_stats(role, user_id))
+
+# Cross-replica cache invalidation
+class CacheInvalidationBus:
+    """Tails change streams and evicts in-process caches on every replica.
+
+    Reconnects resume from the last token seen, so they miss no events. With a stable
+    consumer id the token is also checkpointed in `change_stream_tokens` and survives a
+    restart. Without one, or when the token has fallen off the oplog, every cache is
+    reset once the stream is open instead.
+    """
+
+    def __init__(self, database, collections: List[str], apply, reset, consumer_id: Optional[str],
+                 checkpoint_seconds: float = CACHE_BUS_CHECKPOINT_SECONDS):
+        self.database = database
+        self.collections = collections
+        self.apply = apply
+        self.reset = reset
+        self.consumer_id = consumer_id
+        self.checkpoint_seconds = checkpoint_seconds
+        self.token = None
+        self.running = False
+        self.events = 0
+        self.reconnects = 0
+        self.resets = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _load_token(self):
+        if self.consumer_id is None:
+            return None
+        checkpoint = await self.database.change_stream_tokens.find_one({"id": self.consumer_id}, {"_id": 0, "token": 1})
+        return checkpoint["token"] if checkpoint else None
+
+    async def _save_token(self):
+        if self.token is None or self.consumer_id is None:
+            return
+        await self.database.change_stream_tokens.update_one(
+            {"id": self.consumer_id},
+            {"$set": {"token": self.token, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    async def _follow(self):
+        # No post-image lookups: updates carry only the _id, and events are trimmed to what apply() reads
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.collections}}},
+            {"$project": {"operationType": 1, "documentKey": 1, "ns": 1, "fullDocument.id": 1,
+                          "fullDocument.created_by": 1, "fullDocument.assigned_recruiters": 1}}
+        ]
+        resumed = self.token is not None
+        async with self.database.watch(pipeline, resume_after=self.token, max_await_time_ms=1000) as stream:
+            # Entries cached before the stream opened may predate changes it will never deliver
+            if not resumed:
+                self.reset()
+            self.running = True
+            last_saved = time.monotonic()
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    self.events += 1
+                    try:
+                        self.apply(change)
+                    except Exception as e:
+                        logger.error(f"Cache invalidation failed for {change.get('ns')}: {str(e)}")
+                # Advances on idle batches too, so a quiet stream never falls behind the oplog
+                self.token = stream.resume_token
+                if time.monotonic() - last_saved >= self.checkpoint_seconds:
+                    await self._save_token()
+                    last_saved = time.monotonic()
+
+    async def _run(self):
+        backoff = 1.0
+        try:
+            self.token = await self._load_token()
+            while True:
+                try:
+                    await self._follow()
+                except NotImplementedError:
+                    logger.info("Cache invalidation bus disabled: storage backend has no change streams")
+                    return
+                except OperationFailure as e:
+                    if e.code == 40573:
+                        logger.info("Cache invalidation bus disabled: MongoDB is not a replica set")
+                        return
+                    if e.code in (260, 280, 286):
+                        # Resume point is gone; anything may have changed in between, so the
+                        # caches are reset when the stream reopens without a token
+                        logger.warning(f"Change stream history lost, resetting caches: {str(e)}")
+                        self.token = None
+                        self.resets += 1
+                    else:
+                        logger.warning(f"Change stream failed: {str(e)}")
+                except PyMongoError as e:
+                    logger.warning(f"Change stream disconnected: {str(e)}")
+                self.running = False
+                self.reconnects += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+        except asyncio.CancelledError:
+            self.running = False
+            await asyncio.shield(self._save_token())
+            raise
+
+    def stats(self) -> dict:
+        return {"consumer_id": self.consumer_id, "running": self.running, "events": self.events,
+                "reconnects": self.reconnects, "resets": self.resets}
+
+def apply_cache_invalidation(change: dict):
+    """Evict the cache entries a change in another replica may have made stale.
+    Only inserts carry the document; profile PDFs are keyed by content version and need no eviction."""
+    collection = change["ns"]["coll"]
+    document = change.get("fullDocument") or {}
+    entity_id = document.get("id")
+    if collection == "users":
+        # Updates and deletes carry only the _id, so drop everything when the user id is unknown
+        user_cache.invalidate(entity_id)
+        access_scope_cache.invalidate(entity_id)
+    elif collection == "positions":
+        if change["operationType"] == "insert":
+            invalidate_access_scopes(document)
+        else:
+            # Updates and deletes may have removed recruiters we cannot see without pre-images
+            access_scope_cache.invalidate()
+        dashboard_stats_cache.invalidate()
+    elif collection == "clients":
+        access_scope_cache.invalidate()
+        dashboard_stats_cache.invalidate()
+    elif collection == "candidates":
+        # Creates, deletes and status changes move the dashboard and recruiter report numbers
+        dashboard_stats_cache.invalidate()
+        recruiter_report_cache.invalidate()
+
+def reset_all_caches():
+    for cache in (user_cache, access_scope_cache, dashboard_stats_cache, recruiter_report_cache):
+        cache.invalidate()
+
+cache_invalidation_bus = CacheInvalidationBus(
+    db, ["users", "positions", "clients", "candidates"],
+    apply_cache_invalidation, reset_all_caches, CACHE_BUS_CONSUMER_ID
+)
+
+@app.on_event("startup")
+async def start_cache_invalidation_bus():
+    await db.change_stream_tokens.create_index("id", unique=True)
+    # Checkpoints of replicas that no longer exist
+    await db.change_stream_tokens.create_index("updated_at", expireAfterSeconds=7 * 24 * 3600)
+    if CACHE_INVALIDATION_BUS != "off":
+        cache_invalidation_bus.start()
+
+@api_router.get("/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(check_role([UserRole.ADMIN]))):
+    """In-process cache and invalidation bus metrics for this replica"""
+    return {
+        "users": user_cache.stats(),
+        "access_scopes": access_scope_cache.stats(),
+        "dashboard": dashboard_stats_cache.stats(),
+        "recruiter_reports": recruiter_report_cache.stats(),
+        "profile_pdfs": profile_pdf_cache.stats(),
+        "resume_previews": resume_preview_cache.stats(),
+        "invalidation_bus": cache_invalidation_bus.stats()
+    }
+
+def report_loop_stall(stall: dict):
+    event_loop_stalls_total.labels(stall["origin"]).inc()
+    logger.warning("Event loop blocked for %.0f ms by %s at %s\n  %s", stall["duration_ms"], stall["origin"],
+                   stall["site"], "\n  ".join(stall["stack"][-8:]))
+
+loop_watchdog = LoopWatchdog(LOOP_WATCHDOG_THRESHOLD_MS / 1000, app_root=str(ROOT_DIR), on_stall=report_loop_stall)
+
+# Added before the metrics middleware so it ends up innermost, in the task that runs the endpoint
+if LOOP_WATCHDOG_ENABLED:
+    app.add_middleware(TaskScopeMiddleware, watchdog=loop_watchdog)
+
+@app.on_event("startup")
+async def start_loop_watchdog():
+    if LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+
+@api_router.get("/debug/loop-stalls")
+async def get_loop_stalls(limit: int = 20, current_user: dict = Depends(check_role([UserRole.ADMIN]))):
+    """Worst event loop stalls on this worker, by total blocked time"""
+    return {
+        "enabled": loop_watchdog.running,
+        "threshold_ms": LOOP_WATCHDOG_THRESHOLD_MS,
+        "stalls": loop_watchdog.stalls,
+        "offenders": loop_watchdog.report(limit)
+    }
+
+@api_router.delete("/debug/loop-stalls")
+async def reset_loop_stalls(current_user: dict = Depends(check_role([UserRole.ADMIN]))):
+    loop_watchdog.reset()
+    return {"message": "Loop stall report cleared"}
+
+profile_lock = asyncio.Lock()
+
+@api_router.post("/debug/profile")
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = 5,
+    memory: bool = True,
+    limit: int = 30,
+    current_user: dict = Depends(check_role([UserRole.ADMIN]))
+):
+    """Sample CPU stacks and allocations on this worker for a while and return the hotspots"""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    async with profile_lock:
+        profiler = Profiler(interval_ms / 1000, memory=memory)
+        # Starting tracemalloc and the first snapshot walk every traced block; keep that off the loop
+        await asyncio.to_thread(profiler.start, threading.get_ident())
+        logger.info(f"Profiling worker for {seconds:g}s, requested by user {current_user['id']}")
+        await asyncio.sleep(seconds)
+        report = await asyncio.to_thread(profiler.stop, max(1, min(limit, 200)))
+    return {"pid": os.getpid(), **report}
+
+app.add_middleware(RequestMetricsMiddleware, histogram=http_request_seconds, counter=http_requests_total)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint for this worker; serves gauges as last refreshed, without queries"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+async def refresh_queue_depth_gauges():
+    """Count pending outbox messages and running PDF batches into background_queue_depth"""
+    pipeline = [
+        {"$match": {"status": {"$in": ["queued", "sending"]}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]
+    depths = {row["_id"]: row["count"] async for row in db.email_outbox.aggregate(pipeline)}
+    for status_value in ("queued", "sending"):
+        background_queue_depth.labels(f"email_outbox_{status_value}").set(depths.get(status_value, 0))
+    background_queue_depth.labels("pdf_batch_running").set(
+        await db.pdf_batch_jobs.count_documents({"status": "running"}))
+
+class QueueDepthRefresher:
+    """Refreshes the queue depth gauges on an interval, so scrape frequency adds no database load"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await refresh_queue_depth_gauges()
+            except Exception as e:
+                logger.warning(f"Queue depth gauges not refreshed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+queue_depth_refresher = QueueDepthRefresher(METRICS_QUEUE_DEPTH_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_queue_depth_refresher():
+    if METRICS_QUEUE_DEPTH_INTERVAL_SECONDS > 0:
+        queue_depth_refresher.start()
+
+# Added after the metrics middleware, so it is outermost and its span covers the whole request
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+loop_lag_monitor = LoopLagMonitor(event_loop_lag_seconds, event_loop_lag_last_seconds, METRICS_LOOP_LAG_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    if METRICS_LOOP_LAG_INTERVAL_SECONDS > 0:
+        loop_lag_monitor.start()
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -1405,6 +3885,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "traceparent"],
 )
 
 # Configure logging
@@ -1416,4 +3897,12 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await loop_lag_monitor.stop()
+    await queue_depth_refresher.stop()
+    await loop_watchdog.stop()
+    await asyncio.to_thread(tracer.shutdown)
+    await cache_invalidation_bus.stop()
+    await email_outbox_worker.stop()
+    await asyncio.to_thread(smtp_pool.close_all)
+    await file_storage.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Stand-in OTLP/HTTP trace collector and trace viewer for local debugging.
+
+`serve` accepts OTLP/JSON posts on /v1/traces (what TRACE_EXPORTER=otlp sends) and appends them
+to a JSON-lines file, the same format TRACE_EXPORTER=file writes. `show` prints a trace as an
+indented span tree with durations, or the slowest traces when no trace id is given.
+
+Usage:
+    python trace_collector.py serve [--port 4318] [--file traces/spans.jsonl]
+    python trace_collector.py show [TRACE_ID] [--file traces/spans.jsonl] [--slowest 10]
+"""
+import argparse
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_FILE = Path(__file__).parent / 'traces' / 'spans.jsonl'
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/traces":
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_error(400, "Expected OTLP/JSON")
+            return
+        with self.server.lock, open(self.server.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        self.server.received += sum(len(scope["spans"]) for resource in payload.get("resourceSpans", [])
+                                    for scope in resource.get("scopeSpans", []))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CollectorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, output: Path):
+        super().__init__(address, CollectorHandler)
+        self.output = output
+        self.lock = threading.Lock()
+        self.received = 0
+
+
+def load_spans(path: Path) -> List[dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    spans.extend(scope["spans"])
+    return spans
+
+
+def duration_ms(span: dict) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def span_tree(spans: List[dict]) -> List[str]:
+    """Indented lines: offset from trace start, duration and name, children under their parent"""
+    by_id = {span["spanId"]: span for span in spans}
+    children: Dict[str, List[dict]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        parent = span.get("parentSpanId")
+        (children[parent] if parent in by_id else roots).append(span)
+    start = min(int(span["startTimeUnixNano"]) for span in spans)
+    lines = []
+
+    def walk(span: dict, depth: int):
+        offset = (int(span["startTimeUnixNano"]) - start) / 1e6
+        error = "  ERROR " + span["status"].get("message", "") if span.get("status", {}).get("code") == 2 else ""
+        lines.append(f"{offset:>9.1f} {duration_ms(span):>9.1f}  {'  ' * depth}{span['name']}{error}")
+        for child in sorted(children[span["spanId"]], key=lambda s: int(s["startTimeUnixNano"])):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: int(s["startTimeUnixNano"])):
+        walk(root, 0)
+    return lines
+
+
+def show(path: Path, trace_id: str, slowest: int):
+    spans = load_spans(path)
+    if trace_id:
+        trace = [span for span in spans if span["traceId"] == trace_id]
+        if not trace:
+            raise SystemExit(f"Trace {trace_id} not found in {path}")
+        print(f"{'start ms':>9} {'dur ms':>9}  span")
+        print("\n".join(span_tree(trace)))
+        return
+    roots = [span for span in spans if not span.get("parentSpanId") or span.get("kind") == 2]
+    for span in sorted(roots, key=duration_ms, reverse=True)[:slowest]:
+        print(f"{duration_ms(span):>9.1f} ms  {span['traceId']}  {span['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="receive OTLP/JSON on /v1/traces")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=4318)
+    serve_parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    show_parser = commands.add_parser("show", help="print a trace tree or the slowest traces")
+    show_parser.add_argument("trace_id", nargs="?")
+    show_parser.add_argument("--file", type=Path, default=DEFAULT_FILE)
+    show_parser.add_argument("--slowest", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        show(args.file, args.trace_id, args.slowest)
+        return
+    args.file.parent.mkdir(parents=True, exist_ok=True)
+    server = CollectorServer((args.host, args.port), args.file)
+    print(f"Collecting OTLP/JSON on http://{args.host}:{args.port}/v1/traces into {args.file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Received {server.received} spans")
+
+
+if __name__ == "__main__":
+    main()
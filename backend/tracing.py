@@ -0,0 +1,351 @@
+"""
+Lightweight request tracing with OTLP/JSON export.
+
+The current span lives in a contextvar, so it follows a request into tasks, asyncio.to_thread
+work and Motor's executor threads (Motor copies the caller's context), and child spans nest
+without being passed around. Ended spans are queued and exported in batches from a background
+thread, either as OTLP/JSON lines to a file or posted to an OTLP/HTTP collector's /v1/traces.
+Unsampled requests still get trace ids for correlation but record no child spans.
+"""
+import collections
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT, KIND_CONSUMER = 1, 2, 3, 5
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header"""
+    match = TRACEPARENT_PATTERN.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled", "attributes",
+                 "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 kind: int = KIND_INTERNAL, attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.status_message} if self.status_message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_request(spans: List[dict], service_name: str) -> dict:
+    """ExportTraceServiceRequest body in OTLP/JSON"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [otlp_attribute("service.name", service_name)]},
+        "scopeSpans": [{"scope": {"name": "recruithub.tracing"}, "spans": spans}]
+    }]}
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON export request per batch as a line of JSON"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+
+    def export(self, spans: List[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(otlp_request(spans, self.service_name), separators=(",", ":")) + "\n")
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON to a collector's /v1/traces"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[dict]):
+        body = json.dumps(otlp_request(spans, self.service_name)).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """Creates spans and exports ended, sampled ones from a background thread"""
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0, max_queue: int = 10000,
+                 batch_size: int = 512, flush_seconds: float = 2.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.exported = 0
+        self.dropped = 0
+        self.failed_exports = 0
+        self._queue: collections.deque = collections.deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_root(self, name: str, traceparent: Optional[str] = None, attributes: Optional[dict] = None,
+                   kind: int = KIND_SERVER) -> Span:
+        """Span for an incoming request or background job, continuing the caller's trace when given a traceparent"""
+        parent = parse_traceparent(traceparent)
+        if parent:
+            # A caller's sampled flag is honoured only within our own rate, so it cannot force tracing on
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = new_trace_id(), None, True
+        sampled = sampled and self.enabled and self.within_sample_rate(trace_id)
+        return Span(name, trace_id, parent_id, sampled, kind, attributes)
+
+    def within_sample_rate(self, trace_id: str) -> bool:
+        """Decided from the trace id's low 64 bits, so replicas with the same rate agree on a trace"""
+        return int(trace_id[16:], 16) < self.sample_rate * (1 << 64)
+
+    def start_child(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[dict] = None) -> Optional[Span]:
+        """Child of the current span, or None outside a sampled trace"""
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, True, kind, attributes)
+
+    @contextmanager
+    def activate(self, span: Span):
+        """Make span current for the block, mark it failed on exceptions and end it"""
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end(span)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes):
+        """Child span of the current one; a no-op yielding None outside a sampled trace"""
+        child = self.start_child(name, kind, attributes)
+        if child is None:
+            yield None
+            return
+        with self.activate(child):
+            yield child
+
+    def traced(self, name: str, kind: int = KIND_INTERNAL):
+        """Decorator running a synchronous function inside a child span"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, kind):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def end(self, span: Span):
+        span.end_ns = time.time_ns()
+        if not span.sampled or self.exporter is None:
+            return
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if self._thread is None:
+            self._start_thread()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft().to_otlp())
+            try:
+                self.exporter.export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed_exports += 1
+                logger.warning(f"Span export failed, dropped {len(batch)} spans: {e}")
+
+    def shutdown(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self.exporter is not None:
+            self.flush()
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "queued": len(self._queue),
+                "exported": self.exported, "dropped": self.dropped, "failed_exports": self.failed_exports}
+
+
+def create_exporter(kind: str, service_name: str, file_path: str, otlp_endpoint: str):
+    """Exporter for TRACE_EXPORTER: none, file or otlp"""
+    if kind in ("", "none", "off"):
+        return None
+    if kind == "file":
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        return FileSpanExporter(file_path, service_name)
+    if kind == "otlp":
+        return OTLPHttpExporter(otlp_endpoint, service_name)
+    raise RuntimeError(f"Unknown TRACE_EXPORTER: {kind}")
+
+
+class MongoCommandTracing(monitoring.CommandListener):
+    """PyMongo command listener adding a client span per command under the request's span"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._open: Dict[tuple, Span] = {}
+
+    def started(self, event):
+        span = self.tracer.start_child(f"mongodb.{event.command_name}", KIND_CLIENT, {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name,
+        })
+        if span is None:
+            return
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            span.attributes["db.mongodb.collection"] = collection
+        self._open[(event.request_id, event.connection_id)] = span
+
+    def succeeded(self, event):
+        span = self._open.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            self.tracer.end(span)
+
+    def failed(self, event):
+        span = self._open.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            span.status = STATUS_ERROR
+            span.status_message = str(event.failure.get("errmsg", ""))[:500] if isinstance(event.failure, dict) else ""
+            self.tracer.end(span)
+
+
+class TracingMiddleware:
+    """Opens a server span per HTTP request and returns its ids in X-Trace-Id / traceparent.
+
+    Plain ASGI, so the span is current in the task that runs the endpoint and response
+    messages pass through untouched.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+        traceparent = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"traceparent"), None)
+        span = self.tracer.start_root(f"{method} {path}", traceparent, {"http.method": method, "http.target": path})
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-trace-id", span.trace_id.encode()),
+                                                  (b"traceparent", span.traceparent.encode())]}
+            await send(message)
+
+        with self.tracer.activate(span):
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{method} {route.path}"
+                    span.attributes["http.route"] = route.path
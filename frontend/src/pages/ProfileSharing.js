@@ -22,6 +22,7 @@ const ProfileSharing = () => {
   const [showEmailDialog, setShowEmailDialog] = useState(false);
   const [showPdfDialog, setShowPdfDialog] = useState(false);
   const [pdfBase64, setPdfBase64] = useState('');
+  const [attachmentId, setAttachmentId] = useState('');
   const [emailData, setEmailData] = useState({
     to: '',
     subject: '',
@@ -79,6 +80,7 @@ const ProfileSharing = () => {
         getAuthHeader()
       );
       setPdfBase64(response.data.pdf_base64);
+      setAttachmentId(response.data.attachment_id);
       setShowPdfDialog(true);
       toast.success('PDF generated successfully!');
     } catch (error) {
@@ -93,13 +95,13 @@ const ProfileSharing = () => {
     }
 
     try {
-      // First generate PDF
+      // First generate PDF (kept server-side and attached by id)
       const pdfResponse = await axios.post(
-        `${API_URL}/candidates/generate-pdf`,
+        `${API_URL}/candidates/generate-pdf?include_base64=false`,
         selectedCandidates,
         getAuthHeader()
       );
-      setPdfBase64(pdfResponse.data.pdf_base64);
+      setAttachmentId(pdfResponse.data.attachment_id);
       
       // Get client emails
       const selectedCandidateData = candidates.filter(c => selectedCandidates.includes(c.id));
@@ -136,15 +138,15 @@ const ProfileSharing = () => {
           subject: emailData.subject,
           body: emailData.body,
           candidate_ids: selectedCandidates,
-          attachment_base64: pdfBase64,
-          attachment_filename: `candidates_${new Date().getTime()}.pdf`
+          attachment_ids: attachmentId ? [attachmentId] : []
         },
         getAuthHeader()
       );
-      toast.success('Email sent successfully! Profiles marked as shared.');
+      toast.success('Email queued for delivery! Profiles will be marked as shared once sent.');
       setShowEmailDialog(false);
       setSelectedCandidates([]);
       setPdfBase64('');
+      setAttachmentId('');
       fetchCandidates();
     } catch (error) {
       if (error.response?.status === 400 && error.response?.data?.detail?.includes('not configured')) {
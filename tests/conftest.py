@@ -0,0 +1,11 @@
+"""
+Shared test setup: in-process tests import backend/server.py with the in-memory storage backend
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'recruitment_test')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
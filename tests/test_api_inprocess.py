@@ -0,0 +1,851 @@
+"""
+In-process API tests for RecruitHub
+Runs the FastAPI app through an ASGI test client on the in-memory storage backend (no MongoDB needed)
+"""
+import asyncio
+import base64
+import io
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from file_storage import LocalFileStorage
+
+ADMIN_EMAIL = "admin@recruitment.com"
+ADMIN_PASSWORD = "Admin@123"
+
+
+@pytest.fixture(scope="module")
+def api():
+    """Test client over the in-memory database; startup hooks seed the default admin"""
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def auth_headers(api):
+    response = api.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def position(api, auth_headers):
+    client_response = api.post("/api/clients", headers=auth_headers, json=client_payload("Acme Corp"))
+    assert client_response.status_code == 200, client_response.text
+    response = api.post("/api/positions", headers=auth_headers, json=position_payload(client_response.json()["id"]))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def recruiter(api, auth_headers):
+    """A recruiter account and its auth headers"""
+    response = api.post("/api/auth/register", headers=auth_headers, json={
+        "email": "recruiter.one@recruitment.com", "password": "Recruit@123", "name": "Recruiter One", "role": "recruiter"
+    })
+    assert response.status_code == 200, response.text
+    login = api.post("/api/auth/login", json={"email": "recruiter.one@recruitment.com", "password": "Recruit@123"})
+    return {"id": login.json()["user"]["id"], "headers": {"Authorization": f"Bearer {login.json()['token']}"}}
+
+
+def client_payload(name: str) -> dict:
+    return {
+        "client_name": name,
+        "industry": "Manufacturing",
+        "organization_type": "Private",
+        "headquarter_location": "Pune",
+        "core_business": "Industrial equipment"
+    }
+
+
+def position_payload(client_id: str, **overrides) -> dict:
+    payload = {
+        "client_id": client_id,
+        "job_title": "Backend Engineer",
+        "department": "Engineering",
+        "num_openings": 2,
+        "reason_for_hiring": "Expansion",
+        "location": "Pune",
+        "work_mode": "hybrid",
+        "working_days": "Mon-Fri",
+        "qualification": "B.Tech",
+        "experience": "3-5 years"
+    }
+    payload.update(overrides)
+    return payload
+
+
+def candidate_payload(position_id: str, name: str) -> dict:
+    return {
+        "name": name,
+        "email": f"{name.lower().replace(' ', '.')}@example.com",
+        "contact_number": "9876543210",
+        "qualification": "B.Tech",
+        "industry_sector": "IT",
+        "current_designation": "Software Engineer",
+        "department": "Engineering",
+        "current_location": "Pune",
+        "current_ctc": 12.0,
+        "years_of_experience": 4,
+        "expected_ctc": 16.0,
+        "notice_period": "30 days",
+        "position_id": position_id
+    }
+
+
+class TestInProcessAuth:
+    """Authentication against the in-memory backend"""
+
+    def test_default_admin_login(self, api):
+        """Test that the startup hook seeded the default admin"""
+        response = api.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        assert response.status_code == 200
+        assert response.json()["user"]["role"] == "admin"
+
+    def test_unauthenticated_request_rejected(self, api):
+        """Test that protected routes require a token"""
+        assert api.get("/api/candidates").status_code in (401, 403)
+
+
+class TestInProcessCandidates:
+    """Candidate lifecycle through the whole handler stack"""
+
+    def test_create_search_and_shortlist(self, api, auth_headers, position):
+        """Test that status changes flow into the rollup counters"""
+        created = api.post("/api/candidates", headers=auth_headers,
+                           json=candidate_payload(position["id"], "Priya Sharma"))
+        assert created.status_code == 200, created.text
+        candidate_id = created.json()["id"]
+
+        search = api.post("/api/candidates/search", headers=auth_headers, json={"keywords": "priya"})
+        assert [c["id"] for c in search.json()] == [candidate_id]
+
+        action = api.post(f"/api/candidates/{candidate_id}/action", headers=auth_headers,
+                          json={"candidate_id": candidate_id, "action": "shortlist"})
+        assert action.status_code == 200, action.text
+
+        counters = api.get("/api/pipeline/counters", headers=auth_headers,
+                           params={"scope": "position", "scope_id": position["id"]})
+        assert counters.status_code == 200, counters.text
+        assert counters.json()[0]["counts"]["shortlisted"] == 1
+
+    def test_delete_candidate(self, api, auth_headers, position):
+        """Test that a deleted candidate is no longer returned"""
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Rahul Verma")).json()["id"]
+
+        assert api.delete(f"/api/candidates/{candidate_id}", headers=auth_headers).status_code == 200
+        assert api.get(f"/api/candidates/{candidate_id}", headers=auth_headers).status_code == 404
+
+    def test_created_date_range(self, api, auth_headers, position):
+        """Test that the candidate list filters on native created_at datetimes"""
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Anita Desai")).json()["id"]
+        # Stored timestamps have millisecond precision, so take the bound from the stored document
+        created = api.get(f"/api/candidates/{candidate_id}", headers=auth_headers).json()
+
+        recent = api.get("/api/candidates", headers=auth_headers, params={"created_from": created["created_at"]})
+        assert created["id"] in [c["id"] for c in recent.json()]
+
+        future = api.get("/api/candidates", headers=auth_headers, params={"created_from": "2999-01-01T00:00:00Z"})
+        assert future.json() == []
+
+        inverted = api.get("/api/candidates", headers=auth_headers,
+                           params={"created_from": "2999-01-01T00:00:00Z", "created_to": "2000-01-01T00:00:00Z"})
+        assert inverted.status_code == 400
+
+    def test_dashboard_stats(self, api, auth_headers, position):
+        """Test that dashboard aggregations run on the in-memory backend"""
+        server.dashboard_stats_cache.invalidate()
+        response = api.get("/api/dashboard/stats", headers=auth_headers)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["total_positions"] == 1
+        assert data["open_positions"] == 1
+
+
+class TestInProcessInterviews:
+    """Interview calendar and conflict detection"""
+
+    @pytest.fixture(scope="class")
+    def candidate_id(self, api, auth_headers, position):
+        return api.post("/api/candidates", headers=auth_headers,
+                        json=candidate_payload(position["id"], "Kiran Rao")).json()["id"]
+
+    def schedule(self, api, auth_headers, position, candidate_id, when, minutes=60):
+        return api.post("/api/interviews", headers=auth_headers, json={
+            "candidate_id": candidate_id,
+            "position_id": position["id"],
+            "interview_mode": "online",
+            "interview_date": when,
+            "duration_minutes": minutes
+        })
+
+    def test_overlapping_interview_rejected(self, api, auth_headers, position, candidate_id):
+        """Test that a second interview overlapping the first returns 409 with the conflict"""
+        first = self.schedule(api, auth_headers, position, candidate_id, "2030-03-04T10:00:00Z", 90)
+        assert first.status_code == 200, first.text
+
+        clash = self.schedule(api, auth_headers, position, candidate_id, "2030-03-04T11:00:00Z")
+        assert clash.status_code == 409
+        assert clash.json()["detail"]["conflicts"][0]["id"] == first.json()["id"]
+
+        back_to_back = self.schedule(api, auth_headers, position, candidate_id, "2030-03-04T11:30:00Z")
+        assert back_to_back.status_code == 200, back_to_back.text
+
+    def test_interviewer_double_booking_rejected(self, api, auth_headers, position, candidate_id):
+        """Test that one interviewer cannot be booked for two candidates at once"""
+        other_id = api.post("/api/candidates", headers=auth_headers,
+                            json=candidate_payload(position["id"], "Leela Menon")).json()["id"]
+        first = self.schedule(api, auth_headers, position, candidate_id, "2030-05-06T10:00:00Z")
+        assert first.status_code == 200, first.text
+
+        clash = self.schedule(api, auth_headers, position, other_id, "2030-05-06T10:30:00Z")
+        assert clash.status_code == 409
+        assert clash.json()["detail"]["message"].startswith("Interviewer")
+        assert clash.json()["detail"]["conflicts"][0]["id"] == first.json()["id"]
+
+    def test_racing_insert_withdrawn(self, api, auth_headers, position, candidate_id, monkeypatch):
+        """Test that of two requests passing the check together, the later-created interview is removed"""
+        original = server.interview_slot_conflicts
+        competitor = {}
+
+        async def racing_check(interview):
+            if not competitor:
+                # Another request inserts an earlier-created interview for the same slot meanwhile
+                competitor.update({**interview.model_dump(), "id": "racing-interview",
+                                   "created_at": interview.created_at - timedelta(milliseconds=1)})
+                await server.db.interviews.insert_one(dict(competitor))
+                return []
+            return await original(interview)
+
+        monkeypatch.setattr(server, "interview_slot_conflicts", racing_check)
+        response = self.schedule(api, auth_headers, position, candidate_id, "2030-06-03T10:00:00Z")
+        assert response.status_code == 409
+        assert response.json()["detail"]["conflicts"][0]["id"] == "racing-interview"
+
+        stored = asyncio.run(server.db.interviews.count_documents({"interview_date": competitor["interview_date"]}))
+        assert stored == 1
+
+    def test_calendar_window(self, api, auth_headers, position, candidate_id):
+        """Test that the calendar returns interviews starting inside the window, in order"""
+        response = api.get("/api/interviews/calendar", headers=auth_headers, params={
+            "start": "2030-03-04T00:00:00Z", "end": "2030-03-05T00:00:00Z", "candidate_id": candidate_id
+        })
+        assert response.status_code == 200, response.text
+        dates = [i["interview_date"] for i in response.json()]
+        assert len(dates) == 2
+        assert dates == sorted(dates)
+
+        too_wide = api.get("/api/interviews/calendar", headers=auth_headers, params={
+            "start": "2030-01-01T00:00:00Z", "end": "2031-01-01T00:00:00Z"
+        })
+        assert too_wide.status_code == 400
+
+
+class TestInProcessScoping:
+    """Role-scoped listings"""
+
+    def test_recruiter_sees_only_assigned_clients(self, api, auth_headers, position, recruiter):
+        """Test that a recruiter's client list comes from their assigned positions"""
+        assigned_client = api.post("/api/clients", headers=auth_headers, json=client_payload("Globex")).json()
+        for _ in range(2):
+            created = api.post("/api/positions", headers=auth_headers,
+                               json=position_payload(assigned_client["id"], assigned_recruiters=[recruiter["id"]]))
+            assert created.status_code == 200, created.text
+
+        clients = api.get("/api/clients", headers=recruiter["headers"])
+        assert clients.status_code == 200, clients.text
+        assert [c["id"] for c in clients.json()] == [assigned_client["id"]]
+
+    def test_scope_follows_assignment_changes(self, api, auth_headers, recruiter):
+        """Test that reassigning a position evicts the recruiter's cached scope"""
+        other_client = api.post("/api/clients", headers=auth_headers, json=client_payload("Initech")).json()
+        created = api.post("/api/positions", headers=auth_headers,
+                           json=position_payload(other_client["id"], assigned_recruiters=[recruiter["id"]])).json()
+        visible = [c["id"] for c in api.get("/api/clients", headers=recruiter["headers"]).json()]
+        assert other_client["id"] in visible
+
+        updated = api.put(f"/api/positions/{created['id']}", headers=auth_headers,
+                          json=position_payload(other_client["id"], assigned_recruiters=[]))
+        assert updated.status_code == 200, updated.text
+        assert updated.json()["assigned_recruiters"] == []
+
+        visible = [c["id"] for c in api.get("/api/clients", headers=recruiter["headers"]).json()]
+        assert other_client["id"] not in visible
+
+    def test_scoped_listing_cached_until_client_changes(self, api, auth_headers, recruiter, monkeypatch):
+        """Test that a cached scope serves client listings without a clients query until a client is edited"""
+        client = api.post("/api/clients", headers=auth_headers, json=client_payload("Umbrella")).json()
+        api.post("/api/positions", headers=auth_headers,
+                 json=position_payload(client["id"], assigned_recruiters=[recruiter["id"]]))
+        api.get("/api/clients", headers=recruiter["headers"])
+
+        clients = server.db.clients
+        finds = []
+        original = clients.find
+        monkeypatch.setattr(clients, "find", lambda *args, **kwargs: finds.append(args) or original(*args, **kwargs))
+        listed = {c["id"]: c for c in api.get("/api/clients", headers=recruiter["headers"]).json()}
+        assert listed[client["id"]]["client_name"] == "Umbrella"
+        assert finds == []
+
+        renamed = api.put(f"/api/clients/{client['id']}", headers=auth_headers, json=client_payload("Umbrella Group"))
+        assert renamed.status_code == 200, renamed.text
+        listed = {c["id"]: c for c in api.get("/api/clients", headers=recruiter["headers"]).json()}
+        assert listed[client["id"]]["client_name"] == "Umbrella Group"
+
+    def test_dashboard_counts_scoped_to_recruiter(self, api, auth_headers, position, recruiter):
+        """Test that a recruiter's dashboard counts only candidates and interviews of their positions"""
+        assigned_client = api.post("/api/clients", headers=auth_headers, json=client_payload("Hooli")).json()
+        assigned = api.post("/api/positions", headers=auth_headers,
+                            json=position_payload(assigned_client["id"], assigned_recruiters=[recruiter["id"]])).json()
+        for target in (assigned, position):
+            candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                    json=candidate_payload(target["id"], "Dana Scully")).json()["id"]
+            asyncio.run(server.set_candidates_status({"id": candidate_id}, "selected"))
+            asyncio.run(server.db.interviews.insert_one({
+                "id": f"dashboard-{target['id']}", "candidate_id": candidate_id, "position_id": target["id"]
+            }))
+        server.dashboard_stats_cache.invalidate()
+
+        mine = api.get("/api/dashboard/stats", headers=recruiter["headers"]).json()
+        assert mine["candidates_selected"] == 1
+        assert mine["interviews_scheduled"] == 1
+        everyone = api.get("/api/dashboard/stats", headers=auth_headers).json()
+        assert everyone["candidates_selected"] >= 2
+        assert everyone["interviews_scheduled"] >= 2
+
+
+class TestInProcessMetrics:
+    """Prometheus scrape endpoint"""
+
+    def test_route_latency_by_template(self, api, auth_headers, position):
+        """Test that requests are labelled by route template rather than raw path"""
+        assert api.get(f"/api/positions/{position['id']}", headers=auth_headers).status_code == 200
+
+        response = api.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'http_requests_total{method="GET",route="/api/positions/{position_id}",status="200"}' in text
+        assert position["id"] not in text
+        assert 'background_queue_depth{queue="email_outbox_queued"} 0' in text
+        assert 'executor_queue_depth{executor="anyio"}' in text
+
+    def test_scrape_serves_refreshed_queue_depth_without_queries(self, api, monkeypatch):
+        """Test that scrapes render the last refreshed queue depth instead of counting in MongoDB"""
+        asyncio.run(server.db.email_outbox.insert_one({"id": "depth-probe", "status": "queued"}))
+        try:
+            asyncio.run(server.refresh_queue_depth_gauges())
+
+            async def fail(*args, **kwargs):
+                raise AssertionError("scrape queried MongoDB")
+
+            monkeypatch.setattr(server.db.email_outbox, "count_documents", fail)
+            monkeypatch.setattr(server.db.email_outbox, "aggregate", fail)
+            monkeypatch.setattr(server.db.pdf_batch_jobs, "count_documents", fail)
+            for _ in range(3):
+                text = api.get("/metrics").text
+                assert 'background_queue_depth{queue="email_outbox_queued"} 1' in text
+        finally:
+            monkeypatch.undo()
+            asyncio.run(server.db.email_outbox.delete_one({"id": "depth-probe"}))
+            asyncio.run(server.refresh_queue_depth_gauges())
+
+    def test_loop_stall_report_requires_opt_in(self, api, auth_headers):
+        """Test that the stall report is admin-only and reports the watchdog as off by default"""
+        assert api.get("/api/debug/loop-stalls").status_code in (401, 403)
+
+        response = api.get("/api/debug/loop-stalls", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["enabled"] is False
+        assert response.json()["offenders"] == []
+
+
+class TestInProcessTracing:
+    """Trace id propagation"""
+
+    def test_trace_id_returned(self, api):
+        """Test that every response names its trace and continues an incoming traceparent"""
+        fresh = api.get("/api/")
+        assert len(fresh.headers["X-Trace-Id"]) == 32
+
+        incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        continued = api.get("/api/", headers={"traceparent": incoming})
+        assert continued.headers["X-Trace-Id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert continued.headers["traceparent"].startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+
+class TestInProcessProfiling:
+    """On-demand worker profile"""
+
+    def test_profile_is_admin_only_and_bounded(self, api, auth_headers):
+        """Test that the profile endpoint rejects non-admins and out-of-range windows"""
+        assert api.post("/api/debug/profile").status_code in (401, 403)
+        response = api.post("/api/debug/profile?seconds=3600", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_profile_returns_hotspots(self, api, auth_headers):
+        """Test that a short profile returns sampled threads, functions and allocation sites"""
+        response = api.post("/api/debug/profile?seconds=0.3&interval_ms=2", headers=auth_headers)
+        assert response.status_code == 200
+        report = response.json()
+        assert report["samples"] > 0
+        assert {"threads", "functions", "stacks"} <= report.keys()
+        assert report["memory"]["traced_peak_bytes"] > 0
+
+
+class TestInProcessFileStorage:
+    """Uploads go through the configured file storage"""
+
+    def test_resume_upload_stored(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that an uploaded resume lands in file storage under a sanitized name"""
+        storage = LocalFileStorage(tmp_path)
+        monkeypatch.setattr(server, "file_storage", storage)
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Nisha Verma")).json()["id"]
+
+        response = api.post(f"/api/candidates/{candidate_id}/upload-resume", headers=auth_headers,
+                            files={"file": ("../../cv.pdf", b"%PDF-1.4 resume", "application/pdf")})
+        assert response.status_code == 200, response.text
+        filename = response.json()["filename"]
+        assert filename == f"{candidate_id}_cv.pdf"
+        assert (tmp_path / "resumes" / filename).read_bytes() == b"%PDF-1.4 resume"
+        assert api.get(f"/api/candidates/{candidate_id}", headers=auth_headers).json()["resume_file"] == filename
+
+    def test_resume_download_ranges_and_revalidation(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that downloads honour Range and answer a matching If-None-Match with 304"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Ravi Menon")).json()["id"]
+        content = b"%PDF-1.4 " + bytes(range(256)) * 40
+        api.post(f"/api/candidates/{candidate_id}/upload-resume", headers=auth_headers,
+                 files={"file": ("cv.pdf", content, "application/pdf")})
+        url = f"/api/candidates/{candidate_id}/resume"
+
+        full = api.get(url, headers=auth_headers)
+        assert full.status_code == 200
+        assert full.content == content
+        assert full.headers["content-type"] == "application/pdf"
+        assert full.headers["content-disposition"] == 'inline; filename="cv.pdf"'
+        assert full.headers["accept-ranges"] == "bytes"
+        etag = full.headers["etag"]
+
+        cached = api.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        partial = api.get(url, headers={**auth_headers, "Range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert partial.content == content[100:200]
+        assert partial.headers["content-range"] == f"bytes 100-199/{len(content)}"
+
+        stale = api.get(url, headers={**auth_headers, "Range": "bytes=100-199", "If-Range": '"old"'})
+        assert stale.status_code == 200
+        assert stale.content == content
+
+        beyond = api.get(url, headers={**auth_headers, "Range": f"bytes={len(content)}-"})
+        assert beyond.status_code == 416
+        assert beyond.headers["content-range"] == f"bytes */{len(content)}"
+
+        head = api.head(url, headers=auth_headers)
+        assert head.status_code == 200
+        assert head.headers["content-length"] == str(len(content))
+
+    def test_download_without_file(self, api, auth_headers, position):
+        """Test that a JD download for a position without one returns 404"""
+        assert api.get(f"/api/positions/{position['id']}/jd", headers=auth_headers).status_code == 404
+
+    def test_resume_preview_extracted_once_per_content(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that previews are extracted once, reused for identical files and revalidated with 304"""
+        from docx import Document
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        extractions = []
+        extract = server.extract_preview_text
+        monkeypatch.setattr(server, "extract_preview_text", lambda *args: extractions.append(args) or extract(*args))
+
+        document = Document()
+        for line in ("Asha Kulkarni", "asha.kulkarni@example.com", "", "Skills: <Python> & Go"):
+            document.add_paragraph(line)
+        buffer = io.BytesIO()
+        document.save(buffer)
+
+        candidate_ids = []
+        for name in ("Asha Kulkarni", "Asha Duplicate"):
+            candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                    json=candidate_payload(position["id"], name)).json()["id"]
+            api.post(f"/api/candidates/{candidate_id}/upload-resume", headers=auth_headers,
+                     files={"file": ("resume.docx", buffer.getvalue(), "application/octet-stream")})
+            candidate_ids.append(candidate_id)
+
+        url = f"/api/candidates/{candidate_ids[0]}/resume/preview"
+        text = api.get(url, headers=auth_headers)
+        assert text.status_code == 200, text.text
+        assert text.headers["content-type"].startswith("text/plain")
+        assert "asha.kulkarni@example.com" in text.text
+
+        page = api.get(url, params={"format": "html"}, headers=auth_headers)
+        assert page.headers["content-type"].startswith("text/html")
+        assert "Skills: &lt;Python&gt; &amp; Go" in page.text
+
+        duplicate = api.get(f"/api/candidates/{candidate_ids[1]}/resume/preview", headers=auth_headers)
+        assert duplicate.text == text.text
+        assert len(extractions) == 1
+
+        revalidated = api.get(url, headers={**auth_headers, "If-None-Match": text.headers["etag"]})
+        assert revalidated.status_code == 304
+
+    def test_resume_preview_without_text_not_persisted(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that a resume with no extractable text gets 422 and is only cached in-process"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        extractions = []
+        monkeypatch.setattr(server, "extract_preview_text", lambda *args: extractions.append(args) or " \n")
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Scanned Resume")).json()["id"]
+        api.post(f"/api/candidates/{candidate_id}/upload-resume", headers=auth_headers,
+                 files={"file": ("scan.pdf", b"%PDF-1.4 scanned image only", "application/pdf")})
+
+        url = f"/api/candidates/{candidate_id}/resume/preview"
+        assert api.get(url, headers=auth_headers).status_code == 422
+        assert api.get(url, headers=auth_headers).status_code == 422
+        assert len(extractions) == 1
+
+        async def persisted():
+            return await server.db.resume_previews.count_documents({"text": {"$regex": "^\\s*$"}})
+
+        assert asyncio.run(persisted()) == 0
+
+    def test_oversized_resume_rejected_before_reading(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that a resume over the preview limit is refused from its stored size without streaming it"""
+        storage = LocalFileStorage(tmp_path)
+        monkeypatch.setattr(server, "file_storage", storage)
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Large Resume")).json()["id"]
+        api.post(f"/api/candidates/{candidate_id}/upload-resume", headers=auth_headers,
+                 files={"file": ("large.pdf", b"%PDF-1.4 " + b"x" * 2048, "application/pdf")})
+        monkeypatch.setattr(server, "RESUME_PREVIEW_MAX_BYTES", 1024)
+        monkeypatch.setattr(storage, "open", lambda *args: pytest.fail("resume was streamed"))
+
+        response = api.get(f"/api/candidates/{candidate_id}/resume/preview", headers=auth_headers)
+        assert response.status_code == 413
+
+
+class TestInProcessAttachments:
+    """Generated attachments live in file storage and belong to their creator"""
+
+    def test_generated_pdf_stored_and_downloadable(self, api, auth_headers, position, tmp_path, monkeypatch):
+        """Test that a generated PDF is rendered off the loop, kept in file storage and served back to its creator"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        monkeypatch.setattr(server, "profile_pdf_cache", server.ProfilePdfCache(tmp_path / "pdf_cache", 8, 1 << 24))
+        render = server.render_candidate_profiles_pdf
+        loops = []
+
+        def record_loop(candidates):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return render(candidates)
+
+        monkeypatch.setattr(server, "render_candidate_profiles_pdf", record_loop)
+        candidate_id = api.post("/api/candidates", headers=auth_headers,
+                                json=candidate_payload(position["id"], "Kiran Desai")).json()["id"]
+
+        response = api.post("/api/candidates/generate-pdf", headers=auth_headers,
+                            params={"include_base64": False}, json=[candidate_id])
+        assert response.status_code == 200, response.text
+        # Rendered in a worker thread, not on the event loop
+        assert loops == [None]
+        attachment_id = response.json()["attachment_id"]
+        stored = (tmp_path / "attachments" / attachment_id).read_bytes()
+        assert stored.startswith(b"%PDF")
+
+        download = api.get(f"/api/attachments/{attachment_id}", headers=auth_headers)
+        assert download.status_code == 200
+        assert download.headers["content-disposition"].startswith("attachment")
+        assert download.content == stored
+
+    def test_other_users_attachment_rejected(self, api, auth_headers, tmp_path, monkeypatch):
+        """Test that an attachment generated by another user can be neither sent nor downloaded"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        attachment = asyncio.run(server.store_attachment(b"%PDF-1.4 other", "other.pdf", "application/pdf", "another-user"))
+        api.post("/api/email/configure", headers=auth_headers, json={
+            "smtp_host": "127.0.0.1", "smtp_port": 2525, "smtp_user": "mailer@recruitment.com",
+            "smtp_password": "secret", "from_email": "mailer@recruitment.com", "use_tls": False
+        })
+
+        response = api.post("/api/email/send", headers=auth_headers, json={
+            "to": ["client@example.com"], "subject": "Profiles", "body": "Attached.",
+            "attachment_ids": [attachment["id"]]
+        })
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Attachment not found or expired"
+        assert api.get(f"/api/attachments/{attachment['id']}", headers=auth_headers).status_code == 404
+
+    def test_inline_attachment_stored_and_outbox_scoped_to_sender(self, api, auth_headers, tmp_path, monkeypatch):
+        """Test that an inline attachment is queued by id and only its sender or an admin can read the message"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        api.post("/api/email/configure", headers=auth_headers, json={
+            "smtp_host": "127.0.0.1", "smtp_port": 2525, "smtp_user": "mailer@recruitment.com",
+            "smtp_password": "secret", "from_email": "mailer@recruitment.com", "use_tls": False
+        })
+        api.post("/api/auth/register", headers=auth_headers, json={
+            "email": "manager.one@recruitment.com", "password": "Manage@123", "name": "Manager One", "role": "manager"
+        })
+        login = api.post("/api/auth/login", json={"email": "manager.one@recruitment.com", "password": "Manage@123"})
+        manager = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        response = api.post("/api/email/send", headers=manager, json={
+            "to": ["client@example.com"], "subject": "Profiles", "body": "Attached.",
+            "attachment_base64": base64.b64encode(b"%PDF-1.4 inline").decode(), "attachment_filename": "inline.pdf"
+        })
+        assert response.status_code == 202, response.text
+        message_id = response.json()["id"]
+        queued = asyncio.run(server.db.email_outbox.find_one({"id": message_id}, {"_id": 0}))
+        assert "attachment_base64" not in queued
+        assert (tmp_path / "attachments" / queued["attachment_ids"][0]).read_bytes() == b"%PDF-1.4 inline"
+
+        assert api.get(f"/api/email/outbox/{message_id}", headers=manager).status_code == 200
+        assert api.get(f"/api/email/outbox/{message_id}", headers=auth_headers).status_code == 200
+        asyncio.run(server.db.email_outbox.update_one({"id": message_id}, {"$set": {"created_by": "another-user"}}))
+        assert api.get(f"/api/email/outbox/{message_id}", headers=manager).status_code == 404
+
+        invalid = api.post("/api/email/send", headers=manager, json={
+            "to": ["client@example.com"], "subject": "Profiles", "body": "Attached.",
+            "attachment_base64": "not base64!", "attachment_filename": "inline.pdf"
+        })
+        assert invalid.status_code == 400
+
+    def test_prune_removes_files_of_expired_attachments(self, tmp_path, monkeypatch):
+        """Test that the sweep deletes files whose metadata expired or was removed by the TTL index"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        monkeypatch.setattr(server, "attachments_pruned_at", 0.0)
+
+        async def scenario():
+            kept = await server.store_attachment(b"%PDF kept", "kept.pdf", "application/pdf", "owner")
+            removed = await server.store_attachment(b"%PDF removed", "removed.pdf", "application/pdf", "owner")
+            expired = await server.store_attachment(b"%PDF expired", "expired.pdf", "application/pdf", "owner")
+            await server.db.attachments.delete_one({"id": removed["id"]})
+            await server.db.attachments.update_one({"id": expired["id"]},
+                                                   {"$set": {"expires_at": datetime.now(timezone.utc)}})
+            old = time.time() - server.ATTACHMENT_TTL_HOURS * 3600 - 60
+            for attachment in (kept, removed, expired):
+                os.utime(tmp_path / "attachments" / attachment["id"], (old, old))
+            server.attachments_pruned_at = 0.0
+            await server.prune_expired_attachments()
+            return kept, removed, expired, await server.db.attachments.find_one({"id": expired["id"]})
+
+        kept, removed, expired, expired_doc = asyncio.run(scenario())
+        assert (tmp_path / "attachments" / kept["id"]).exists()
+        assert not (tmp_path / "attachments" / removed["id"]).exists()
+        assert not (tmp_path / "attachments" / expired["id"]).exists()
+        assert expired_doc is None
+        assert isinstance(kept["expires_at"], datetime)
+
+
+class TestInProcessPipelineCounters:
+    """Rollup counters stay exact under concurrent writes and position moves"""
+
+    def test_concurrent_status_change_counted_once(self, api, auth_headers, position, monkeypatch):
+        """Test that a bulk status change racing another writer counts each transition once"""
+        raced_id, other_id = [api.post("/api/candidates", headers=auth_headers,
+                                       json=candidate_payload(position["id"], name)).json()["id"]
+                              for name in ("Meera Iyer", "Rohan Mehta")]
+        before = api.get("/api/pipeline/counters", headers=auth_headers,
+                         params={"scope": "position", "scope_id": position["id"]}).json()[0]["counts"]
+
+        # Another request shortlists one candidate between this writer's read and its bulk write
+        candidates = server.db.candidates
+        original = candidates.bulk_write
+        writes = []
+
+        async def racing_bulk_write(requests, **kwargs):
+            writes.append(len(requests))
+            if len(writes) == 1:
+                await server.set_candidates_status({"id": raced_id}, "shortlisted", changed_by="other")
+            return await original(requests, **kwargs)
+
+        monkeypatch.setattr(candidates, "bulk_write", racing_bulk_write)
+        updated = asyncio.run(server.set_candidates_status({"id": {"$in": [raced_id, other_id]}}, "shortlisted"))
+        assert updated == 2
+        # One write for the batch, the racing writer's, and a retry of the raced candidate only
+        assert writes == [2, 1, 1]
+
+        after = api.get("/api/pipeline/counters", headers=auth_headers,
+                        params={"scope": "position", "scope_id": position["id"]}).json()[0]["counts"]
+        assert after["shortlisted"] - before.get("shortlisted", 0) == 2
+        assert after["sourced"] - before["sourced"] == -2
+        events = asyncio.run(server.db.status_events.count_documents(
+            {"candidate_id": {"$in": [raced_id, other_id]}, "to_status": "shortlisted"}))
+        assert events == 2
+
+    def test_position_client_change_moves_client_counts(self, api, auth_headers):
+        """Test that moving a position to another client moves its counts between client rollups"""
+        old_client = api.post("/api/clients", headers=auth_headers, json=client_payload("Old Client")).json()["id"]
+        new_client = api.post("/api/clients", headers=auth_headers, json=client_payload("New Client")).json()["id"]
+        moved = api.post("/api/positions", headers=auth_headers, json=position_payload(old_client)).json()
+        for name in ("Arjun Rao", "Divya Nair"):
+            api.post("/api/candidates", headers=auth_headers, json=candidate_payload(moved["id"], name))
+
+        response = api.put(f"/api/positions/{moved['id']}", headers=auth_headers, json=position_payload(new_client))
+        assert response.status_code == 200, response.text
+
+        def client_counter(client_id: str) -> dict:
+            return api.get("/api/pipeline/counters", headers=auth_headers,
+                           params={"scope": "client", "scope_id": client_id}).json()[0]
+
+        assert client_counter(old_client)["total"] == 0
+        assert client_counter(old_client)["counts"]["sourced"] == 0
+        assert client_counter(new_client)["total"] == 2
+        assert client_counter(new_client)["counts"]["sourced"] == 2
+
+
+class TestInProcessPdfBatch:
+    """Batch profile PDFs are tracked in the database and kept in file storage"""
+
+    def test_writer_merges_parts(self, tmp_path):
+        """Test that the merged document holds every part's pages and the parts are removed"""
+        writer = server.ProfilePdfBatchWriter(tmp_path)
+        for idx in range(3):
+            writer.add_chunk([{**candidate_payload("position-1", f"Candidate {idx}"), "id": f"c{idx}"}])
+        output = writer.finish()
+
+        from PyPDF2 import PdfReader
+        assert len(PdfReader(str(output)).pages) == writer.pages
+        assert not list(tmp_path.glob("part_*.pdf"))
+
+    def test_batch_job_owned_and_downloadable(self, api, auth_headers, tmp_path, monkeypatch):
+        """Test that a finished job is served from file storage to its creator only"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        client_id = api.post("/api/clients", headers=auth_headers, json=client_payload("Batch Client")).json()["id"]
+        batch_position = api.post("/api/positions", headers=auth_headers, json=position_payload(client_id)).json()
+        for name in ("Sunil Joshi", "Kavya Reddy", "Imran Khan"):
+            api.post("/api/candidates", headers=auth_headers, json=candidate_payload(batch_position["id"], name))
+
+        started = api.post("/api/candidates/generate-pdf/batch", headers=auth_headers,
+                           json={"position_id": batch_position["id"], "chunk_size": 1})
+        assert started.status_code == 200, started.text
+        job_id = started.json()["job_id"]
+        for _ in range(200):
+            job = api.get(f"/api/candidates/generate-pdf/batch/{job_id}", headers=auth_headers).json()
+            if job["status"] != "running":
+                break
+            time.sleep(0.05)
+        assert job["status"] == "completed", job
+        assert job["candidates_rendered"] == 3
+
+        download = api.get(f"/api/candidates/generate-pdf/batch/{job_id}/download", headers=auth_headers)
+        assert download.status_code == 200
+        assert download.content == (tmp_path / "pdf_batches" / f"{job_id}.pdf").read_bytes()
+
+        api.post("/api/auth/register", headers=auth_headers, json={
+            "email": "lead.one@recruitment.com", "password": "Lead@1234", "name": "Lead One", "role": "team_leader"
+        })
+        login = api.post("/api/auth/login", json={"email": "lead.one@recruitment.com", "password": "Lead@1234"})
+        other = {"Authorization": f"Bearer {login.json()['token']}"}
+        assert api.get(f"/api/candidates/generate-pdf/batch/{job_id}", headers=other).status_code == 404
+        assert api.get(f"/api/candidates/generate-pdf/batch/{job_id}/download", headers=other).status_code == 404
+
+
+class TestInProcessRecruiterAnalytics:
+    """Per-recruiter productivity buckets"""
+
+    @pytest.fixture
+    def added(self, api, auth_headers, position):
+        """Admin id and a candidate the admin added just now"""
+        server.recruiter_report_cache.invalidate()
+        api.post("/api/candidates", headers=auth_headers, json=candidate_payload(position["id"], "Tara Singh"))
+        return api.get("/api/auth/me", headers=auth_headers).json()["id"]
+
+    def test_invalid_parameters_rejected(self, api, auth_headers):
+        """Test that an unknown timezone or granularity is a client error"""
+        for params in ({"timezone_name": "Mars/Olympus_Mons"}, {"timezone_name": "../etc/passwd"}, {"granularity": "year"}):
+            assert api.get("/api/analytics/recruiters", headers=auth_headers, params=params).status_code == 400
+
+    def test_day_buckets_in_requested_timezone(self, api, auth_headers, added):
+        """Test that day buckets start at local midnight of the requested zone"""
+        zone = ZoneInfo("Asia/Kolkata")
+        response = api.get("/api/analytics/recruiters", headers=auth_headers,
+                           params={"granularity": "day", "timezone_name": "Asia/Kolkata", "recruiter_id": added})
+        assert response.status_code == 200, response.text
+        report = response.json()
+        local_midnight = datetime.now(zone).replace(hour=0, minute=0, second=0, microsecond=0)
+        assert report["timezone"] == "Asia/Kolkata"
+        assert report["recruiters"][0]["series"][-1]["period"] == local_midnight.astimezone(timezone.utc).isoformat()
+
+    def test_range_bounds_follow_timezone(self, api, auth_headers, added):
+        """Test that start_date and end_date are local dates of the requested zone"""
+        today = datetime.now(ZoneInfo("Pacific/Kiritimati")).date().isoformat()
+        response = api.get("/api/analytics/recruiters", headers=auth_headers, params={
+            "granularity": "week", "timezone_name": "Pacific/Kiritimati", "start_date": today, "end_date": today,
+            "recruiter_id": added
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["recruiters"][0]["totals"]["added"] >= 1
+
+    def test_recruiter_filter(self, api, auth_headers, added):
+        """Test that recruiter_id limits the report to that user"""
+        report = api.get("/api/analytics/recruiters", headers=auth_headers, params={"recruiter_id": added}).json()
+        assert [r["recruiter_id"] for r in report["recruiters"]] == [added]
+
+        nobody = api.get("/api/analytics/recruiters", headers=auth_headers, params={"recruiter_id": "nobody"}).json()
+        assert nobody["recruiters"] == []
+
+
+class TestInProcessFunnel:
+    """Stage funnel from status history"""
+
+    @pytest.fixture(scope="class")
+    def team_leader(self, api, auth_headers):
+        """A team leader with one position of their own"""
+        api.post("/api/auth/register", headers=auth_headers, json={
+            "email": "leader.one@recruitment.com", "password": "Leader@123", "name": "Leader One", "role": "team_leader"
+        })
+        login = api.post("/api/auth/login", json={"email": "leader.one@recruitment.com", "password": "Leader@123"})
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+        client = api.post("/api/clients", headers=headers, json=client_payload("Leader Client")).json()
+        position = api.post("/api/positions", headers=headers, json=position_payload(client["id"])).json()
+        return {"headers": headers, "client": client, "position": position}
+
+    def test_skipped_stages_count_as_reached(self, api, team_leader):
+        """Test that a candidate approved without being shortlisted counts as reaching shortlisted"""
+        headers = team_leader["headers"]
+        candidate_ids = [api.post("/api/candidates", headers=headers,
+                                  json=candidate_payload(team_leader["position"]["id"], name)).json()["id"]
+                         for name in ("Funnel One", "Funnel Two")]
+        response = api.post(f"/api/candidates/{candidate_ids[0]}/action", headers=headers,
+                            json={"candidate_id": candidate_ids[0], "action": "approve"})
+        assert response.status_code == 200, response.text
+
+        report = api.get("/api/analytics/funnel", headers=headers)
+        assert report.status_code == 200, report.text
+        stages = {stage["status"]: stage for stage in report.json()["stages"]}
+        assert stages["sourced"]["reached"] == 2
+        assert stages["shortlisted"]["reached"] == 1 and stages["shortlisted"]["entered"] == 0
+        assert stages["approved"]["reached"] == 1
+        assert stages["shortlisted"]["conversion_from_previous"] == 0.5
+        assert stages["approved"]["conversion_from_previous"] == 1.0
+        assert all((stage.get("conversion_from_previous") or 0) <= 1 for stage in stages.values())
+
+    def test_team_leader_sees_only_own_positions(self, api, auth_headers, position, team_leader):
+        """Test that a team leader's funnel leaves out other positions and refuses filters outside their scope"""
+        headers = team_leader["headers"]
+        api.post("/api/candidates", headers=auth_headers, json=candidate_payload(position["id"], "Other Team"))
+
+        own = api.get("/api/analytics/funnel", headers=headers).json()
+        by_client = api.get("/api/analytics/funnel", headers=headers,
+                            params={"client_id": team_leader["client"]["id"]}).json()
+        overall = api.get("/api/analytics/funnel", headers=auth_headers).json()
+        assert own["stages"][0]["reached"] == by_client["stages"][0]["reached"]
+        assert overall["stages"][0]["reached"] > own["stages"][0]["reached"]
+
+        assert api.get("/api/analytics/funnel", headers=headers,
+                       params={"position_id": position["id"]}).status_code == 404
+        assert api.get("/api/analytics/funnel", headers=headers,
+                       params={"recruiter_id": "anyone"}).status_code == 403
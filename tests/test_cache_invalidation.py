@@ -0,0 +1,200 @@
+"""
+Cross-replica cache invalidation tests for RecruitHub
+Change streams need a replica set; a single node is enough:
+
+    docker run -d -p 27017:27017 mongo:7.0 --replSet rs0
+    docker exec <container> mongosh --quiet --eval 'rs.initiate()'
+    MONGO_REPLSET_URL="mongodb://localhost:27017/?replicaSet=rs0&directConnection=true" \\
+        pytest tests/test_cache_invalidation.py -v
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+import server
+
+REPLSET_URL = os.environ.get('MONGO_REPLSET_URL')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestInvalidationRules:
+    """Which cache entries a change event evicts"""
+
+    def test_user_change_evicts_user_and_scope(self):
+        """Test that a user update evicts only that user's entries"""
+        async def scenario():
+            server.user_cache.invalidate()
+            await server.user_cache.get_or_compute("u1", lambda: asyncio.sleep(0, {"id": "u1"}))
+            await server.user_cache.get_or_compute("u2", lambda: asyncio.sleep(0, {"id": "u2"}))
+            server.apply_cache_invalidation({
+                "ns": {"coll": "users"}, "operationType": "update", "fullDocument": {"id": "u1"}
+            })
+            return set(server.user_cache._entries)
+        assert run(scenario()) == {"u2"}
+
+    def test_position_delete_evicts_all_scopes(self):
+        """Test that a position delete, which carries no recruiters, drops every scope"""
+        async def scenario():
+            for user_id in ("r1", "r2"):
+                await server.access_scope_cache.get_or_compute(user_id, lambda: asyncio.sleep(0, {}))
+            server.apply_cache_invalidation({
+                "ns": {"coll": "positions"}, "operationType": "delete", "documentKey": {"_id": "x"}
+            })
+            return len(server.access_scope_cache._entries)
+        assert run(scenario()) == 0
+
+    def test_user_update_without_document_evicts_all_users(self):
+        """Test that a user update, which carries only the _id, drops every cached user"""
+        async def scenario():
+            for user_id in ("u1", "u2"):
+                await server.user_cache.get_or_compute(user_id, lambda: asyncio.sleep(0, {"id": user_id}))
+            server.apply_cache_invalidation({
+                "ns": {"coll": "users"}, "operationType": "update", "documentKey": {"_id": "x"}
+            })
+            return len(server.user_cache._entries)
+        assert run(scenario()) == 0
+
+    def test_stream_trimmed_without_lookups(self):
+        """Test that the bus watches a projected stream and asks for no post-image lookups"""
+        calls = []
+
+        class Database:
+            def watch(self, pipeline, **kwargs):
+                calls.append((pipeline, kwargs))
+                raise NotImplementedError
+
+        bus = server.CacheInvalidationBus(Database(), ["users"], lambda change: None, lambda: None, "test-replica")
+        with pytest.raises(NotImplementedError):
+            run(bus._follow())
+        pipeline, kwargs = calls[0]
+        assert "full_document" not in kwargs
+        projection = pipeline[-1]["$project"]
+        assert {"operationType", "documentKey", "ns", "fullDocument.id"} <= set(projection)
+        assert "fullDocument" not in projection
+
+
+    def test_candidate_change_evicts_dashboard_and_reports(self):
+        """Test that any candidate event drops the dashboard and recruiter report caches"""
+        async def scenario():
+            await server.dashboard_stats_cache.get_or_compute(("global",), lambda: asyncio.sleep(0, {}))
+            await server.recruiter_report_cache.get_or_compute("report", lambda: asyncio.sleep(0, {}))
+            server.apply_cache_invalidation({
+                "ns": {"coll": "candidates"}, "operationType": "update", "documentKey": {"_id": "x"}
+            })
+            return len(server.dashboard_stats_cache._entries), len(server.recruiter_report_cache._entries)
+        assert run(scenario()) == (0, 0)
+
+    def test_unnamed_consumer_resets_instead_of_checkpointing(self):
+        """Test that a bus without a stable consumer id keeps no token and resets caches once the stream opens"""
+        resets = []
+
+        class Stream:
+            resume_token = {"_data": "token"}
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def try_next(self):
+                raise RuntimeError("stop")
+
+        class Database:
+            def watch(self, pipeline, **kwargs):
+                return Stream()
+
+        bus = server.CacheInvalidationBus(Database(), ["candidates"], lambda change: None,
+                                          lambda: resets.append(True), consumer_id=None)
+
+        async def scenario():
+            assert await bus._load_token() is None
+            with pytest.raises(RuntimeError):
+                await bus._follow()
+            bus.token = {"_data": "token"}
+            await bus._save_token()
+        run(scenario())
+        assert resets == [True]
+
+    def test_invalidate_detaches_running_load(self):
+        """Test that callers arriving after an invalidation start a fresh load instead of joining the stale one"""
+        cache = server.AsyncTTLCache(60)
+        loads = []
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def stale():
+                loads.append("stale")
+                await release.wait()
+                return "stale"
+
+            async def fresh():
+                loads.append("fresh")
+                return "fresh"
+
+            first = asyncio.ensure_future(cache.get_or_compute("k", stale))
+            await asyncio.sleep(0)
+            cache.invalidate("k")
+            second = await cache.get_or_compute("k", fresh)
+            release.set()
+            return await first, second, await cache.get_or_compute("k", stale)
+        assert run(scenario()) == ("stale", "fresh", "fresh")
+        assert loads == ["stale", "fresh"]
+
+
+@pytest.mark.skipif(not REPLSET_URL, reason="MONGO_REPLSET_URL not set")
+class TestChangeStreamBus:
+    """Invalidation bus against a live replica set"""
+
+    @pytest.fixture
+    def database(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo = AsyncIOMotorClient(REPLSET_URL)
+        database = mongo[f"recruitment_bus_test_{uuid.uuid4().hex[:8]}"]
+        yield database
+        run(mongo.drop_database(database.name))
+        mongo.close()
+
+    def test_events_delivered_and_resumed(self, database):
+        """Test that events written while the bus was stopped are delivered after restart"""
+        async def scenario():
+            seen, resets = [], []
+            def make_bus():
+                return server.CacheInvalidationBus(
+                    database, ["positions"], lambda change: seen.append(change["fullDocument"]["id"]),
+                    lambda: resets.append(len(seen)), consumer_id="test-replica", checkpoint_seconds=0
+                )
+
+            async def wait_for(count):
+                for _ in range(100):
+                    if len(seen) >= count:
+                        return
+                    await asyncio.sleep(0.1)
+
+            bus = make_bus()
+            bus.start()
+            for _ in range(50):
+                if bus.running:
+                    break
+                await asyncio.sleep(0.1)
+            await database.positions.insert_one({"id": "p1"})
+            await wait_for(1)
+            await bus.stop()
+
+            # Written while no bus is listening
+            await database.positions.insert_one({"id": "p2"})
+
+            bus = make_bus()
+            bus.start()
+            await wait_for(2)
+            await bus.stop()
+            return seen, resets
+
+        # Only the first start, which had no checkpoint, resets the caches
+        assert run(scenario()) == (["p1", "p2"], [0])
@@ -0,0 +1,396 @@
+"""
+Email outbox delivery tests for RecruitHub
+Runs SMTP delivery against a local stand-in SMTP server (no external mail server needed)
+"""
+import asyncio
+import smtplib
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from file_storage import LocalFileStorage
+
+SMTP_USER = "mailer@recruitment.com"
+SMTP_PASSWORD = "secret"
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        smtp = self.server
+        smtp.connections += 1
+        accepted = 0
+        self.reply("220 standin ESMTP")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-standin")
+                if smtp.pipelining:
+                    self.reply("250-PIPELINING")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                smtp.logins += 1
+                self.reply("235 Authentication successful" if smtp.accept_auth else "535 Authentication failed")
+            elif verb in ("MAIL", "RSET"):
+                accepted = 0
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                if any(addr in command for addr in smtp.refuse):
+                    self.reply("550 No such user")
+                else:
+                    accepted += 1
+                    self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "DATA" and not accepted:
+                self.reply("554 No valid recipients")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(line)
+                smtp.messages.append(b"".join(lines))
+                self.reply("250 Queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.connections = 0
+        self.logins = 0
+        self.accept_auth = True
+        self.pipelining = False
+        self.refuse = []
+        self.messages = []
+
+
+@pytest.fixture
+def smtp_server():
+    standin = StandInSMTPServer()
+    thread = threading.Thread(target=standin.serve_forever, daemon=True)
+    thread.start()
+    yield standin
+    standin.shutdown()
+    standin.server_close()
+
+
+@pytest.fixture
+def smtp_config(smtp_server):
+    return {
+        "smtp_host": "127.0.0.1",
+        "smtp_port": smtp_server.server_address[1],
+        "smtp_user": SMTP_USER,
+        "smtp_password": SMTP_PASSWORD,
+        "from_email": SMTP_USER,
+        "use_tls": False
+    }
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    smtp_pool = server.SMTPConnectionPool(max_idle=2, idle_seconds=60, timeout=5)
+    monkeypatch.setattr(server, "smtp_pool", smtp_pool)
+    yield smtp_pool
+    smtp_pool.close_all()
+
+
+def make_message(**overrides) -> dict:
+    message = {
+        "id": "msg-1",
+        "to": ["client@example.com"],
+        "subject": "Candidate Profiles",
+        "body": "Please find attached.",
+        "candidate_ids": []
+    }
+    message.update(overrides)
+    return message
+
+
+@pytest.fixture
+def outbox(smtp_config, pool):
+    """An empty outbox on the in-memory database, configured for the stand-in server"""
+    async def reset():
+        await server.db.email_outbox.delete_many({})
+        await server.db.email_config.delete_many({})
+        await server.db.email_config.insert_one({"id": "email_config", **smtp_config})
+    asyncio.run(reset())
+    return server.EmailOutboxWorker(concurrency=1, poll_seconds=0.05)
+
+
+def queue_message(**overrides) -> dict:
+    """Insert a message the way /email/send enqueues it"""
+    now = datetime.now(timezone.utc)
+    message = {**make_message(), "status": "queued", "attempts": 0, "last_error": None,
+               "created_by": "user-1", "created_at": now, "next_attempt_at": now}
+    message.update(overrides)
+    asyncio.run(server.db.email_outbox.insert_one(dict(message)))
+    return message
+
+
+def outbox_message(message_id: str) -> dict:
+    return asyncio.run(server.db.email_outbox.find_one({"id": message_id}, {"_id": 0}))
+
+
+def claim_and_process(worker) -> dict:
+    """One worker iteration: claim the next due message and deliver it"""
+    async def step():
+        claimed = await worker._claim()
+        if claimed is not None:
+            assert claimed["status"] == "sending"
+            await worker._process(claimed)
+        return claimed
+    return asyncio.run(step())
+
+
+class TestEmailOutboxWorker:
+    """Outbox claim, delivery and retry tests"""
+
+    def test_queued_message_claimed_and_sent(self, smtp_server, outbox):
+        """Test that a queued message is claimed, delivered and marked sent"""
+        queue_message()
+
+        assert claim_and_process(outbox)["id"] == "msg-1"
+        stored = outbox_message("msg-1")
+        assert stored["status"] == "sent"
+        assert isinstance(stored["sent_at"], datetime)
+        assert "locked_at" not in stored
+        assert len(smtp_server.messages) == 1
+        assert claim_and_process(outbox) is None
+
+    def test_retry_backoff_then_failed(self, smtp_server, outbox, monkeypatch):
+        """Test that failed attempts back off exponentially and stop at EMAIL_MAX_ATTEMPTS"""
+        monkeypatch.setattr(server, "EMAIL_MAX_ATTEMPTS", 3)
+        monkeypatch.setattr(server, "EMAIL_RETRY_BASE_SECONDS", 10)
+        smtp_server.refuse = ["client@example.com"]
+        queue_message()
+
+        for attempt, delay in ((1, 10), (2, 20)):
+            before = datetime.now(timezone.utc)
+            claim_and_process(outbox)
+            stored = outbox_message("msg-1")
+            assert stored["status"] == "queued"
+            assert stored["attempts"] == attempt
+            wait = (server.as_utc(stored["next_attempt_at"]) - before).total_seconds()
+            assert delay - 1 <= wait <= delay + 1
+            # Not due yet, so nothing is claimed until the backoff has passed
+            assert claim_and_process(outbox) is None
+            asyncio.run(server.db.email_outbox.update_one(
+                {"id": "msg-1"}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}))
+
+        claim_and_process(outbox)
+        stored = outbox_message("msg-1")
+        assert stored["status"] == "failed"
+        assert stored["attempts"] == 3
+        assert "No such user" in stored["last_error"]
+        assert claim_and_process(outbox) is None
+
+    def test_stale_sending_message_reclaimed(self, smtp_server, outbox):
+        """Test that a claim older than EMAIL_SENDING_TIMEOUT_SECONDS is taken over, a recent one is not"""
+        now = datetime.now(timezone.utc)
+        queue_message(id="msg-busy", status="sending", locked_at=now - timedelta(seconds=5))
+        queue_message(id="msg-stale", status="sending",
+                      locked_at=now - timedelta(seconds=server.EMAIL_SENDING_TIMEOUT_SECONDS + 1))
+
+        assert claim_and_process(outbox)["id"] == "msg-stale"
+        assert outbox_message("msg-stale")["status"] == "sent"
+        assert outbox_message("msg-busy")["status"] == "sending"
+        assert claim_and_process(outbox) is None
+
+
+class TestSMTPConnectionPool:
+    """Pooled SMTP delivery tests"""
+
+    def test_connection_reused_across_messages(self, smtp_server, smtp_config, pool):
+        """Test that consecutive sends share one authenticated session"""
+        for idx in range(3):
+            msg = server.build_email_message(smtp_config, make_message(subject=f"Batch {idx}"))
+            server.deliver_email(smtp_config, msg)
+
+        assert len(smtp_server.messages) == 3
+        assert smtp_server.connections == 1
+        assert smtp_server.logins == 1
+        assert pool.stats() == {"idle": 1, "opened": 1, "reused": 2}
+
+    def test_attachment_included(self, smtp_server, smtp_config, pool):
+        """Test that a base64 attachment is encoded into the MIME message"""
+        message = make_message(attachment_base64="JVBERi0xLjQK", attachment_filename="profiles.pdf")
+        server.deliver_email(smtp_config, server.build_email_message(smtp_config, message))
+
+        assert b"filename=profiles.pdf" in smtp_server.messages[0]
+
+    def test_new_settings_open_new_session(self, smtp_server, smtp_config, pool):
+        """Test that sessions are not shared between different SMTP accounts"""
+        server.deliver_email(smtp_config, server.build_email_message(smtp_config, make_message()))
+        other_config = {**smtp_config, "smtp_user": "other@recruitment.com"}
+        server.deliver_email(other_config, server.build_email_message(other_config, make_message()))
+
+        assert smtp_server.logins == 2
+
+    def test_authentication_failure_raises(self, smtp_server, smtp_config, pool):
+        """Test that rejected credentials surface as an authentication error"""
+        smtp_server.accept_auth = False
+        msg = server.build_email_message(smtp_config, make_message())
+
+        with pytest.raises(smtplib.SMTPAuthenticationError):
+            server.deliver_email(smtp_config, msg)
+        assert pool.stats()["idle"] == 0
+
+
+class TestPipelinedSendmail:
+    """Mail-merge pipelined delivery tests"""
+
+    def test_many_messages_over_one_session(self, smtp_server, smtp_config, pool):
+        """Test that a pipelined batch reuses one connection and delivers every message"""
+        smtp_server.pipelining = True
+        session = pool.acquire(smtp_config)
+        for idx in range(5):
+            msg = server.build_email_message(smtp_config, make_message(body=f"Hello client {idx}\n.leading dot"))
+            refused = server.pipelined_sendmail(session, SMTP_USER, ["client@example.com"], msg)
+            assert refused == {}
+        pool.release(smtp_config, session)
+
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 5
+        assert b"\r\n..leading dot" in smtp_server.messages[0]
+
+    def test_partially_refused_recipients(self, smtp_server, smtp_config, pool):
+        """Test that refused recipients are reported while the rest still receive the message"""
+        smtp_server.pipelining = True
+        smtp_server.refuse = ["gone@example.com"]
+        session = pool.acquire(smtp_config)
+        msg = server.build_email_message(smtp_config, make_message())
+
+        refused = server.pipelined_sendmail(session, SMTP_USER, ["client@example.com", "gone@example.com"], msg)
+
+        assert list(refused) == ["gone@example.com"]
+        assert len(smtp_server.messages) == 1
+
+    def test_all_recipients_refused(self, smtp_server, smtp_config, pool):
+        """Test that a message nobody accepts raises and leaves the session usable"""
+        smtp_server.pipelining = True
+        smtp_server.refuse = ["gone@example.com"]
+        session = pool.acquire(smtp_config)
+        msg = server.build_email_message(smtp_config, make_message())
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            server.pipelined_sendmail(session, SMTP_USER, ["gone@example.com"], msg)
+        assert session.noop()[0] == 250
+
+    def test_flattened_message_sent_once_without_pipelining(self, smtp_server, smtp_config, pool):
+        """Test that a message passed as bytes is sent as-is to a server without PIPELINING"""
+        session = pool.acquire(smtp_config)
+        data = server.build_email_message(smtp_config, make_message(body="Flattened once")).as_bytes()
+
+        refused = server.pipelined_sendmail(session, SMTP_USER, ["client@example.com"], data)
+
+        assert refused == {}
+        assert len(smtp_server.messages) == 1
+        assert b"Flattened once" in smtp_server.messages[0]
+
+    def test_template_rendering(self):
+        """Test that known placeholders are substituted and unknown ones kept"""
+        rendered = server.render_mail_merge_template("Dear $client_name, $unknown", {"client_name": "Acme"})
+        assert rendered == "Dear Acme, $unknown"
+
+
+class TestStoredAttachments:
+    """Attachment-by-reference tests"""
+
+    def test_stored_attachment_streamed_into_message(self, tmp_path, monkeypatch, smtp_server, smtp_config, pool):
+        """Test that a stored file spanning several read chunks round-trips through the MIME part"""
+        monkeypatch.setattr(server, "file_storage", LocalFileStorage(tmp_path))
+        content = bytes(range(256)) * 1500
+        (tmp_path / "attachments").mkdir()
+        (tmp_path / "attachments" / "att-1").write_bytes(content)
+        attachment = {"id": "att-1", "filename": "profiles.pdf", "content_type": "application/pdf"}
+
+        part = asyncio.run(server.attachment_mime_part(attachment))
+        msg = server.build_email_message(smtp_config, make_message(), [part])
+        part = msg.get_payload()[-1]
+        assert part.get_filename() == "profiles.pdf"
+        assert part.get_payload(decode=True) == content
+
+        server.deliver_email(smtp_config, msg)
+        assert b"filename=\"profiles.pdf\"" in smtp_server.messages[0]
+
+
+class TestMailMergeJobs:
+    """Mail-merge job recovery tests"""
+
+    def test_stale_running_jobs_marked_failed(self):
+        """Test that running jobs without a recent heartbeat are failed and live ones are left alone"""
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=server.MAIL_MERGE_STALE_SECONDS + 60)
+
+        async def scenario():
+            await server.db.mail_merge_jobs.delete_many({})
+            await server.db.mail_merge_jobs.insert_many([
+                {"id": "dead", "status": "running", "created_at": stale, "heartbeat_at": stale},
+                {"id": "legacy", "status": "running", "created_at": stale},
+                {"id": "alive", "status": "running", "created_at": stale, "heartbeat_at": now},
+                {"id": "done", "status": "completed", "created_at": stale, "heartbeat_at": stale},
+            ])
+            failed = await server.fail_stale_mail_merge_jobs()
+            jobs = {job["id"]: job async for job in server.db.mail_merge_jobs.find({}, {"_id": 0})}
+            await server.db.mail_merge_jobs.delete_many({})
+            return failed, jobs
+
+        failed, jobs = asyncio.run(scenario())
+
+        assert failed == 2
+        assert jobs["dead"]["status"] == "failed" and jobs["legacy"]["status"] == "failed"
+        assert isinstance(jobs["dead"]["finished_at"], datetime)
+        assert jobs["alive"]["status"] == "running"
+        assert jobs["done"]["status"] == "completed"
+
+    def test_job_outcome_saved_when_sharing_cannot_be_recorded(self, smtp_server, smtp_config, pool, monkeypatch):
+        """Test that a job whose emails went out is completed even if marking candidates shared fails"""
+        async def conflict(*args, **kwargs):
+            raise server.HTTPException(status_code=409, detail="Candidate status changed concurrently, please retry")
+
+        monkeypatch.setattr(server, "set_candidates_status", conflict)
+        request = server.MailMergeRequest(
+            subject_template="Profiles for $client_name", body_template="Hello",
+            recipients=[server.MailMergeRecipient(to=["client@example.com"], candidate_ids=["cand-1"])],
+            attach_profiles=False
+        )
+
+        async def scenario():
+            await server.db.mail_merge_jobs.delete_many({})
+            await server.db.candidates.insert_one({"id": "cand-1", "name": "Nisha Rao", "status": "approved"})
+            await server.db.mail_merge_jobs.insert_one({"id": "job-1", "status": "running"})
+            await server.run_mail_merge_job("job-1", request, smtp_config, "user-1")
+            job = await server.db.mail_merge_jobs.find_one({"id": "job-1"}, {"_id": 0})
+            logs = await server.db.profile_sharing_log.count_documents({"mail_merge_job_id": "job-1"})
+            await server.db.candidates.delete_many({"id": "cand-1"})
+            await server.db.mail_merge_jobs.delete_many({})
+            return job, logs
+
+        job, logs = asyncio.run(scenario())
+
+        assert job["status"] == "completed" and job["sent"] == 1
+        assert "concurrently" in job["bookkeeping_error"]
+        assert logs == 1
+        assert len(smtp_server.messages) == 1
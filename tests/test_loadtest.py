@@ -0,0 +1,92 @@
+"""
+Load-test harness tests for RecruitHub: data generator and baseline comparison
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import loadtest
+import server
+
+
+class TestDataGenerator:
+    """Seeded data consistency"""
+
+    def test_candidates_reference_seeded_positions_and_recruiters(self):
+        """Test that every candidate belongs to a generated position and one of its recruiters"""
+        rng = random.Random(1)
+        now = datetime.now(timezone.utc)
+        users = loadtest.generate_users(rng, 20, "hash", now)
+        recruiters = [u["id"] for u in users if u["role"] == "recruiter"]
+        creators = [u["id"] for u in users if u["role"] != "recruiter"]
+        clients = loadtest.generate_clients(rng, 5, creators, now)
+        positions = list(loadtest.generate_positions(rng, 30, [c["id"] for c in clients], creators, recruiters, now))
+        refs = [(p["id"], p["assigned_recruiters"]) for p in positions]
+
+        candidates = list(loadtest.generate_candidates(rng, 500, refs, now))
+
+        assigned = dict(refs)
+        assert {u["role"] for u in users} == {"manager", "team_leader", "recruiter"}
+        assert all(c["added_by"] in assigned[c["position_id"]] for c in candidates)
+        assert len({c["email"] for c in candidates}) == 500
+        assert all(c["created_at"] <= now for c in candidates)
+
+    def test_batches_cover_every_document(self):
+        batches = list(loadtest.batches(iter(range(12)), 5))
+        assert [len(b) for b in batches] == [5, 5, 2]
+
+
+class TestDropSeeded:
+    """--drop removes only what the seeder created"""
+
+    def test_real_records_survive(self):
+        """Test that records owned by non-seeded users are kept while seeded ones are deleted"""
+        db = server.db
+
+        async def scenario():
+            for owner, email in (("lt-user", "loadtest.recruiter9@recruitment.com"), ("real-user", "real.user@recruitment.com")):
+                await db.users.insert_one({"id": owner, "email": email, "role": "team_leader"})
+                await db.clients.insert_one({"id": f"{owner}-client", "created_by": owner})
+                await db.positions.insert_one({"id": f"{owner}-position", "client_id": f"{owner}-client", "created_by": owner})
+                await db.candidates.insert_one({"id": f"{owner}-candidate", "position_id": f"{owner}-position", "added_by": owner})
+                await db.status_events.insert_one({"id": f"{owner}-event", "position_id": f"{owner}-position", "recruiter_id": owner})
+                await db.pipeline_counters.insert_one({"id": f"recruiter:{owner}", "scope": "recruiter", "scope_id": owner})
+
+            await loadtest.drop_seeded(db)
+
+            remaining = {}
+            for name in ("users", "clients", "positions", "candidates", "status_events", "pipeline_counters"):
+                docs = await db[name].find({"id": {"$regex": "(lt-user|real-user)"}}, {"_id": 0, "id": 1}).to_list(None)
+                remaining[name] = sorted(doc["id"] for doc in docs)
+            return remaining
+
+        remaining = asyncio.run(scenario())
+        assert remaining == {
+            "users": ["real-user"], "clients": ["real-user-client"], "positions": ["real-user-position"],
+            "candidates": ["real-user-candidate"], "status_events": ["real-user-event"],
+            "pipeline_counters": ["recruiter:real-user"]
+        }
+
+
+class TestReporting:
+    """Percentiles and baseline comparison"""
+
+    def test_nearest_rank_percentiles(self):
+        values = [float(v) for v in range(1, 101)]
+        assert loadtest.percentile(values, 0.50) == 50.0
+        assert loadtest.percentile(values, 0.95) == 95.0
+        assert loadtest.percentile(values, 0.99) == 99.0
+        assert loadtest.percentile([], 0.99) == 0.0
+
+    def test_regression_beyond_tolerance_reported(self):
+        """Test that only growth past both the tolerance and the noise floor is flagged"""
+        baseline = {"GET /api/clients": {"p95_ms": 40.0, "p99_ms": 80.0},
+                    "GET /api/positions": {"p95_ms": 2.0, "p99_ms": 3.0}}
+        results = {"GET /api/clients": {"requests": 100, "p95_ms": 60.0, "p99_ms": 90.0},
+                   "GET /api/positions": {"requests": 100, "p95_ms": 4.0, "p99_ms": 6.0},
+                   "GET /api/dashboard/stats": {"requests": 100, "p95_ms": 900.0, "p99_ms": 990.0}}
+
+        regressions = loadtest.compare_to_baseline(results, baseline, tolerance=0.25)
+
+        assert len(regressions) == 1
+        assert regressions[0].startswith("GET /api/clients p95_ms")
@@ -0,0 +1,78 @@
+"""
+Event loop stall detector tests for RecruitHub
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from loop_watchdog import LoopWatchdog, TaskScopeMiddleware
+
+
+def blocking_helper(seconds: float):
+    time.sleep(seconds)
+
+
+async def run_with_watchdog(watchdog: LoopWatchdog, coro_factory):
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    try:
+        await coro_factory()
+        await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+
+class TestLoopWatchdog:
+    """Stall capture and attribution"""
+
+    def test_background_task_stall_captured(self):
+        """Test that a blocking call is timed and attributed to its task and call site"""
+        watchdog = LoopWatchdog(threshold=0.05, app_root=__file__)
+        stalls = []
+        watchdog.on_stall = stalls.append
+
+        async def blocking_job():
+            blocking_helper(0.2)
+
+        async def scenario():
+            await asyncio.create_task(blocking_job())
+
+        asyncio.run(run_with_watchdog(watchdog, scenario))
+
+        assert len(stalls) == 1
+        assert stalls[0]["duration_ms"] >= 150
+        [offender] = watchdog.report()
+        assert offender["origin"] == "task TestLoopWatchdog.test_background_task_stall_captured.<locals>.blocking_job"
+        assert offender["site"].endswith("in blocking_helper")
+        assert any("blocking_job" in line for line in offender["stack"])
+
+    def test_short_pauses_ignored(self):
+        """Test that work under the threshold is not reported"""
+        watchdog = LoopWatchdog(threshold=0.2)
+
+        async def scenario():
+            for _ in range(3):
+                blocking_helper(0.02)
+                await asyncio.sleep(0)
+
+        asyncio.run(run_with_watchdog(watchdog, scenario))
+        assert watchdog.report() == []
+
+    def test_request_stall_attributed_to_route(self):
+        """Test that a stall inside a request names the route template set by the router"""
+        watchdog = LoopWatchdog(threshold=0.05)
+
+        async def app(scope, receive, send):
+            scope["route"] = SimpleNamespace(path="/api/candidates/{candidate_id}")
+            blocking_helper(0.15)
+
+        async def scenario():
+            middleware = TaskScopeMiddleware(app, watchdog)
+            await asyncio.create_task(middleware({"type": "http", "method": "GET", "path": "/api/candidates/42"}, None, None))
+
+        asyncio.run(run_with_watchdog(watchdog, scenario))
+
+        [offender] = watchdog.report()
+        assert offender["origin"] == "GET /api/candidates/{candidate_id}"
+        assert offender["count"] == 1
+        assert not watchdog.task_scopes
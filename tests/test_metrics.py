@@ -0,0 +1,89 @@
+"""
+Metrics registry and Prometheus exposition tests for RecruitHub
+"""
+import asyncio
+import time
+
+import pytest
+
+from metrics import LoopLagMonitor, MetricsRegistry
+
+
+class TestExposition:
+    """Text format rendering"""
+
+    def test_counter_with_labels(self):
+        """Test that each label combination is its own series"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", ("route", "status"))
+        requests.labels("/api/candidates", 200).inc()
+        requests.labels("/api/candidates", 200).inc()
+        requests.labels("/api/candidates", 404).inc()
+
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{route="/api/candidates",status="200"} 2' in text
+        assert 'requests_total{route="/api/candidates",status="404"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that bucket counts accumulate and +Inf equals the count"""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+        assert "latency_seconds_sum 4.05" in lines
+
+    def test_gauge_callback_evaluated_at_scrape(self):
+        """Test that callback gauges report the value at render time"""
+        registry = MetricsRegistry()
+        depth = {"value": 1}
+        registry.gauge("queue_depth", "Depth", ("queue",), callback=lambda: {("outbox",): depth["value"]})
+        depth["value"] = 7
+
+        assert 'queue_depth{queue="outbox"} 7' in registry.render()
+
+    def test_label_values_escaped(self):
+        """Test that quotes and newlines cannot break the exposition format"""
+        registry = MetricsRegistry()
+        registry.counter("events_total", "Events", ("name",)).labels('a "b"\nc').inc()
+
+        assert 'events_total{name="a \\"b\\"\\nc"} 1' in registry.render()
+
+    def test_wrong_label_count_rejected(self):
+        """Test that a missing label value raises instead of creating a bad series"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", ("route", "status"))
+        with pytest.raises(ValueError):
+            requests.labels("/api/")
+
+    def test_duplicate_name_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests")
+        with pytest.raises(ValueError):
+            registry.histogram("requests_total", "Requests")
+
+
+class TestLoopLagMonitor:
+    """Event loop lag probe"""
+
+    def test_blocking_call_shows_as_lag(self):
+        """Test that a synchronous sleep on the loop is recorded as lag"""
+        async def scenario():
+            registry = MetricsRegistry()
+            histogram = registry.histogram("lag_seconds", "Lag")
+            gauge = registry.gauge("lag_last_seconds", "Lag")
+            monitor = LoopLagMonitor(histogram, gauge, interval=0.01)
+            monitor.start()
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)
+            await asyncio.sleep(0.03)
+            await monitor.stop()
+            return max(child.sum for child in histogram._children.values())
+
+        assert asyncio.run(scenario()) >= 0.05
@@ -0,0 +1,53 @@
+"""
+On-demand profiler tests for RecruitHub
+"""
+import threading
+import time
+
+from profiler import Profiler
+
+
+def spin_cpu(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def allocate_buffers(count: int):
+    return [bytearray(64 * 1024) for _ in range(count)]
+
+
+class TestProfiler:
+    """Stack sampling and allocation tracking"""
+
+    def test_busy_thread_is_hotspot(self):
+        """Test that a CPU-bound thread dominates the samples and idle waits are skipped"""
+        stop = threading.Event()
+        worker = threading.Thread(target=spin_cpu, args=(stop,), name="spinner")
+        worker.start()
+        profiler = Profiler(interval=0.002, memory=False)
+        profiler.start()
+        try:
+            time.sleep(0.3)
+        finally:
+            report = profiler.stop()
+            stop.set()
+            worker.join()
+
+        assert report["samples"] > 10
+        threads = {entry["thread"]: entry for entry in report["threads"]}
+        assert threads["spinner"]["busy_percent"] > 50
+        assert any("spin_cpu" in entry["function"] for entry in report["functions"])
+        assert all("profiler-sampler" not in entry["stack"] for entry in report["stacks"])
+        assert report["memory"] is None
+
+    def test_allocation_sites_reported(self):
+        """Test that memory allocated during the window is attributed to its source line"""
+        profiler = Profiler(interval=0.01)
+        profiler.start()
+        buffers = allocate_buffers(20)
+        report = profiler.stop()
+
+        assert len(buffers) == 20
+        memory = report["memory"]
+        assert memory["allocated_bytes"] >= 20 * 64 * 1024
+        assert "test_profiler.py" in memory["sites"][0]["site"]
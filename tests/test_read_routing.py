@@ -0,0 +1,85 @@
+"""
+Read routing tests for RecruitHub
+Replica-set tests run only when MONGO_REPLSET_URL points at a replica set (see docker-compose.replset.yml)
+"""
+import os
+import time
+
+import pytest
+from pymongo import MongoClient, monitoring
+
+import server
+
+REPLSET_URL = os.environ.get('MONGO_REPLSET_URL')
+requires_replset = pytest.mark.skipif(not REPLSET_URL, reason="MONGO_REPLSET_URL not set")
+
+
+class AddressRecorder(monitoring.CommandListener):
+    """Records which server address handled each command"""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append((event.command_name, event.connection_id))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class TestReadPreferences:
+    """Per-workload read preference configuration"""
+
+    def test_workloads_default_to_secondaries(self):
+        """Test that analytics, export and search prefer secondaries within the staleness bound"""
+        for workload in ("analytics", "export", "search"):
+            preference = server.READ_PREFERENCES[workload]
+            assert preference.mongos_mode == "secondaryPreferred"
+            assert preference.max_staleness == server.MONGO_MAX_STALENESS_SECONDS
+
+    def test_primary_has_no_staleness_bound(self):
+        """Test that a workload pinned to the primary ignores max staleness"""
+        assert server.make_read_preference("primary").max_staleness == -1
+
+    def test_unknown_mode_rejected(self):
+        """Test that a typo in the environment fails at startup"""
+        with pytest.raises(RuntimeError):
+            server.make_read_preference("secondary_preferred")
+
+
+@requires_replset
+class TestReplicaSetRouting:
+    """Routing against a live multi-member replica set"""
+
+    @pytest.fixture
+    def replset(self):
+        recorder = AddressRecorder()
+        mongo = MongoClient(REPLSET_URL, event_listeners=[recorder])
+        database = mongo["recruitment_read_routing_test"]
+        database.candidates.insert_one({"id": "c1", "status": "new"})
+        yield mongo, database, recorder
+        mongo.drop_database("recruitment_read_routing_test")
+        mongo.close()
+
+    def test_analytics_reads_served_by_secondary(self, replset):
+        """Test that the analytics read preference sends queries to a secondary"""
+        mongo, database, recorder = replset
+        analytics = mongo.get_database(database.name, read_preference=server.READ_PREFERENCES["analytics"])
+        deadline = time.monotonic() + 10
+        while not analytics.candidates.count_documents({"id": "c1"}) and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+        aggregate_addresses = {address for name, address in recorder.commands if name == "aggregate"}
+        assert aggregate_addresses
+        assert mongo.primary not in aggregate_addresses
+
+    def test_writes_stay_on_primary(self, replset):
+        """Test that the default database handle still writes to the primary"""
+        mongo, database, recorder = replset
+        database.candidates.update_one({"id": "c1"}, {"$set": {"status": "shortlisted"}})
+
+        update_addresses = {address for name, address in recorder.commands if name == "update"}
+        assert update_addresses == {mongo.primary}
@@ -315,5 +315,54 @@ class TestDashboard:
         print(f"Dashboard stats: {data}")
 
 
+
+class TestProfilePdfCache:
+    """Profile PDF cache tests"""
+    
+    def test_repeat_generation_hits_cache(self, auth_headers):
+        """Test that regenerating an unchanged profile PDF is served from cache"""
+        candidates = requests.get(f"{BASE_URL}/api/candidates", headers=auth_headers).json()
+        if len(candidates) == 0:
+            pytest.skip("No candidates to render")
+        
+        candidate_ids = [candidates[0]["id"]]
+        first = requests.post(f"{BASE_URL}/api/candidates/generate-pdf", json=candidate_ids, headers=auth_headers)
+        assert first.status_code == 200, f"PDF generation failed: {first.text}"
+        
+        before = requests.get(f"{BASE_URL}/api/pdf-cache/stats", headers=auth_headers).json()
+        second = requests.post(f"{BASE_URL}/api/candidates/generate-pdf", json=candidate_ids, headers=auth_headers)
+        assert second.status_code == 200
+        after = requests.get(f"{BASE_URL}/api/pdf-cache/stats", headers=auth_headers).json()
+        
+        assert second.json()["pdf_base64"] == first.json()["pdf_base64"]
+        assert after["hits"] == before["hits"] + 1
+        print(f"PDF cache stats: {after}")
+
+
+class TestAnalytics:
+    """Analytics endpoint tests"""
+    
+    def test_funnel_stages(self, auth_headers):
+        """Test funnel report structure"""
+        response = requests.get(f"{BASE_URL}/api/analytics/funnel", headers=auth_headers)
+        assert response.status_code == 200, f"Funnel failed: {response.text}"
+        data = response.json()
+        
+        assert data["scope"] == "global"
+        assert data["stages"][0]["status"] == "sourced"
+        for stage in data["stages"]:
+            assert "entered" in stage
+            assert "time_in_stage_hours" in stage
+        print(f"Funnel stages: {[(s['status'], s['entered']) for s in data['stages']]}")
+        
+    def test_funnel_rejects_multiple_scopes(self, auth_headers):
+        """Test that the funnel accepts only one scope filter"""
+        response = requests.get(
+            f"{BASE_URL}/api/analytics/funnel",
+            params={"position_id": "p1", "client_id": "c1"},
+            headers=auth_headers
+        )
+        assert response.status_code == 400
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
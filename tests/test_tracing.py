@@ -0,0 +1,120 @@
+"""
+Request tracing tests for RecruitHub: span nesting, propagation and OTLP export
+"""
+import asyncio
+import threading
+
+import pytest
+
+from trace_collector import CollectorServer, load_spans, span_tree
+from tracing import KIND_CLIENT, OTLPHttpExporter, Tracer, current_span, parse_traceparent
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class TestSpans:
+    """Span creation and context propagation"""
+
+    def test_traceparent_continued(self):
+        """Test that an incoming traceparent sets the trace id and parent"""
+        tracer = Tracer(RecordingExporter())
+        root = tracer.start_root("GET /api/", TRACEPARENT)
+
+        assert root.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert root.parent_id == "00f067aa0ba902b7"
+        assert root.traceparent.startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+        assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+        assert parse_traceparent("garbage") is None
+
+    def test_sample_rate_applies_to_remote_parents(self):
+        """Test that a caller's sampled flag cannot bypass the local sample rate"""
+        assert not Tracer(RecordingExporter(), sample_rate=0.0).start_root("GET /api/", TRACEPARENT).sampled
+        assert Tracer(RecordingExporter(), sample_rate=1.0).start_root("GET /api/", TRACEPARENT).sampled
+
+        half = Tracer(RecordingExporter(), sample_rate=0.5)
+        low = "00-4bf92f3577b34da6" + "1" * 16 + "-00f067aa0ba902b7-01"
+        high = "00-4bf92f3577b34da6" + "f" * 16 + "-00f067aa0ba902b7-01"
+        assert half.start_root("GET /api/", low).sampled
+        assert not half.start_root("GET /api/", high).sampled
+        assert not half.start_root("GET /api/", low[:-2] + "00").sampled
+
+    def test_children_follow_context_into_threads(self):
+        """Test that spans opened in to_thread work nest under the request span"""
+        exporter = RecordingExporter()
+        tracer = Tracer(exporter)
+
+        @tracer.traced("bcrypt.verify")
+        def blocking_work():
+            with tracer.span("mongodb.find", KIND_CLIENT, **{"db.name": "recruitment"}):
+                pass
+
+        async def scenario():
+            with tracer.activate(tracer.start_root("POST /api/auth/login")) as root:
+                await asyncio.to_thread(blocking_work)
+            return root
+
+        root = asyncio.run(scenario())
+        tracer.shutdown()
+
+        spans = {span["name"]: span for span in exporter.spans}
+        assert set(spans) == {"POST /api/auth/login", "bcrypt.verify", "mongodb.find"}
+        assert {span["traceId"] for span in exporter.spans} == {root.trace_id}
+        assert spans["bcrypt.verify"]["parentSpanId"] == root.span_id
+        assert spans["mongodb.find"]["parentSpanId"] == spans["bcrypt.verify"]["spanId"]
+        assert spans["mongodb.find"]["attributes"] == [{"key": "db.name", "value": {"stringValue": "recruitment"}}]
+        assert current_span.get() is None
+
+    def test_error_recorded_on_span(self):
+        exporter = RecordingExporter()
+        tracer = Tracer(exporter)
+        with pytest.raises(ValueError):
+            with tracer.activate(tracer.start_root("job")):
+                with tracer.span("resume.parse"):
+                    raise ValueError("bad file")
+        tracer.shutdown()
+
+        assert all(span["status"]["code"] == 2 for span in exporter.spans)
+        assert exporter.spans[0]["status"]["message"] == "ValueError: bad file"
+
+    def test_unsampled_trace_records_nothing(self):
+        """Test that without an exporter requests still get ids but no spans are kept"""
+        tracer = Tracer(None)
+        with tracer.activate(tracer.start_root("GET /api/")) as root:
+            with tracer.span("mongodb.find") as child:
+                assert child is None
+        assert len(root.trace_id) == 32
+        assert tracer.stats()["exported"] == 0
+
+
+class TestCollectorExport:
+    """OTLP/HTTP export to the stand-in collector"""
+
+    def test_batches_posted_and_rendered_as_tree(self, tmp_path):
+        collector = CollectorServer(("127.0.0.1", 0), tmp_path / "spans.jsonl")
+        thread = threading.Thread(target=collector.serve_forever, daemon=True)
+        thread.start()
+        try:
+            endpoint = f"http://127.0.0.1:{collector.server_address[1]}"
+            tracer = Tracer(OTLPHttpExporter(endpoint, "recruithub-test"), batch_size=2)
+            with tracer.activate(tracer.start_root("GET /api/dashboard/stats")):
+                for name in ("mongodb.aggregate", "mongodb.find", "pdf.build"):
+                    with tracer.span(name):
+                        pass
+            tracer.shutdown()
+        finally:
+            collector.shutdown()
+            collector.server_close()
+
+        spans = load_spans(tmp_path / "spans.jsonl")
+        assert collector.received == len(spans) == 4
+        lines = span_tree(spans)
+        assert lines[0].endswith("GET /api/dashboard/stats")
+        assert all(line.endswith(("  mongodb.aggregate", "  mongodb.find", "  pdf.build")) for line in lines[1:])